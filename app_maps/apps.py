@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class AppMapsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'app_maps'
+
+    def ready(self):
+        # Registrar los receptores de señales
+        from app_maps import signals  # noqa: F401
@@ -0,0 +1,125 @@
+"""
+Geohash helpers used to index incidents spatially.
+
+A geohash encodes a (latitude, longitude) pair as a short base32 string where
+every extra character narrows the cell. Points that share a prefix lie in the
+same cell, so a viewport can be translated into a handful of prefix lookups
+that are served by a plain B-tree index on the stored geohash column.
+"""
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+# Precision stored in Incident.geohash (~4.8m x 4.8m cells)
+GEOHASH_PRECISION = 9
+
+# Maximum number of prefixes used to cover a viewport
+MAX_COVER_CELLS = 32
+
+
+def encode(latitude, longitude, precision=GEOHASH_PRECISION):
+    """
+    Encode a coordinate pair as a geohash string.
+
+    Args:
+        latitude: Latitude in degrees (-90 to 90)
+        longitude: Longitude in degrees (-180 to 180)
+        precision: Number of characters of the resulting geohash
+
+    Returns:
+        str: Geohash of the given precision
+
+    Examples:
+        encode(-5.19449, -80.63282, 5) -> '6pndm'
+    """
+    latitude = float(latitude)
+    longitude = float(longitude)
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+
+    geohash = []
+    bits = 0
+    bit_count = 0
+    even_bit = True
+
+    while len(geohash) < precision:
+        if even_bit:
+            middle = (lng_range[0] + lng_range[1]) / 2
+            if longitude >= middle:
+                bits = (bits << 1) | 1
+                lng_range[0] = middle
+            else:
+                bits = bits << 1
+                lng_range[1] = middle
+        else:
+            middle = (lat_range[0] + lat_range[1]) / 2
+            if latitude >= middle:
+                bits = (bits << 1) | 1
+                lat_range[0] = middle
+            else:
+                bits = bits << 1
+                lat_range[1] = middle
+
+        even_bit = not even_bit
+        bit_count += 1
+
+        if bit_count == 5:
+            geohash.append(BASE32[bits])
+            bits = 0
+            bit_count = 0
+
+    return ''.join(geohash)
+
+
+def cell_size(precision):
+    """
+    Returns the (height, width) in degrees of a geohash cell of the given precision.
+    """
+    total_bits = 5 * precision
+    lng_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lng_bits)
+
+
+def cover_bbox(min_lat, min_lng, max_lat, max_lng, max_cells=MAX_COVER_CELLS):
+    """
+    Returns the geohash prefixes covering a bounding box.
+
+    Picks the finest precision whose cells cover the box with at most
+    `max_cells` prefixes, so the resulting lookups stay selective without
+    producing an unbounded OR of conditions.
+
+    Args:
+        min_lat, min_lng, max_lat, max_lng: Bounding box in degrees
+        max_cells: Maximum number of prefixes to return
+
+    Returns:
+        list[str]: Sorted geohash prefixes
+    """
+    best = []
+    for precision in range(1, GEOHASH_PRECISION + 1):
+        cells = cells_in_bbox(min_lat, min_lng, max_lat, max_lng, precision, max_cells)
+        if cells is None:
+            break
+        best = cells
+    return sorted(best)
+
+
+def cells_in_bbox(min_lat, min_lng, max_lat, max_lng, precision, max_cells):
+    """Enumerate the cells of a precision inside a bbox, or None if there are too many"""
+    height, width = cell_size(precision)
+
+    first_row = int((min_lat + 90.0) // height)
+    last_row = min(int((max_lat + 90.0) // height), int(180.0 / height) - 1)
+    first_col = int((min_lng + 180.0) // width)
+    last_col = min(int((max_lng + 180.0) // width), int(360.0 / width) - 1)
+    if (last_row - first_row + 1) * (last_col - first_col + 1) > max_cells:
+        return None
+
+    # Codificar el centro de cada celda evita errores de redondeo en los bordes
+    cells = set()
+    for row in range(first_row, last_row + 1):
+        latitude = min((row + 0.5) * height - 90.0, 90.0)
+        for col in range(first_col, last_col + 1):
+            longitude = min((col + 0.5) * width - 180.0, 180.0)
+            cells.add(encode(latitude, longitude, precision))
+    return list(cells)
@@ -0,0 +1,77 @@
+"""
+Utilidades comunes de los comandos benchmark_*. Django no registra como
+comando los módulos de commands/ que empiezan con guion bajo.
+"""
+import statistics
+import time
+import tracemalloc
+
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def add_scratch_database_argument(parser):
+    parser.add_argument(
+        '--scratch-database', metavar='NAME',
+        help="Nombre de la base de datos PostgreSQL configurada, para confirmar que es una base "
+             "de prueba (los benchmarks insertan filas y bloquean tablas hasta terminar)"
+    )
+
+
+def ensure_scratch_database(name: str = None):
+    """
+    Falla si la base de datos configurada no es una base de prueba: SQLite local
+    o una base PostgreSQL cuyo nombre se confirma con --scratch-database.
+
+    Raises:
+        CommandError: Si no se confirmó la base de datos
+    """
+    if connection.vendor == 'sqlite':
+        return
+    configured = connection.settings_dict['NAME']
+    if name != configured:
+        raise CommandError(
+            f"Refusing to benchmark against '{configured}'. Use a scratch or seeded database "
+            f"and confirm it with --scratch-database {configured}"
+        )
+
+
+def measure(function, repeat: int, trace_memory: bool = False):
+    """
+    Mide `repeat` llamadas a `function` (tiempo y consultas). Con `trace_memory`
+    hace una llamada adicional con tracemalloc para la memoria máxima, que no
+    afecta a los tiempos.
+
+    Returns:
+        tuple: (resumen, valor retornado por la última llamada)
+    """
+    timings = []
+    queries = 0
+    value = None
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as context:
+            start = time.perf_counter()
+            value = function()
+            timings.append(time.perf_counter() - start)
+        queries += len(context)
+
+    p95 = statistics.quantiles(timings, n=20, method='inclusive')[18] if len(timings) > 1 else timings[0]
+    result = {
+        'calls': repeat,
+        'median_seconds': statistics.median(timings),
+        'p50_ms': round(statistics.median(timings) * 1000, 3),
+        'p95_ms': round(p95 * 1000, 3),
+        'queries_per_call': round(queries / repeat, 2),
+    }
+
+    if trace_memory:
+        tracemalloc.start()
+        try:
+            function()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        result['peak_memory_kb'] = round(peak / 1024, 1)
+
+    return result, value
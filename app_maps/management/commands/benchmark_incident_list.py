@@ -0,0 +1,48 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from app_maps.management.commands._benchmark import add_scratch_database_argument, ensure_scratch_database, measure
+from app_maps.services.incident import IncidentService
+from app_maps.services.synthetic import SyntheticDataService
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara el listado completo de incidentes (IncidentSerializer) con la "
+        "proyección de marcadores. Los datos sintéticos se crean dentro de una "
+        "transacción que se revierte al terminar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000],
+                            help="Cantidad de incidentes a generar para cada corrida")
+        parser.add_argument('--repeat', type=int, default=3,
+                            help="Repeticiones de cada medición")
+        add_scratch_database_argument(parser)
+
+    def handle(self, *args, **options):
+        ensure_scratch_database(options['scratch_database'])
+
+        results = []
+        for rows in options['rows']:
+            with transaction.atomic():
+                SyntheticDataService(seed=rows).create_incidents(rows)
+
+                incident_service = IncidentService()
+                for name, function in (
+                    ('incidents', incident_service.get_incidents_by_filters),
+                    ('markers', incident_service.get_incident_markers),
+                ):
+                    result, content = measure(function, options['repeat'])
+                    result.update({'path': name, 'rows': rows, 'bytes': len(json.dumps(content, default=str))})
+                    results.append(result)
+                    self.stdout.write(
+                        f"{name:>10} rows={rows:<8} median={result['median_seconds']:.3f}s "
+                        f"queries={result['queries_per_call']} bytes={result['bytes']}"
+                    )
+
+                transaction.set_rollback(True)
+
+        self.stdout.write(json.dumps(results, indent=2))
@@ -0,0 +1,150 @@
+import json
+import platform
+import subprocess
+import time
+from datetime import timedelta
+from itertools import combinations
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from app_maps.management.commands._benchmark import add_scratch_database_argument, ensure_scratch_database, measure
+from app_maps.models import Incident, IncidentState
+from app_maps.services.counters import CounterService
+from app_maps.services.incident import IncidentService
+from app_maps.services.synthetic import DEFAULT_CENTER, SyntheticDataService
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark reproducible de los servicios de incidentes sobre datos sintéticos "
+        "(10k/100k/1M filas con fotografías). Reporta p50/p95, consultas por llamada y "
+        "memoria máxima; con --output guarda el resultado en JSON y con --compare lo "
+        "compara con otro resultado. Funciona con SQLite (USE_SQLITE=True) y PostgreSQL. "
+        "Los datos se crean dentro de una transacción que se revierte al terminar, pero "
+        "mientras dura se bloquean las tablas: en PostgreSQL solo se ejecuta sobre una base "
+        "de prueba confirmada con --scratch-database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10_000],
+                            help="Cantidades de incidentes a medir, por ejemplo: --sizes 10000 100000 1000000")
+        parser.add_argument('--repeat', type=int, default=10,
+                            help="Llamadas medidas por escenario")
+        parser.add_argument('--max-filters', type=int, default=2,
+                            help="Máximo de filtros combinados en get_incidents_by_filters")
+        parser.add_argument('--seed', type=int, default=42,
+                            help="Semilla de los datos sintéticos y de los ids consultados")
+        parser.add_argument('--output', help="Archivo JSON donde guardar el resultado")
+        parser.add_argument('--compare', help="Archivo JSON de una ejecución anterior para comparar")
+        add_scratch_database_argument(parser)
+
+    def handle(self, *args, **options):
+        ensure_scratch_database(options['scratch_database'])
+
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare']) as file:
+                    baseline = {(result['rows'], result['name']): result for result in json.load(file)['results']}
+            except (OSError, ValueError, KeyError) as e:
+                raise CommandError(f"Could not read {options['compare']}: {e}")
+
+        synthetic = SyntheticDataService(seed=options['seed'])
+        results = []
+        with transaction.atomic():
+            seeded = 0
+            for rows in sorted(options['sizes']):
+                # Cada tamaño reutiliza las filas del anterior y agrega las que faltan
+                start = time.perf_counter()
+                synthetic.create_incidents(rows - seeded)
+                seeded = rows
+                counter_service = CounterService()
+                if counter_service.is_enabled():
+                    counter_service.rebuild()
+                self.stdout.write(f"Seeded {rows} incidents in {time.perf_counter() - start:.1f}s")
+
+                for name, function in self.get_scenarios(synthetic.random, options['max_filters']):
+                    summary, _ = measure(function, options['repeat'], trace_memory=True)
+                    result = {'rows': rows, 'name': name, **summary}
+                    results.append(result)
+                    self.stdout.write(self.format_result(result, baseline))
+
+            transaction.set_rollback(True)
+
+        report = {
+            'commit': self.get_commit(),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'repeat': options['repeat'],
+            'results': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(report, file, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+    def get_scenarios(self, random, max_filters: int):
+        """Escenarios a medir: (nombre, función sin argumentos)"""
+        incident_service = IncidentService()
+        incident_ids = list(Incident.objects.values_list('id_incident', flat=True))
+        category_id = Incident.objects.values_list('category_id', flat=True).first()
+        now = timezone.now()
+        latitude, longitude = DEFAULT_CENTER
+
+        filters = {
+            'id_category': {'id_category': category_id},
+            'id_state': {'id_state': IncidentState.IN_PROGRESS},
+            'show_on_map': {'show_on_map': True},
+            'text_search': {'text_search': 'bache'},
+            'registration_period': {'registration_period': {'from_date': now - timedelta(days=30), 'to_date': now}},
+            'viewport': {
+                'min_lat': latitude - 0.01, 'max_lat': latitude + 0.01,
+                'min_lng': longitude - 0.01, 'max_lng': longitude + 0.01,
+            },
+        }
+
+        scenarios = []
+        for size in range(max_filters + 1):
+            for names in combinations(filters, size):
+                kwargs = {}
+                for name in names:
+                    kwargs.update(filters[name])
+                scenarios.append((
+                    f"get_incidents_by_filters[{','.join(names)}]",
+                    lambda kwargs=kwargs: incident_service.get_incidents_by_filters(**kwargs),
+                ))
+
+        def update_partial():
+            id_incident = random.choice(incident_ids)
+            show_on_map = Incident.objects.values_list('show_on_map', flat=True).get(id_incident=id_incident)
+            incident_service.update_incident_partial(id_incident, {'show_on_map': not show_on_map})
+
+        scenarios += [
+            ('get_incident_by_id', lambda: incident_service.get_incident_by_id(random.choice(incident_ids))),
+            ('total_incidents', incident_service.total_incidents),
+            ('update_incident_partial', update_partial),
+        ]
+        return scenarios
+
+    def format_result(self, result, baseline):
+        line = (
+            f"{result['rows']:>8} {result['name']:<60} p50={result['p50_ms']:>9.2f}ms "
+            f"p95={result['p95_ms']:>9.2f}ms queries={result['queries_per_call']:<5} "
+            f"peak={result['peak_memory_kb']:.0f}KB"
+        )
+        previous = (baseline or {}).get((result['rows'], result['name']))
+        if previous and previous['p50_ms']:
+            ratio = result['p50_ms'] / previous['p50_ms']
+            style = self.style.ERROR if ratio > 1.1 else self.style.SUCCESS if ratio < 0.9 else str
+            line += ' ' + style(f"x{ratio:.2f} vs baseline")
+        return line
+
+    def get_commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
@@ -0,0 +1,76 @@
+import json
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from app_maps.services.cloudflare import build_r2_client, get_r2_client
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara crear un cliente de R2 por operación (comportamiento anterior) con el "
+        "cliente compartido. Sin --key mide la creación del cliente más una URL firmada "
+        "(sin red); con --key mide además head_object contra R2, donde el cliente "
+        "compartido reutiliza la conexión TLS."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=50,
+                            help="Operaciones medidas por escenario")
+        parser.add_argument('--key', help="Key existente en R2 para medir head_object (requiere red)")
+
+    def handle(self, *args, **options):
+        bucket = settings.R2_BUCKET_NAME or 'benchmark'
+        key = options['key'] or 'incidents/0/photo.jpg'
+        if settings.R2_ENDPOINT_URL and settings.R2_ACCESS_KEY_ID:
+            self.run(bucket, key, options)
+            return
+        if options['key']:
+            raise CommandError("--key requires the R2_* settings")
+        # Firmar URLs no requiere red: bastan un endpoint y credenciales con formato válido
+        with override_settings(
+            R2_ENDPOINT_URL='https://benchmark.r2.cloudflarestorage.com',
+            R2_ACCESS_KEY_ID='benchmark',
+            R2_SECRET_ACCESS_KEY='benchmark',
+        ):
+            self.run(bucket, key, options)
+
+    def run(self, bucket: str, key: str, options):
+        def presign(client):
+            client.generate_presigned_url('get_object', Params={'Bucket': bucket, 'Key': key}, ExpiresIn=300)
+
+        def head(client):
+            client.head_object(Bucket=bucket, Key=key)
+
+        operations = [('presign', presign)]
+        if options['key']:
+            operations.append(('head_object', head))
+
+        # La primera llamada crea el cliente, igual que la primera petición de cada worker
+        get_r2_client()
+        results = []
+        for name, operation in operations:
+            for client_name, get_client in (('new client', build_r2_client), ('shared client', get_r2_client)):
+                result = self.measure(lambda: operation(get_client()), options['repeat'])
+                result.update({'operation': name, 'client': client_name})
+                results.append(result)
+                self.stdout.write(
+                    f"{name:>12} {client_name:<14} p50={result['p50_ms']:>8.2f}ms p95={result['p95_ms']:>8.2f}ms"
+                )
+
+        self.stdout.write(json.dumps(results, indent=2))
+
+    def measure(self, function, repeat: int):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            function()
+            timings.append(time.perf_counter() - start)
+        p95 = statistics.quantiles(timings, n=20, method='inclusive')[18] if len(timings) > 1 else timings[0]
+        return {
+            'p50_ms': round(statistics.median(timings) * 1000, 3),
+            'p95_ms': round(p95 * 1000, 3),
+        }
@@ -0,0 +1,64 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from app_maps.management.commands._benchmark import add_scratch_database_argument, ensure_scratch_database, measure
+from app_maps.renderers import FastJSONRenderer
+from app_maps.serializers import IncidentSerializer, serialize_incident_list
+from app_maps.services.incident import IncidentService
+from app_maps.services.synthetic import SyntheticDataService
+
+
+class Command(BaseCommand):
+    help = (
+        "Comprueba que serialize_incident_list + FastJSONRenderer producen los mismos "
+        "bytes que IncidentSerializer + JSONRenderer y compara sus tiempos. Los datos "
+        "sintéticos se crean dentro de una transacción que se revierte al terminar; "
+        "la comparación incluye también los incidentes existentes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10_000,
+                            help="Cantidad de incidentes sintéticos a generar")
+        parser.add_argument('--repeat', type=int, default=3,
+                            help="Repeticiones de cada medición")
+        add_scratch_database_argument(parser)
+
+    def handle(self, *args, **options):
+        ensure_scratch_database(options['scratch_database'])
+
+        with transaction.atomic():
+            SyntheticDataService(seed=options['rows']).create_incidents(options['rows'])
+            incidents = list(IncidentService().get_incidents_queryset())
+
+            expected = JSONRenderer().render(IncidentSerializer(incidents, many=True).data)
+            actual = FastJSONRenderer().render(serialize_incident_list(incidents))
+            transaction.set_rollback(True)
+
+        if actual != expected:
+            position = next(
+                (index for index, (a, b) in enumerate(zip(actual, expected)) if a != b),
+                min(len(actual), len(expected))
+            )
+            raise CommandError(
+                f"Output differs at byte {position}: "
+                f"expected {expected[position - 40:position + 40]!r}, got {actual[position - 40:position + 40]!r}"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Parity OK for {len(incidents)} incidents ({len(actual)} bytes)"))
+
+        results = []
+        for name, function in (
+            ('IncidentSerializer', lambda: IncidentSerializer(incidents, many=True).data),
+            ('serialize_incident_list', lambda: serialize_incident_list(incidents)),
+        ):
+            results.append({'name': name, **measure(function, options['repeat'])[0]})
+
+        data = serialize_incident_list(incidents)
+        for name, renderer in (('JSONRenderer', JSONRenderer()), ('FastJSONRenderer', FastJSONRenderer())):
+            results.append({'name': name, **measure(lambda: renderer.render(data), options['repeat'])[0]})
+
+        for result in results:
+            self.stdout.write(f"{result['name']:>24} median={result['median_seconds']:.3f}s")
+        self.stdout.write(json.dumps(results, indent=2))
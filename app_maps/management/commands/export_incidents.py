@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app_maps.services.export import IncidentExportService
+
+
+class Command(BaseCommand):
+    help = (
+        "Exporta los incidentes a un archivo CSV, Parquet o GeoJSON. Acepta los mismos "
+        "filtros que /incidents/ con --filter nombre=valor (por ejemplo "
+        "--filter id_category=3 --filter text_search=bache)."
+    )
+
+    WRITERS = {
+        'csv': 'stream_csv',
+        'parquet': 'stream_parquet',
+        'geojson': 'stream_geojson',
+    }
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help="Ruta del archivo de salida")
+        parser.add_argument('--format', choices=sorted(self.WRITERS), default=None,
+                            help="Formato de salida (por defecto, según la extensión del archivo)")
+        parser.add_argument('--filter', action='append', default=[], metavar='NAME=VALUE',
+                            help="Filtro del listado de incidentes (se puede repetir)")
+
+    def handle(self, *args, **options):
+        output = options['output']
+        export_format = options['format'] or output.rsplit('.', 1)[-1].lower()
+        if export_format not in self.WRITERS:
+            raise CommandError(f"Unknown format '{export_format}'. Use --format {{{','.join(sorted(self.WRITERS))}}}")
+
+        filters = {}
+        for item in options['filter']:
+            name, separator, value = item.partition('=')
+            if not separator:
+                raise CommandError(f"Invalid filter '{item}', expected NAME=VALUE")
+            filters[name] = value
+
+        start = time.perf_counter()
+        try:
+            content = getattr(IncidentExportService(), self.WRITERS[export_format])(**filters)
+            size = 0
+            with open(output, 'wb') as file:
+                for part in content:
+                    file.write(part)
+                    size += len(part)
+        except (ValueError, RuntimeError) as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Exported {size} bytes to {output} in {time.perf_counter() - start:.2f}s"
+        ))
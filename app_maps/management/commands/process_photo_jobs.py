@@ -0,0 +1,91 @@
+import os
+import socket
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from app_maps.services.cloudflare import CloudflareService
+from app_maps.services.incident import IncidentService
+from app_maps.services.photo_jobs import PhotoJobService
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker de la cola de fotografías (PHOTO_PROCESSING_MODE = 'async'): toma "
+        "trabajos con lease, optimiza las imágenes, las sube a R2 y registra las "
+        "fotografías. Se pueden ejecutar varios workers a la vez."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=settings.PHOTO_WORKER_CONCURRENCY,
+                            help="Fotografías procesadas en paralelo")
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help="Segundos de espera cuando no hay trabajos")
+        parser.add_argument('--once', action='store_true',
+                            help="Procesar los trabajos disponibles y terminar")
+
+    def handle(self, *args, **options):
+        worker = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        concurrency = max(options['concurrency'], 1)
+        photo_job_service = PhotoJobService()
+        self.stdout.write(f"Worker {worker} started with concurrency {concurrency}")
+
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='photo-job') as executor:
+            try:
+                while True:
+                    close_old_connections()
+                    jobs = photo_job_service.lease(worker, concurrency)
+                    if not jobs:
+                        if options['once']:
+                            return
+                        time.sleep(options['poll_interval'])
+                        continue
+
+                    # Los hilos solo optimizan y suben; la base de datos se usa desde este hilo
+                    futures = [(job, executor.submit(self.upload, photo_job_service, job)) for job in jobs]
+                    for job, future in futures:
+                        error = future.exception()
+                        if error is not None:
+                            photo_job_service.fail(job, worker, str(error) or error.__class__.__name__)
+                            self.stdout.write(self.style.WARNING(
+                                f"Job {job.id_photo_job} failed (attempt {job.attempts}): {error}"
+                            ))
+                            continue
+
+                        result = future.result()
+                        if photo_job_service.complete(job, worker, result['r2_key']):
+                            self.stdout.write(f"Job {job.id_photo_job} done: {result['r2_key']}")
+                            if result['miniature_file'] is not None:
+                                self.upload_miniature(job, result['miniature_file'])
+                        else:
+                            # El trabajo fue cancelado o su lease venció y lo tomó otro worker
+                            CloudflareService().delete_file(result['r2_key'])
+                            self.stdout.write(self.style.WARNING(f"Job {job.id_photo_job} lost its lease"))
+            except KeyboardInterrupt:
+                self.stdout.write("Stopping worker")
+
+    def upload(self, photo_job_service: PhotoJobService, job):
+        file = photo_job_service.open_file(job)
+        try:
+            result = IncidentService().upload_photography(
+                job.incident_id, file, miniature=job.make_miniature, defer_miniature=True
+            )
+        finally:
+            file.close()
+        return result
+
+    def upload_miniature(self, job, miniature_file):
+        """
+        Sube la miniatura de un trabajo ya registrado. Su clave es fija por
+        incidente: subirla antes de complete() dejaba que un reintento o un
+        trabajo cancelado reemplazara la miniatura vigente.
+        """
+        try:
+            IncidentService().upload_photography_miniature(job.incident_id, miniature_file)
+        except Exception as e:
+            # La fotografía ya quedó registrada: el trabajo no se reintenta por la miniatura
+            self.stdout.write(self.style.WARNING(f"Job {job.id_photo_job} miniature failed: {e}"))
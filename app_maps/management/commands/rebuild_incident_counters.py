@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app_maps.services.counters import CounterService
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruye desde cero los contadores de incidentes (incident_counter). "
+        "Con --verify solo compara los contadores guardados con los reales."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify', action='store_true',
+                            help="Solo reportar diferencias, sin modificar los contadores")
+
+    def handle(self, *args, **options):
+        counter_service = CounterService()
+
+        if options['verify']:
+            drift = counter_service.verify()
+            if not drift:
+                self.stdout.write(self.style.SUCCESS("Counters are consistent"))
+                return
+            for (dimension, key), (stored, expected) in sorted(drift.items()):
+                self.stdout.write(f"{dimension}:{key} stored={stored} expected={expected}")
+            raise CommandError(f"{len(drift)} counters drifted")
+
+        rows = counter_service.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} counters"))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from app_maps.services.incident_statistics import IncidentStatisticsService
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula desde cero las tablas de rollup de estadísticas de incidentes. "
+        "La migración 0011 los llena al crearlos; ejecutar tras cargas masivas con bulk_create."
+    )
+
+    def handle(self, *args, **options):
+        daily_rows, close_rows = IncidentStatisticsService().rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {daily_rows} daily rows and {close_rows} close time rows"
+        ))
@@ -0,0 +1,99 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from app_maps.services.counters import CounterService
+from app_maps.services.incident_statistics import IncidentStatisticsService
+from app_maps.services.synthetic import DEFAULT_SPREAD, SyntheticDataService
+
+
+def parse_center(value: str):
+    """LAT,LNG[,SPREAD] -> (latitude, longitude, spread)"""
+    try:
+        parts = [float(part) for part in value.split(',')]
+    except ValueError:
+        raise CommandError(f"Invalid center '{value}', expected LAT,LNG[,SPREAD]")
+    if len(parts) == 2:
+        parts.append(DEFAULT_SPREAD)
+    if len(parts) != 3:
+        raise CommandError(f"Invalid center '{value}', expected LAT,LNG[,SPREAD]")
+    return tuple(parts)
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera incidentes sintéticos realistas (con fotografías y log de cambios) para "
+        "pruebas de carga y planificación de capacidad. Los datos SE GUARDAN: usar solo "
+        "en bases de datos de prueba. En PostgreSQL, --copy inserta con COPY."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('count', type=int, help="Cantidad de incidentes a generar")
+        parser.add_argument('--center', action='append', dest='centers', metavar='LAT,LNG[,SPREAD]',
+                            help="Centro de ciudad alrededor del que se agrupan los incidentes (repetible)")
+        parser.add_argument('--category-skew', type=float, default=1.0,
+                            help="Exponente Zipf de la distribución de categorías (0 = uniforme)")
+        parser.add_argument('--closed-ratio', type=float, default=0.3,
+                            help="Fracción de incidentes cerrados")
+        parser.add_argument('--in-progress-ratio', type=float, default=0.35,
+                            help="Fracción de incidentes en proceso (abiertos con prioridad)")
+        parser.add_argument('--inspector-ratio', type=float, default=0.5,
+                            help="Fracción de incidentes registrados por inspectores (el resto, ciudadanos)")
+        parser.add_argument('--photo-ratio', type=float, default=0.5,
+                            help="Fracción de incidentes con fotografía")
+        parser.add_argument('--days', type=int, default=365,
+                            help="Las fechas de registro se reparten en los últimos N días")
+        parser.add_argument('--batch-size', type=int, default=10_000)
+        parser.add_argument('--seed', type=int, help="Semilla para datos reproducibles")
+        parser.add_argument('--copy', action='store_true',
+                            help="Insertar con COPY (solo PostgreSQL)")
+        parser.add_argument('--skip-rebuild', action='store_true',
+                            help="No reconstruir contadores ni estadísticas al terminar")
+
+    def handle(self, *args, **options):
+        if options['copy'] and connection.vendor != 'postgresql':
+            raise CommandError("--copy requires PostgreSQL")
+
+        try:
+            synthetic = SyntheticDataService(
+                seed=options['seed'],
+                centers=[parse_center(center) for center in options['centers'] or []],
+                category_skew=options['category_skew'],
+                closed_ratio=options['closed_ratio'],
+                in_progress_ratio=options['in_progress_ratio'],
+                inspector_ratio=options['inspector_ratio'],
+                days=options['days'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        start = time.perf_counter()
+        created = 0
+        # Una transacción por tramo: un error no deja un lote a medias y el avance es visible
+        step = options['batch_size'] * 10
+        while created < options['count']:
+            size = min(step, options['count'] - created)
+            with transaction.atomic():
+                synthetic.create_incidents(
+                    size,
+                    batch_size=options['batch_size'],
+                    photo_ratio=options['photo_ratio'],
+                    use_copy=options['copy'],
+                    record_changes=True,
+                )
+            created += size
+            elapsed = time.perf_counter() - start
+            self.stdout.write(f"{created} incidents ({created / elapsed * 60:,.0f} rows/min)")
+
+        # Las tablas derivadas no se mantienen en la inserción masiva
+        if not options['skip_rebuild']:
+            counter_service = CounterService()
+            if counter_service.is_enabled():
+                counter_service.rebuild()
+            IncidentStatisticsService().rebuild()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {created} incidents in {time.perf_counter() - start:.1f}s. "
+            "Cached clusters and tiles expire after CLUSTER_CACHE_TIMEOUT / VECTOR_TILE_CACHE_TIMEOUT."
+        ))
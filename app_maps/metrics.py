@@ -0,0 +1,83 @@
+"""
+Métricas Prometheus de la aplicación.
+
+Con varios procesos (gunicorn, uwsgi) cada worker escribe sus valores en
+archivos mmap del directorio PROMETHEUS_MULTIPROC_DIR y /metrics los suma al
+responder; registrar una observación solo escribe en memoria compartida.
+El directorio debe existir, ser el mismo para todos los workers y vaciarse
+al reiniciar el servicio. Sin esa variable se usa el registro del proceso.
+"""
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import CollectorRegistry, Counter, Histogram, REGISTRY, generate_latest
+from prometheus_client.multiprocess import MultiProcessCollector
+
+
+# Buckets en segundos: las vistas y R2 suelen responder en milisegundos,
+# SIAC y la optimización de imágenes pueden tardar varios segundos
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+REQUEST_LATENCY = Histogram(
+    'app_maps_request_duration_seconds',
+    'Request latency by URL name',
+    ['view', 'method'],
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS = Counter(
+    'app_maps_requests_total',
+    'Requests by URL name and status code',
+    ['view', 'method', 'status'],
+)
+R2_LATENCY = Histogram(
+    'app_maps_r2_operation_duration_seconds',
+    'Cloudflare R2 operation latency',
+    ['operation', 'outcome'],
+    buckets=LATENCY_BUCKETS,
+)
+SIAC_LATENCY = Histogram(
+    'app_maps_siac_request_duration_seconds',
+    'SIAC (tradoc) request latency',
+    ['operation', 'outcome'],
+    buckets=LATENCY_BUCKETS,
+)
+IMAGE_OPTIMIZATION_LATENCY = Histogram(
+    'app_maps_image_optimization_duration_seconds',
+    'Pillow image optimization time',
+    ['operation', 'outcome'],
+    buckets=LATENCY_BUCKETS,
+)
+
+
+@contextmanager
+def timed(histogram: Histogram, operation: str):
+    """
+    Registra la duración del bloque en `histogram` con outcome 'success', o
+    'error' si el bloque lanza una excepción (que se propaga).
+
+    Example:
+        with timed(R2_LATENCY, 'upload'):
+            s3_client.upload_fileobj(...)
+    """
+    start = time.perf_counter()
+    outcome = 'error'
+    try:
+        yield
+        outcome = 'success'
+    finally:
+        histogram.labels(operation=operation, outcome=outcome).observe(time.perf_counter() - start)
+
+
+def observe_request(view: str, method: str, status: int, duration: float):
+    REQUEST_LATENCY.labels(view=view, method=method).observe(duration)
+    REQUESTS.labels(view=view, method=method, status=str(status)).inc()
+
+
+def render_metrics() -> bytes:
+    """Métricas en formato de texto Prometheus (sumando todos los workers si aplica)"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
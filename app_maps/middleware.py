@@ -0,0 +1,255 @@
+"""
+Middleware for the app_maps application
+"""
+import json
+import logging
+import re
+import secrets
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence, compress_string
+
+from app_maps import metrics
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli es opcional
+    brotli = None
+
+
+logger = logging.getLogger('app_maps.requests')
+
+# Solo se comprimen los datos de la API: el HTML del admin y del login lleva el
+# token CSRF y datos de sesión, que la compresión expondría a BREACH
+COMPRESSIBLE_CONTENT_TYPES = (
+    'application/json',
+    'application/geo+json',
+    'application/vnd.mapbox-vector-tile',
+    'text/csv',
+)
+
+# Máximo de bytes aleatorios agregados a cada respuesta comprimida (mitigación de BREACH)
+MAX_RANDOM_BYTES = 100
+
+# Métodos con etiqueta propia en las métricas; el resto se agrupa como 'other'
+KNOWN_METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+
+_accept_encoding_re = re.compile(r'^\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*$')
+
+
+def parse_accept_encoding(header: str):
+    """Retorna el conjunto de codificaciones aceptadas (con q > 0) de un Accept-Encoding"""
+    accepted = set()
+    for item in header.split(','):
+        match = _accept_encoding_re.match(item)
+        if not match:
+            continue
+        encoding, quality = match.groups()
+        try:
+            if quality is not None and float(quality) <= 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(encoding.lower())
+    return accepted
+
+
+class CompressionMiddleware:
+    """
+    Comprime las respuestas de la API con brotli (si está instalado) o gzip
+    según el Accept-Encoding del cliente.
+
+    - Solo comprime respuestas de al menos COMPRESSION_MIN_SIZE bytes; las
+      respuestas en streaming se comprimen por partes a medida que se envían.
+    - Solo comprime COMPRESSIBLE_CONTENT_TYPES y nunca respuestas que crean cookies.
+    - Una vista puede desactivarla con el atributo de clase
+      `compress_response = False` (por ejemplo, para blobs ya comprimidos).
+    - Va después de WhiteNoise, que sirve sus propios archivos precomprimidos.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        return self.process_response(request, response)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'view_class', None)
+        request._compress_response = getattr(view_class or view_func, 'compress_response', True)
+        return None
+
+    def process_response(self, request, response):
+        if not getattr(request, '_compress_response', True):
+            return response
+        if response.has_header('Content-Encoding') or response.status_code < 200 or response.status_code in (204, 304):
+            return response
+        if not response.get('Content-Type', '').startswith(COMPRESSIBLE_CONTENT_TYPES) or response.cookies:
+            return response
+
+        # La respuesta depende del Accept-Encoding aunque esta vez no se comprima
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        accepted = parse_accept_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if brotli is not None and 'br' in accepted:
+            encoding = 'br'
+        elif 'gzip' in accepted:
+            encoding = 'gzip'
+        else:
+            return response
+
+        if response.streaming:
+            if encoding == 'br':
+                response.streaming_content = self._brotli_sequence(response.streaming_content)
+            else:
+                # Bytes aleatorios en el encabezado gzip para mitigar BREACH (igual que GZipMiddleware)
+                response.streaming_content = compress_sequence(
+                    response.streaming_content, max_random_bytes=MAX_RANDOM_BYTES
+                )
+            # No se conoce el tamaño final
+            del response.headers['Content-Length']
+        else:
+            if len(response.content) < getattr(settings, 'COMPRESSION_MIN_SIZE', 1024):
+                return response
+            if encoding == 'br':
+                compressor = self._brotli_compressor()
+                compressed_content = (
+                    self._brotli_padding(compressor) + compressor.process(response.content) + compressor.finish()
+                )
+            else:
+                compressed_content = compress_string(response.content, max_random_bytes=MAX_RANDOM_BYTES)
+            if len(compressed_content) >= len(response.content):
+                return response
+            response.content = compressed_content
+            response.headers['Content-Length'] = str(len(response.content))
+
+        # El ETag fuerte deja de coincidir byte a byte con el contenido sin comprimir
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    def _brotli_compressor(self):
+        return brotli.Compressor(quality=getattr(settings, 'COMPRESSION_BROTLI_QUALITY', 5))
+
+    def _brotli_padding(self, compressor):
+        """
+        Inicio del stream brotli con un bloque de metadatos de longitud aleatoria,
+        que los decodificadores ignoran: el equivalente a los bytes aleatorios del
+        encabezado gzip, ya que brotli no tiene encabezado.
+        """
+        # flush() sin datos emite el encabezado alineado a byte, así el bloque
+        # de metadatos puede ir a continuación
+        size = secrets.randbelow(MAX_RANDOM_BYTES) + 1
+        # ISLAST=0, MNIBBLES=0 (valor 3), reservado, MSKIPBYTES=1, MSKIPLEN-1
+        header = ((3 << 1) | (1 << 4) | ((size - 1) << 6)).to_bytes(2, 'little')
+        return compressor.flush() + header + secrets.token_bytes(size)
+
+    def _brotli_sequence(self, sequence):
+        compressor = self._brotli_compressor()
+        yield self._brotli_padding(compressor)
+        for item in sequence:
+            # Igual que compress_sequence de gzip: flush() por cada parte para que
+            # el cliente reciba cada bloque al generarse (las partes ya son bloques
+            # de INCIDENTS_STREAM_CHUNK_SIZE incidentes, no líneas sueltas)
+            data = compressor.process(item) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+
+
+class QueryRecorder:
+    """execute_wrapper que acumula cantidad, tiempo total y la consulta más lenta"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.slowest_duration = 0.0
+        self.slowest_sql = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.count += 1
+            self.duration += duration
+            if duration >= self.slowest_duration:
+                self.slowest_duration = duration
+                self.slowest_sql = sql
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Mide las consultas SQL de cada petición (cantidad, tiempo total en base de
+    datos y la consulta más lenta) y las publica en el encabezado Server-Timing
+    y en un log estructurado (logger `app_maps.requests`, una línea JSON).
+
+    Las consultas de una respuesta en streaming que ocurren mientras se envía
+    el cuerpo no se incluyen. Se desactiva con QUERY_INSTRUMENTATION_ENABLED = False.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_INSTRUMENTATION_ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        total = time.perf_counter() - start
+
+        response.headers['Server-Timing'] = ', '.join([
+            f'db;dur={recorder.duration * 1000:.1f};desc="{recorder.count} queries"',
+            f'total;dur={total * 1000:.1f}',
+        ])
+
+        slow_query_ms = getattr(settings, 'SLOW_QUERY_MS', 500)
+        level = logging.WARNING if recorder.slowest_duration * 1000 >= slow_query_ms else logging.INFO
+        if logger.isEnabledFor(level):
+            logger.log(level, json.dumps({
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'queries': recorder.count,
+                'db_ms': round(recorder.duration * 1000, 1),
+                'total_ms': round(total * 1000, 1),
+                'slowest_ms': round(recorder.slowest_duration * 1000, 1),
+                # Solo el SQL parametrizado: nunca los valores
+                'slowest_sql': (recorder.slowest_sql or '')[:500] or None,
+            }))
+        return response
+
+
+class RequestMetricsMiddleware:
+    """
+    Registra la latencia y el código de estado de cada petición en las métricas
+    Prometheus (app_maps.metrics), etiquetadas con el nombre de la ruta de
+    urls.py para no crear una serie por cada URL distinta. Las rutas que no
+    coinciden con ninguna se agrupan como 'unmatched'.
+
+    Va primero en MIDDLEWARE para medir también al resto de middlewares.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        resolver_match = getattr(request, 'resolver_match', None)
+        view = (resolver_match.url_name if resolver_match else None) or 'unmatched'
+        method = request.method if request.method in KNOWN_METHODS else 'other'
+        metrics.observe_request(view, method, response.status_code, duration)
+        return response
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.5 on 2026-10-17 20:40
+
+from django.db import migrations, models
+
+from app_maps.geohash import encode
+
+
+def fill_geohash(apps, schema_editor):
+    Incident = apps.get_model('app_maps', 'Incident')
+    incidents = Incident.objects.only('id_incident', 'latitude', 'longitude')
+    batch = []
+    for incident in incidents.iterator(chunk_size=2000):
+        incident.geohash = encode(incident.latitude, incident.longitude)
+        batch.append(incident)
+        if len(batch) >= 2000:
+            Incident.objects.bulk_update(batch, ['geohash'])
+            batch = []
+    if batch:
+        Incident.objects.bulk_update(batch, ['geohash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_maps', '0005_incidentstate_color'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='incident',
+            name='geohash',
+            field=models.CharField(blank=True, db_column='geohash', db_index=True, default='', editable=False, help_text='Geohash of the coordinates, used for viewport queries', max_length=12, verbose_name='Geohash'),
+        ),
+        migrations.RunPython(fill_geohash, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-17 20:43
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_maps', '0006_incident_geohash'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='incident',
+            options={'ordering': ['-registration_date', '-id_incident'], 'verbose_name': 'Incident', 'verbose_name_plural': 'Incidents'},
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.5 on 2026-10-17 20:47
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+# El vector se mantiene en la base de datos para cubrir cualquier escritura
+# (save, bulk_create, update). El trigger solo se ejecuta cuando cambian summary
+# o reference, no en cada actualización (updated_at, estado, cierre, geohash).
+# Solo aplica en PostgreSQL; en otros motores la búsqueda usa icontains
+# (ver IncidentService.filter_by_text).
+CREATE_SEARCH_SQL = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    """
+    CREATE OR REPLACE FUNCTION incident_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('spanish', unaccent(coalesce(NEW.summary, ''))), 'A') ||
+            setweight(to_tsvector('spanish', unaccent(coalesce(NEW.reference, ''))), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER incident_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF summary, reference ON incident
+    FOR EACH ROW EXECUTE FUNCTION incident_search_vector_update()
+    """,
+    # Recalcular el vector de los incidentes existentes (el trigger se encarga)
+    "UPDATE incident SET summary = summary",
+    "CREATE INDEX incident_search_vector_idx ON incident USING GIN (search_vector)",
+]
+
+DROP_SEARCH_SQL = [
+    "DROP INDEX IF EXISTS incident_search_vector_idx",
+    "DROP TRIGGER IF EXISTS incident_search_vector_trigger ON incident",
+    "DROP FUNCTION IF EXISTS incident_search_vector_update()",
+]
+
+
+def create_search_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for statement in CREATE_SEARCH_SQL:
+        schema_editor.execute(statement)
+
+
+def drop_search_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for statement in DROP_SEARCH_SQL:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_maps', '0007_incident_ordering_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='incident',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(db_column='search_vector', editable=False, null=True, verbose_name='Search Vector'),
+        ),
+        migrations.RunPython(create_search_trigger, drop_search_trigger),
+    ]
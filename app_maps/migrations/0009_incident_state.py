@@ -0,0 +1,46 @@
+# Generated by Django 5.2.5 on 2026-10-17 20:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+DEFAULT_STATES = [
+    (1, 'Presentado', '#dc3545'),
+    (2, 'En proceso', '#ffc107'),
+    (3, 'Resuelto', '#28a745'),
+]
+
+
+def create_states(apps, schema_editor):
+    """Garantiza que existan los estados usados por Incident.save"""
+    IncidentState = apps.get_model('app_maps', 'IncidentState')
+    for id_state, description, color in DEFAULT_STATES:
+        IncidentState.objects.get_or_create(
+            id_state=id_state,
+            defaults={'description': description, 'color': color}
+        )
+
+
+def fill_state(apps, schema_editor):
+    """Mismas reglas que Incident.compute_state_id"""
+    Incident = apps.get_model('app_maps', 'Incident')
+    Incident.objects.filter(is_closed=True).update(state_id=3)
+    Incident.objects.filter(is_closed=False, priority__isnull=False).update(state_id=2)
+    Incident.objects.filter(is_closed=False, priority__isnull=True).update(state_id=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_maps', '0008_incident_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_states, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='incident',
+            name='state',
+            field=models.ForeignKey(db_column='id_state', default=1, help_text='Derived from is_closed and priority on every save', on_delete=django.db.models.deletion.PROTECT, related_name='incidents', to='app_maps.incidentstate', verbose_name='State'),
+        ),
+        migrations.RunPython(fill_state, migrations.RunPython.noop),
+    ]
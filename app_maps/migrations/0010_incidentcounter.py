@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-17 20:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_maps', '0009_incident_state'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IncidentCounter',
+            fields=[
+                ('id_counter', models.BigAutoField(db_column='id_counter', primary_key=True, serialize=False)),
+                ('dimension', models.CharField(choices=[('total', 'Total'), ('state', 'State'), ('category', 'Category'), ('day', 'Registration Day')], db_column='dimension', max_length=20, verbose_name='Dimension')),
+                ('key', models.CharField(blank=True, db_column='key', help_text='State id, category id or date (YYYY-MM-DD) depending on the dimension', max_length=50, verbose_name='Key')),
+                ('count', models.BigIntegerField(db_column='count', default=0, verbose_name='Count')),
+            ],
+            options={
+                'verbose_name': 'Incident Counter',
+                'verbose_name_plural': 'Incident Counters',
+                'db_table': 'incident_counter',
+                'constraints': [models.UniqueConstraint(fields=('dimension', 'key'), name='incident_counter_dimension_key_uniq')],
+            },
+        ),
+    ]
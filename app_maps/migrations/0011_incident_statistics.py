@@ -0,0 +1,87 @@
+# Generated by Django 5.2.5 on 2026-10-17 20:51
+
+import bisect
+from collections import Counter
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+# Copia de IncidentStatisticsService.CLOSE_TIME_BUCKETS al crear esta migración
+CLOSE_TIME_BUCKETS = [1, 2, 4, 8, 12, 24, 48, 72, 120, 168, 336, 720, 1440, 2160, 4320, 8760]
+
+
+def fill_statistics(apps, schema_editor):
+    # Los rollups se actualizan por diferencias desde esta migración: sin los
+    # incidentes existentes, actualizar o cerrar uno crearía filas negativas.
+    # Copia fija de IncidentStatisticsService.rebuild con los modelos históricos.
+    Incident = apps.get_model('app_maps', 'Incident')
+    IncidentDailyStatistic = apps.get_model('app_maps', 'IncidentDailyStatistic')
+    IncidentCloseTimeStatistic = apps.get_model('app_maps', 'IncidentCloseTimeStatistic')
+
+    daily = Incident.objects.annotate(
+        day=TruncDate('registration_date', tzinfo=timezone.get_current_timezone())
+    ).values_list('day', 'category_id', 'state_id').annotate(count=models.Count('id_incident')).order_by()
+    IncidentDailyStatistic.objects.bulk_create([
+        IncidentDailyStatistic(day=day, category_id=category_id, state_id=state_id, registered=count)
+        for day, category_id, state_id, count in daily
+    ], batch_size=1000)
+
+    close_times = Counter()
+    closed_incidents = Incident.objects.filter(
+        is_closed=True, closure_date__isnull=False
+    ).values_list('registration_date', 'closure_date', 'category_id')
+    for registration_date, closure_date, category_id in closed_incidents.iterator(chunk_size=5000):
+        hours = max((closure_date - registration_date).total_seconds(), 0) / 3600
+        close_times[(
+            timezone.localdate(closure_date), category_id, bisect.bisect_left(CLOSE_TIME_BUCKETS, hours)
+        )] += 1
+    IncidentCloseTimeStatistic.objects.bulk_create([
+        IncidentCloseTimeStatistic(day=day, category_id=category_id, bucket=bucket, closed=count)
+        for (day, category_id, bucket), count in close_times.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_maps', '0010_incidentcounter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IncidentCloseTimeStatistic',
+            fields=[
+                ('id_statistic', models.BigAutoField(db_column='id_statistic', primary_key=True, serialize=False)),
+                ('day', models.DateField(db_column='day', help_text='Local closure date', verbose_name='Day')),
+                ('bucket', models.SmallIntegerField(db_column='bucket', help_text='Index of the time-to-close bucket (see IncidentStatisticsService.CLOSE_TIME_BUCKETS)', verbose_name='Bucket')),
+                ('closed', models.IntegerField(db_column='closed', default=0, verbose_name='Closed')),
+                ('category', models.ForeignKey(db_column='id_category', on_delete=django.db.models.deletion.CASCADE, to='app_maps.incidentcategory', verbose_name='Category')),
+            ],
+            options={
+                'verbose_name': 'Incident Close Time Statistic',
+                'verbose_name_plural': 'Incident Close Time Statistics',
+                'db_table': 'incident_close_time_statistic',
+                'constraints': [models.UniqueConstraint(fields=('day', 'category', 'bucket'), name='incident_close_time_statistic_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='IncidentDailyStatistic',
+            fields=[
+                ('id_statistic', models.BigAutoField(db_column='id_statistic', primary_key=True, serialize=False)),
+                ('day', models.DateField(db_column='day', help_text='Local registration date', verbose_name='Day')),
+                ('registered', models.IntegerField(db_column='registered', default=0, verbose_name='Registered')),
+                ('category', models.ForeignKey(db_column='id_category', on_delete=django.db.models.deletion.CASCADE, to='app_maps.incidentcategory', verbose_name='Category')),
+                ('state', models.ForeignKey(db_column='id_state', on_delete=django.db.models.deletion.CASCADE, to='app_maps.incidentstate', verbose_name='State')),
+            ],
+            options={
+                'verbose_name': 'Incident Daily Statistic',
+                'verbose_name_plural': 'Incident Daily Statistics',
+                'db_table': 'incident_daily_statistic',
+                'constraints': [models.UniqueConstraint(fields=('day', 'category', 'state'), name='incident_daily_statistic_uniq')],
+            },
+        ),
+        migrations.RunPython(fill_statistics, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.5 on 2026-10-17 20:54
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def fill_updated_at(apps, schema_editor):
+    # La última escritura conocida es el cierre o, si no existe, el registro
+    Incident = apps.get_model('app_maps', 'Incident')
+    Incident.objects.update(updated_at=Coalesce('closure_date', 'registration_date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_maps', '0011_incident_statistics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='incident',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_column='updated_at', db_index=True, verbose_name='Updated At'),
+        ),
+        migrations.RunPython(fill_updated_at, migrations.RunPython.noop),
+    ]
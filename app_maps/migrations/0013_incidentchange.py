@@ -0,0 +1,108 @@
+# Generated by Django 5.2.5 on 2026-10-17 20:56
+
+from django.db import migrations, models
+
+
+# Las secuencias se asignan al insertar pero se hacen visibles al confirmar: una
+# transacción lenta podría confirmar un seq menor que otro ya leído por un cliente.
+# Un trigger diferido reasigna los seq al confirmar, bajo un advisory lock que solo
+# dura el commit, así el orden de seq es el orden de confirmación.
+# Las constraint triggers son por fila: el primer disparo de la transacción
+# renumera en un solo UPDATE todas sus filas (columna tx, no está en el modelo) y
+# los siguientes encuentran su fila ya renumerada y terminan sin tomar el lock.
+# Solo aplica en PostgreSQL (en SQLite las escrituras ya son serializadas).
+CREATE_COMMIT_SEQ_SQL = [
+    "ALTER TABLE incident_change ADD COLUMN tx bigint NOT NULL DEFAULT txid_current()",
+    """
+    CREATE OR REPLACE FUNCTION incident_change_commit_seq() RETURNS trigger AS $$
+    BEGIN
+        IF NOT EXISTS (SELECT 1 FROM incident_change WHERE seq = NEW.seq) THEN
+            RETURN NULL;
+        END IF;
+        PERFORM pg_advisory_xact_lock(7197);
+        -- Los disparos siguen el orden de inserción: NEW.seq es el menor de la transacción
+        UPDATE incident_change AS change
+        SET seq = renumbered.new_seq
+        FROM (
+            SELECT pending.seq AS old_seq,
+                   nextval(pg_get_serial_sequence('incident_change', 'seq')) AS new_seq
+            FROM (
+                SELECT seq FROM incident_change
+                WHERE seq >= NEW.seq AND tx = txid_current()
+                ORDER BY seq
+            ) AS pending
+        ) AS renumbered
+        WHERE change.seq = renumbered.old_seq;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE CONSTRAINT TRIGGER incident_change_commit_seq_trigger
+    AFTER INSERT ON incident_change
+    DEFERRABLE INITIALLY DEFERRED
+    FOR EACH ROW EXECUTE FUNCTION incident_change_commit_seq()
+    """,
+]
+
+DROP_COMMIT_SEQ_SQL = [
+    "DROP TRIGGER IF EXISTS incident_change_commit_seq_trigger ON incident_change",
+    "DROP FUNCTION IF EXISTS incident_change_commit_seq()",
+    "ALTER TABLE incident_change DROP COLUMN IF EXISTS tx",
+]
+
+
+def create_commit_seq_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for statement in CREATE_COMMIT_SEQ_SQL:
+        schema_editor.execute(statement)
+
+
+def drop_commit_seq_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for statement in DROP_COMMIT_SEQ_SQL:
+        schema_editor.execute(statement)
+
+
+def seed_changes(apps, schema_editor):
+    # Un upsert por incidente existente: since=0 devuelve el conjunto completo
+    Incident = apps.get_model('app_maps', 'Incident')
+    IncidentChange = apps.get_model('app_maps', 'IncidentChange')
+    ids = Incident.objects.order_by('id_incident').values_list('id_incident', flat=True)
+    batch = []
+    for id_incident in ids.iterator(chunk_size=2000):
+        batch.append(IncidentChange(id_incident=id_incident, action='upsert'))
+        if len(batch) >= 2000:
+            IncidentChange.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        IncidentChange.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_maps', '0012_incident_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IncidentChange',
+            fields=[
+                ('seq', models.BigAutoField(db_column='seq', primary_key=True, serialize=False)),
+                ('id_incident', models.IntegerField(db_column='id_incident', db_index=True, verbose_name='Incident')),
+                ('action', models.CharField(choices=[('upsert', 'Created or updated'), ('delete', 'Deleted')], db_column='action', max_length=10, verbose_name='Action')),
+                ('changed_at', models.DateTimeField(auto_now_add=True, db_column='changed_at', verbose_name='Changed At')),
+            ],
+            options={
+                'verbose_name': 'Incident Change',
+                'verbose_name_plural': 'Incident Changes',
+                'db_table': 'incident_change',
+                'ordering': ['seq'],
+            },
+        ),
+        migrations.RunPython(seed_changes, migrations.RunPython.noop),
+        migrations.RunPython(create_commit_seq_trigger, drop_commit_seq_trigger),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-17 21:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_maps', '0013_incidentchange'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='incident',
+            index=models.Index(fields=['-registration_date', '-id_incident'], name='incident_reg_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='incident',
+            index=models.Index(fields=['category', '-registration_date', '-id_incident'], name='incident_category_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='incident',
+            index=models.Index(fields=['state', '-registration_date', '-id_incident'], name='incident_state_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='incident',
+            index=models.Index(condition=models.Q(('show_on_map', True)), fields=['-registration_date', '-id_incident'], name='incident_map_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='incident',
+            index=models.Index(condition=models.Q(('show_on_map', True)), fields=['geohash'], name='incident_map_geohash_idx', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
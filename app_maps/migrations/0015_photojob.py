@@ -0,0 +1,42 @@
+# Generated by Django 5.2.5 on 2026-10-17 21:26
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_maps', '0014_incident_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PhotoJob',
+            fields=[
+                ('id_photo_job', models.BigAutoField(db_column='id_photo_job', primary_key=True, serialize=False)),
+                ('spool_path', models.CharField(db_column='spool_path', help_text='Raw upload in PHOTO_SPOOL_DIR', max_length=500, verbose_name='Spool Path')),
+                ('name', models.CharField(db_column='name', max_length=200, verbose_name='Name')),
+                ('content_type', models.CharField(blank=True, db_column='content_type', default='', max_length=200, verbose_name='Content Type')),
+                ('file_size', models.BigIntegerField(db_column='file_size', default=0, verbose_name='File Size')),
+                ('make_miniature', models.BooleanField(db_column='make_miniature', default=False, verbose_name='Make Miniature')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('done', 'Done'), ('failed', 'Failed')], db_column='status', default='pending', max_length=20, verbose_name='Status')),
+                ('attempts', models.PositiveIntegerField(db_column='attempts', default=0, verbose_name='Attempts')),
+                ('available_at', models.DateTimeField(db_column='available_at', default=django.utils.timezone.now, verbose_name='Available At')),
+                ('leased_until', models.DateTimeField(blank=True, db_column='leased_until', null=True, verbose_name='Leased Until')),
+                ('leased_by', models.CharField(blank=True, db_column='leased_by', max_length=100, null=True, verbose_name='Leased By')),
+                ('last_error', models.TextField(blank=True, db_column='last_error', null=True, verbose_name='Last Error')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_column='created_at', verbose_name='Created At')),
+                ('incident', models.ForeignKey(db_column='id_incident', on_delete=django.db.models.deletion.CASCADE, related_name='photo_jobs', to='app_maps.incident', verbose_name='Incident')),
+                ('photography', models.ForeignKey(blank=True, db_column='id_photography', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='app_maps.photography', verbose_name='Photography')),
+            ],
+            options={
+                'verbose_name': 'Photo Job',
+                'verbose_name_plural': 'Photo Jobs',
+                'db_table': 'photo_job',
+                'ordering': ['id_photo_job'],
+                'indexes': [models.Index(fields=['status', 'available_at'], name='photo_job_status_idx')],
+            },
+        ),
+    ]
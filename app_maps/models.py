@@ -1,8 +1,12 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import RegexValidator
+from django.utils import timezone
 from decimal import Decimal
 
+from app_maps.geohash import encode as encode_geohash
+
 
 class IncidentCategory(models.Model):
     """Incident category: traffic accidents, broken traffic light, damaged pavement, etc."""
@@ -110,6 +114,17 @@ class Incident(models.Model):
         verbose_name="Longitude",
         db_column='longitude'
     )
+    geohash = models.CharField(
+        max_length=12,
+        null=False,
+        blank=True,
+        default='',
+        db_index=True,
+        editable=False,
+        verbose_name="Geohash",
+        help_text="Geohash of the coordinates, used for viewport queries",
+        db_column='geohash'
+    )
     summary = models.TextField(
         null=False, 
         blank=False, 
@@ -142,6 +157,16 @@ class Incident(models.Model):
         verbose_name="Incident Closed",
         db_column='is_closed'
     )
+    state = models.ForeignKey(
+        'IncidentState',
+        on_delete=models.PROTECT,
+        null=False,
+        default=1,  # IncidentState.PRESENTED
+        related_name='incidents',
+        verbose_name="State",
+        help_text="Derived from is_closed and priority on every save",
+        db_column='id_state'
+    )
     
     # Fields for inspectors
     inspector = models.ForeignKey(
@@ -231,23 +256,79 @@ class Incident(models.Model):
         verbose_name="Closure User",
         db_column='closure_user_id'
     )
+
+    # Fecha de la última escritura (incluye cambios de fotografías); validador para GET condicional
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+        verbose_name="Updated At",
+        db_column='updated_at'
+    )
+
+    # Búsqueda de texto completo (PostgreSQL): mantenido por un trigger sobre summary y reference
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        verbose_name="Search Vector",
+        db_column='search_vector'
+    )
     
     class Meta:
         verbose_name = "Incident"
         verbose_name_plural = "Incidents"
         db_table = "incident"
-        ordering = ['-registration_date']
+        ordering = ['-registration_date', '-id_incident']
+        # Índices para el orden del listado (paginación por cursor) combinado con
+        # los filtros públicos; ver QueryPlanTests en app_maps/tests.py
+        indexes = [
+            models.Index(fields=['-registration_date', '-id_incident'], name='incident_reg_date_idx'),
+            models.Index(fields=['category', '-registration_date', '-id_incident'], name='incident_category_date_idx'),
+            models.Index(fields=['state', '-registration_date', '-id_incident'], name='incident_state_date_idx'),
+            models.Index(
+                fields=['-registration_date', '-id_incident'],
+                name='incident_map_date_idx',
+                condition=models.Q(show_on_map=True),
+            ),
+            # varchar_pattern_ops: los filtros por prefijo (LIKE 'abc%') solo usan un
+            # btree normal si la base de datos tiene intercalación C
+            models.Index(
+                fields=['geohash'],
+                name='incident_map_geohash_idx',
+                condition=models.Q(show_on_map=True),
+                opclasses=['varchar_pattern_ops'],
+            ),
+        ]
     
     def __str__(self):
         return f"Incident #{self.id_incident} - {self.category.description} - {self.registration_date.strftime('%d/%m/%Y')}"
     
     def save(self, *args, **kwargs):
-        """Override save to set show_on_map based on user type"""
+        """Override save to set show_on_map based on user type and keep geohash and state in sync"""
         if self.user_type == '1':  # Inspector
             self.show_on_map = True
         elif self.user_type == '2':  # Citizen
             self.show_on_map = False
+        # Mantener sincronizados el geohash y el estado con los campos de los que dependen
+        self.geohash = encode_geohash(self.latitude, self.longitude)
+        self.state_id = self.compute_state_id()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if {'latitude', 'longitude'} & update_fields:
+                update_fields.add('geohash')
+            if {'is_closed', 'priority'} & update_fields:
+                update_fields.add('state')
+            update_fields.add('updated_at')
+            kwargs['update_fields'] = update_fields
         super().save(*args, **kwargs)
+
+    def compute_state_id(self):
+        """Returns the state id derived from is_closed and priority"""
+        if self.is_closed:
+            return IncidentState.RESOLVED
+        if self.priority_id is not None:
+            return IncidentState.IN_PROGRESS
+        return IncidentState.PRESENTED
     
     @property
     def coordinates(self):
@@ -371,6 +452,12 @@ class Attachment(models.Model):
 
 class IncidentState(models.Model):
     """Incident state: Presentado, En proceso, Resuelto, etc."""
+
+    # States assigned by Incident.save
+    PRESENTED = 1
+    IN_PROGRESS = 2
+    RESOLVED = 3
+
     # Primary Key: IdCategory -> id_category (column name in DB)
     id_state = models.AutoField(primary_key=True, db_column='id_state')
     description = models.CharField(
@@ -396,3 +483,246 @@ class IncidentState(models.Model):
     
     def __str__(self):
         return self.description
+
+
+class IncidentCounter(models.Model):
+    """Pre-computed incident counts per dimension (total, state, category, day)"""
+
+    DIMENSION_CHOICES = [
+        ('total', 'Total'),
+        ('state', 'State'),
+        ('category', 'Category'),
+        ('day', 'Registration Day'),
+    ]
+
+    id_counter = models.BigAutoField(primary_key=True, db_column='id_counter')
+    dimension = models.CharField(
+        max_length=20,
+        choices=DIMENSION_CHOICES,
+        null=False,
+        verbose_name="Dimension",
+        db_column='dimension'
+    )
+    key = models.CharField(
+        max_length=50,
+        null=False,
+        blank=True,
+        verbose_name="Key",
+        help_text="State id, category id or date (YYYY-MM-DD) depending on the dimension",
+        db_column='key'
+    )
+    count = models.BigIntegerField(
+        default=0,
+        verbose_name="Count",
+        db_column='count'
+    )
+
+    class Meta:
+        verbose_name = "Incident Counter"
+        verbose_name_plural = "Incident Counters"
+        db_table = "incident_counter"
+        constraints = [
+            models.UniqueConstraint(fields=['dimension', 'key'], name='incident_counter_dimension_key_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.dimension}:{self.key} = {self.count}"
+
+
+class IncidentDailyStatistic(models.Model):
+    """Daily rollup: incidents registered per day, category and current state"""
+    id_statistic = models.BigAutoField(primary_key=True, db_column='id_statistic')
+    day = models.DateField(
+        null=False,
+        verbose_name="Day",
+        help_text="Local registration date",
+        db_column='day'
+    )
+    category = models.ForeignKey(
+        IncidentCategory,
+        on_delete=models.CASCADE,
+        null=False,
+        verbose_name="Category",
+        db_column='id_category'
+    )
+    state = models.ForeignKey(
+        IncidentState,
+        on_delete=models.CASCADE,
+        null=False,
+        verbose_name="State",
+        db_column='id_state'
+    )
+    registered = models.IntegerField(
+        default=0,
+        verbose_name="Registered",
+        db_column='registered'
+    )
+
+    class Meta:
+        verbose_name = "Incident Daily Statistic"
+        verbose_name_plural = "Incident Daily Statistics"
+        db_table = "incident_daily_statistic"
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'category', 'state'], name='incident_daily_statistic_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} - {self.category_id} - {self.state_id}: {self.registered}"
+
+
+class IncidentCloseTimeStatistic(models.Model):
+    """Daily rollup: closed incidents per closure day, category and time-to-close bucket"""
+    id_statistic = models.BigAutoField(primary_key=True, db_column='id_statistic')
+    day = models.DateField(
+        null=False,
+        verbose_name="Day",
+        help_text="Local closure date",
+        db_column='day'
+    )
+    category = models.ForeignKey(
+        IncidentCategory,
+        on_delete=models.CASCADE,
+        null=False,
+        verbose_name="Category",
+        db_column='id_category'
+    )
+    bucket = models.SmallIntegerField(
+        null=False,
+        verbose_name="Bucket",
+        help_text="Index of the time-to-close bucket (see IncidentStatisticsService.CLOSE_TIME_BUCKETS)",
+        db_column='bucket'
+    )
+    closed = models.IntegerField(
+        default=0,
+        verbose_name="Closed",
+        db_column='closed'
+    )
+
+    class Meta:
+        verbose_name = "Incident Close Time Statistic"
+        verbose_name_plural = "Incident Close Time Statistics"
+        db_table = "incident_close_time_statistic"
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'category', 'bucket'], name='incident_close_time_statistic_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} - {self.category_id} - bucket {self.bucket}: {self.closed}"
+
+
+class IncidentChange(models.Model):
+    """Append-only log of incident writes, read by clients to sync incrementally"""
+
+    # En PostgreSQL seq se reasigna al confirmar (ver 0013_incidentchange, que
+    # agrega la columna tx fuera del modelo)
+
+    ACTION_UPSERT = 'upsert'
+    ACTION_DELETE = 'delete'
+
+    ACTION_CHOICES = [
+        (ACTION_UPSERT, 'Created or updated'),
+        (ACTION_DELETE, 'Deleted'),
+    ]
+
+    seq = models.BigAutoField(primary_key=True, db_column='seq')
+    # Sin clave foránea: la fila debe sobrevivir a la eliminación del incidente
+    id_incident = models.IntegerField(
+        db_index=True,
+        verbose_name="Incident",
+        db_column='id_incident'
+    )
+    action = models.CharField(
+        max_length=10,
+        choices=ACTION_CHOICES,
+        verbose_name="Action",
+        db_column='action'
+    )
+    changed_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Changed At",
+        db_column='changed_at'
+    )
+
+    class Meta:
+        verbose_name = "Incident Change"
+        verbose_name_plural = "Incident Changes"
+        db_table = "incident_change"
+        ordering = ['seq']
+
+    def __str__(self):
+        return f"#{self.seq} {self.action} incident {self.id_incident}"
+
+
+class PhotoJob(models.Model):
+    """
+    Photo waiting to be optimized and uploaded to R2 by `manage.py process_photo_jobs`.
+    The raw upload is kept in PHOTO_SPOOL_DIR until the job finishes.
+    """
+
+    STATUS_PENDING = 'pending'
+    STATUS_PROCESSING = 'processing'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_PROCESSING, 'Processing'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    id_photo_job = models.BigAutoField(primary_key=True, db_column='id_photo_job')
+    incident = models.ForeignKey(
+        Incident,
+        on_delete=models.CASCADE,
+        related_name='photo_jobs',
+        verbose_name="Incident",
+        db_column='id_incident'
+    )
+    spool_path = models.CharField(
+        max_length=500,
+        verbose_name="Spool Path",
+        help_text="Raw upload in PHOTO_SPOOL_DIR",
+        db_column='spool_path'
+    )
+    name = models.CharField(max_length=200, verbose_name="Name", db_column='name')
+    content_type = models.CharField(max_length=200, blank=True, default='', verbose_name="Content Type", db_column='content_type')
+    file_size = models.BigIntegerField(default=0, verbose_name="File Size", db_column='file_size')
+    # La primera fotografía del incidente genera también la miniatura
+    make_miniature = models.BooleanField(default=False, verbose_name="Make Miniature", db_column='make_miniature')
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING,
+        verbose_name="Status",
+        db_column='status'
+    )
+    attempts = models.PositiveIntegerField(default=0, verbose_name="Attempts", db_column='attempts')
+    # Un trabajo se puede tomar cuando está pendiente y available_at ya pasó
+    # (reintentos con espera), o cuando está en proceso y su lease venció
+    available_at = models.DateTimeField(default=timezone.now, verbose_name="Available At", db_column='available_at')
+    leased_until = models.DateTimeField(null=True, blank=True, verbose_name="Leased Until", db_column='leased_until')
+    leased_by = models.CharField(max_length=100, null=True, blank=True, verbose_name="Leased By", db_column='leased_by')
+    last_error = models.TextField(null=True, blank=True, verbose_name="Last Error", db_column='last_error')
+    photography = models.ForeignKey(
+        'Photography',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name="Photography",
+        db_column='id_photography'
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Created At", db_column='created_at')
+
+    class Meta:
+        verbose_name = "Photo Job"
+        verbose_name_plural = "Photo Jobs"
+        db_table = "photo_job"
+        ordering = ['id_photo_job']
+        indexes = [
+            models.Index(fields=['status', 'available_at'], name='photo_job_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"Photo job #{self.id_photo_job} ({self.status}) - Incident #{self.incident_id}"
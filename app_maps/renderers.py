@@ -0,0 +1,68 @@
+"""
+Renderers for the app_maps API
+"""
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson es opcional
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer que codifica con orjson cuando está instalado.
+
+    Produce los mismos bytes que JSONRenderer en su modo por defecto (compacto
+    y UTF-8): las fechas, Decimal y demás tipos no nativos se convierten con el
+    mismo JSONEncoder de DRF. Si orjson no está disponible, si se pide
+    indentación o si orjson no puede codificar los datos, delega en JSONRenderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent is not None or not self.compact or self.ensure_ascii:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        return dumps(data) or super().render(data, accepted_media_type, renderer_context)
+
+
+_encoder = JSONEncoder()
+
+# Mismas opciones que JSONRenderer por defecto (compacto y UTF-8)
+_compact_encoder = JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+
+def dumps(data):
+    """
+    Codifica `data` igual que JSONRenderer (compacto y UTF-8) usando orjson.
+
+    Returns:
+        bytes, o None si orjson no está instalado o no puede codificar los datos
+    """
+    if orjson is None:
+        return None
+    try:
+        content = orjson.dumps(
+            data,
+            default=_encoder.default,
+            # Las fechas pasan por el encoder de DRF para conservar su formato
+            option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+        )
+    except TypeError:
+        # Por ejemplo enteros de más de 64 bits
+        return None
+    # JSONRenderer escapa estos separadores para que la salida sea JavaScript válido
+    return content.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+def encode_json(data) -> bytes:
+    """Codifica `data` igual que JSONRenderer, con orjson si está disponible"""
+    content = dumps(data)
+    if content is None:
+        content = _compact_encoder.encode(data).replace('\u2028', '\\u2028').replace('\u2029', '\\u2029').encode('utf-8')
+    return content
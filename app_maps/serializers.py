@@ -1,3 +1,7 @@
+from decimal import Decimal
+
+from django.conf import settings
+from django.utils import timezone
 from rest_framework import serializers
 from .models import (
     IncidentCategory, 
@@ -60,6 +64,11 @@ class IncidentSerializer(serializers.ModelSerializer):
     closure_type_name = serializers.CharField(source='closure_type.description', read_only=True)
     inspector_username = serializers.CharField(source='inspector.username', read_only=True)
     closure_user_username = serializers.CharField(source='closure_user.username', read_only=True)
+
+    # Estado persistido en Incident.state
+    id_state = serializers.IntegerField(source='state_id', read_only=True)
+    description_state = serializers.CharField(source='state.description', read_only=True)
+    color_state = serializers.CharField(source='state.color', read_only=True)
     
     # Incluir fotografías relacionadas
     photographs = PhotographySerializer(many=True, read_only=True)
@@ -74,7 +83,8 @@ class IncidentSerializer(serializers.ModelSerializer):
             'priority', 'priority_name', 'derivation_document',
             'closure_type', 'closure_type_name', 'closure_description',
             'closure_date', 'closure_user', 'closure_user_username',
-            'photographs'  # Añadir el campo de fotografías
+            'photographs',  # Añadir el campo de fotografías
+            'id_state', 'description_state', 'color_state'
         ]
 
 
@@ -106,4 +116,107 @@ class IncidentPrioritySerializer(serializers.ModelSerializer):
     """Serializer for IncidentPriority model"""
     class Meta:
         model = IncidentPriority
-        fields = ['id_priority', 'description']
\ No newline at end of file
+        fields = ['id_priority', 'description']
+
+# Serialización directa (sin ModelSerializer) para los listados de incidentes.
+# Produce exactamente la misma salida que IncidentSerializer y PhotographySerializer;
+# la paridad se comprueba en app_maps/tests.py (SerializerParityTests).
+
+_LATITUDE_QUANTUM = Decimal(1).scaleb(-Incident._meta.get_field('latitude').decimal_places)
+_LONGITUDE_QUANTUM = Decimal(1).scaleb(-Incident._meta.get_field('longitude').decimal_places)
+
+
+def _format_datetime(value, tz):
+    """Igual que DateTimeField.to_representation con DATETIME_FORMAT = ISO 8601"""
+    if not value:
+        return None
+    if tz is not None:
+        value = value.astimezone(tz) if timezone.is_aware(value) else timezone.make_aware(value, tz)
+    value = value.isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+def _format_decimal(value, quantum):
+    """Igual que DecimalField.to_representation con COERCE_DECIMAL_TO_STRING"""
+    if value is None:
+        return None
+    if not isinstance(value, Decimal):
+        value = Decimal(str(value).strip())
+    return '{:f}'.format(value.quantize(quantum))
+
+
+def _current_timezone():
+    return timezone.get_current_timezone() if settings.USE_TZ else None
+
+
+def serialize_photography(photography, tz=None):
+    """Equivalente a PhotographySerializer(photography).data"""
+    return {
+        'id_photography': photography.id_photography,
+        'name': photography.name,
+        'content_type': photography.content_type,
+        'file_size': photography.file_size,
+        'r2_key': photography.r2_key,
+        'upload_date': _format_datetime(photography.upload_date, tz),
+    }
+
+
+def serialize_incident(incident, tz=None):
+    """
+    Equivalente a IncidentSerializer(incident).data. Espera las relaciones
+    cargadas con IncidentService.get_incidents_queryset.
+    """
+    data = {
+        'id_incident': incident.id_incident,
+        'registration_date': _format_datetime(incident.registration_date, tz),
+        'category': incident.category_id,
+        'category_name': incident.category.description,
+        'latitude': _format_decimal(incident.latitude, _LATITUDE_QUANTUM),
+        'longitude': _format_decimal(incident.longitude, _LONGITUDE_QUANTUM),
+        'summary': incident.summary,
+        'reference': incident.reference,
+        'show_on_map': incident.show_on_map,
+        'user_type': incident.user_type,
+        'is_closed': incident.is_closed,
+        'inspector': incident.inspector_id,
+    }
+    # Los campos *_name / *_username de relaciones nulas no se incluyen (igual que DRF)
+    if incident.inspector is not None:
+        data['inspector_username'] = incident.inspector.username
+    data.update({
+        'citizen_name': incident.citizen_name,
+        'citizen_lastname': incident.citizen_lastname,
+        'citizen_phone': incident.citizen_phone,
+        'citizen_email': incident.citizen_email,
+        'priority': incident.priority_id,
+    })
+    if incident.priority is not None:
+        data['priority_name'] = incident.priority.description
+    data.update({
+        'derivation_document': incident.derivation_document,
+        'closure_type': incident.closure_type_id,
+    })
+    if incident.closure_type is not None:
+        data['closure_type_name'] = incident.closure_type.description
+    data.update({
+        'closure_description': incident.closure_description,
+        'closure_date': _format_datetime(incident.closure_date, tz),
+        'closure_user': incident.closure_user_id,
+    })
+    if incident.closure_user is not None:
+        data['closure_user_username'] = incident.closure_user.username
+    data.update({
+        'photographs': [serialize_photography(photography, tz) for photography in incident.photographs.all()],
+        'id_state': incident.state_id,
+        'description_state': incident.state.description,
+        'color_state': incident.state.color,
+    })
+    return data
+
+
+def serialize_incident_list(incidents):
+    """Equivalente a IncidentSerializer(incidents, many=True).data"""
+    tz = _current_timezone()
+    return [serialize_incident(incident, tz) for incident in incidents]
@@ -1,26 +1,28 @@
 from app_maps.models import IncidentCategory
 from app_maps.serializers import IncidentCategorySerializer
+from app_maps.services.reference_data import ReferenceDataCache
 
 class CategoryService:
-    # def __init__(self):
-    #     categories = IncidentCategory.objects.all()
-    #     serializer = IncidentCategorySerializer(categories, many=True)
-        
-    
+
     def get_category_by_id(self, id: int):
-        category = IncidentCategory.objects.get(id_category=id)
-        serializer = IncidentCategorySerializer(category)
-        return serializer.data
+        # Un id no numérico se trata como inexistente, igual que un id sin registro
+        try:
+            category = {row['id_category']: row for row in self.get_all_categories()}.get(int(id))
+        except (TypeError, ValueError):
+            category = None
+        if category is None:
+            raise IncidentCategory.DoesNotExist(f"Category with ID {id} not found")
+        return category
     
     def get_category_by_active(self, is_active: bool):
         """Get by ctive categories"""
-        categories = IncidentCategory.objects.filter(is_active=is_active)
-        serializer = IncidentCategorySerializer(categories, many=True)
-        return serializer.data
+        return [category for category in self.get_all_categories() if category['is_active'] == is_active]
     
     def get_all_categories(self):
-        """Get all categories"""
+        """Get all categories (cached, see ReferenceDataCache)"""
+        return ReferenceDataCache().get('categories', self._load_categories)
+
+    def _load_categories(self):
         categories = IncidentCategory.objects.all()
         serializer = IncidentCategorySerializer(categories, many=True)
         return serializer.data
-    
\ No newline at end of file
@@ -1,22 +1,64 @@
 import boto3
+from botocore.config import Config
 from django.conf import settings
 import os
+import threading
+import uuid
 from datetime import datetime
 from typing import Dict, Any, Optional
 
+from app_maps.metrics import R2_LATENCY, timed
+
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def build_r2_client():
+    """Crea un cliente S3 para Cloudflare R2 con el pool, timeouts y reintentos de settings"""
+    # Cada cliente usa su propia sesión: las sesiones de boto3 no son thread-safe
+    return boto3.session.Session().client(
+        's3',
+        endpoint_url=settings.R2_ENDPOINT_URL,
+        aws_access_key_id=settings.R2_ACCESS_KEY_ID,
+        aws_secret_access_key=settings.R2_SECRET_ACCESS_KEY,
+        region_name='auto',
+        config=Config(
+            max_pool_connections=settings.R2_MAX_POOL_CONNECTIONS,
+            connect_timeout=settings.R2_CONNECT_TIMEOUT,
+            read_timeout=settings.R2_READ_TIMEOUT,
+            retries={'total_max_attempts': settings.R2_MAX_ATTEMPTS, 'mode': 'adaptive'},
+        ),
+    )
+
+
+def get_r2_client():
+    """
+    Cliente de R2 compartido por el proceso, creado la primera vez que se usa.
+
+    Los clientes de boto3 son thread-safe y mantienen un pool de conexiones
+    HTTP, así que reutilizarlo evita crear el cliente (decenas de ms) y abrir
+    una conexión TLS nueva en cada operación. Si el proceso se bifurca
+    (workers de gunicorn) se crea otro cliente: el pool no se comparte entre procesos.
+    """
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is None or _client_pid != pid:
+        with _client_lock:
+            if _client is None or _client_pid != pid:
+                _client = build_r2_client()
+                _client_pid = pid
+    return _client
+
+
 class CloudflareService:
     
     def __init__(self):
         """
-        Inicializa el cliente S3 para Cloudflare R2
+        Usa el cliente S3 compartido para Cloudflare R2
         """
-        self.s3_client = boto3.client(
-            's3',
-            endpoint_url=settings.R2_ENDPOINT_URL,
-            aws_access_key_id=settings.R2_ACCESS_KEY_ID,
-            aws_secret_access_key=settings.R2_SECRET_ACCESS_KEY,
-            region_name='auto'
-        )
+        self.s3_client = get_r2_client()
         self.bucket_name = settings.R2_BUCKET_NAME
 
     def upload_file(self, file_path: str, id_incident: str, content_type: str, name_key: str = None) -> Dict[str, Any]:
@@ -32,22 +74,51 @@ class CloudflareService:
             Dict[str, Any]: Diccionario con la key del archivo en R2
         """
         try:
-            # Generar un nombre único para el archivo   
+            with open(file_path, 'rb') as file:
+                return self.upload_fileobj(file, id_incident, content_type, name_key, os.path.splitext(file_path)[1])
+        except Exception as e:
+            return {
+                'r2_key': None,
+                'success': False,
+                'error': str(e)
+            }
+
+    def upload_fileobj(self, file, id_incident: str, content_type: str, name_key: str = None,
+                       file_extension: str = '') -> Dict[str, Any]:
+        """
+        Sube un objeto tipo archivo (por ejemplo, una imagen optimizada en memoria)
+        a Cloudflare R2 sin pasar por un archivo temporal.
+
+        Es seguro llamarlo desde varios hilos: el cliente es compartido y la key
+        generada incluye un uuid, así que dos subidas simultáneas no colisionan.
+
+        Args:
+            file: Objeto con read() posicionado al inicio
+            id_incident (str): ID de incidencia para organizar en carpetas
+            content_type (str): Tipo de contenido del archivo
+            name_key (str): Nombre fijo dentro de la carpeta del incidente (por ejemplo, 'miniature.jpg')
+            file_extension (str): Extensión de la key generada cuando no se indica name_key
+
+        Returns:
+            Dict[str, Any]: Diccionario con la key del archivo en R2
+        """
+        try:
+            # Generar un nombre único para el archivo: la marca de tiempo mantiene
+            # el orden y el uuid evita colisiones dentro del mismo segundo
             if name_key:
                 r2_key = f"incidents/{id_incident}/{name_key}"
-            else:         
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')            
-                file_extension = os.path.splitext(file_path)[1]            
-                r2_key = f"incidents/{id_incident}/{timestamp}{file_extension}"                
+            else:
+                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+                r2_key = f"incidents/{id_incident}/{timestamp}_{uuid.uuid4().hex}{file_extension}"
 
             # Subir el archivo
-            with open(file_path, 'rb') as file:
+            with timed(R2_LATENCY, 'upload'):
                 self.s3_client.upload_fileobj(
                     file,
                     self.bucket_name,
                     r2_key,
                     ExtraArgs={'ContentType': content_type}
-                )   
+                )
 
             return {
                 'r2_key': r2_key,
@@ -72,10 +143,11 @@ class CloudflareService:
             Dict[str, Any]: Resultado de la operación
         """
         try:
-            self.s3_client.delete_object(
-                Bucket=self.bucket_name,
-                Key=r2_key
-            )
+            with timed(R2_LATENCY, 'delete'):
+                self.s3_client.delete_object(
+                    Bucket=self.bucket_name,
+                    Key=r2_key
+                )
             
             return {
                 'success': True,
@@ -104,11 +176,12 @@ class CloudflareService:
             if not self.file_exists(r2_key):
                 return None
 
-            url = self.s3_client.generate_presigned_url(
-                'get_object',
-                Params={'Bucket': self.bucket_name, 'Key': r2_key},
-                ExpiresIn=expiration
-            )
+            with timed(R2_LATENCY, 'presign'):
+                url = self.s3_client.generate_presigned_url(
+                    'get_object',
+                    Params={'Bucket': self.bucket_name, 'Key': r2_key},
+                    ExpiresIn=expiration
+                )
 
             return url
             
@@ -127,7 +200,8 @@ class CloudflareService:
             bool: True si el archivo existe, False en caso contrario
         """
         try:
-            self.s3_client.head_object(Bucket=self.bucket_name, Key=r2_key)
+            with timed(R2_LATENCY, 'head'):
+                self.s3_client.head_object(Bucket=self.bucket_name, Key=r2_key)
             return True
         except:
             return False
@@ -139,8 +213,9 @@ class CloudflareService:
         Obtiene un blob del archivo en R2.
         """
         try:
-            response = self.s3_client.get_object(Bucket=self.bucket_name, Key=r2_key)
-            return response['Body'].read()
+            with timed(R2_LATENCY, 'get'):
+                response = self.s3_client.get_object(Bucket=self.bucket_name, Key=r2_key)
+                return response['Body'].read()
         except Exception as e:
             print(f"Error obteniendo blob: {str(e)}")
             return None
\ No newline at end of file
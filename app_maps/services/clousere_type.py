@@ -1,14 +1,22 @@
 from app_maps.models import IncidentClosureType
 from app_maps.serializers import IncidentClosureTypeSerializer
+from app_maps.services.reference_data import ReferenceDataCache
 
 class ClosureTypeService:
     
     def get_closure_type_by_id(self, id: int):
-        closure_type = IncidentClosureType.objects.get(id=id)
-        serializer = IncidentClosureTypeSerializer(closure_type)
-        return serializer.data
+        try:
+            closure_type = {row['id_closure_type']: row for row in self.get_all_closure_types()}.get(int(id))
+        except (TypeError, ValueError):
+            closure_type = None
+        if closure_type is None:
+            raise IncidentClosureType.DoesNotExist(f"Closure type with ID {id} not found")
+        return closure_type
     
     def get_all_closure_types(self):
+        return ReferenceDataCache().get('closure_types', self._load_closure_types)
+
+    def _load_closure_types(self):
         closure_types = IncidentClosureType.objects.all().order_by('description')
         serializer = IncidentClosureTypeSerializer(closure_types, many=True)
-        return serializer.data
\ No newline at end of file
+        return serializer.data
@@ -0,0 +1,184 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Avg, Count, Min, Q
+from django.db.models.functions import Substr
+
+from app_maps import geohash
+from app_maps.models import Incident, IncidentState
+from app_maps.services.states import StateService
+
+
+# Precisión de geohash usada para agrupar según el nivel de zoom del mapa
+ZOOM_PRECISION = [
+    (3, 1),
+    (5, 2),
+    (8, 3),
+    (10, 4),
+    (13, 5),
+    (15, 6),
+    (18, 7),
+]
+MAX_PRECISION = 8
+
+# Máximo de celdas calculadas por petición
+MAX_CLUSTER_CELLS = 256
+
+CACHE_PREFIX = 'incident-clusters'
+
+# Alias de la caché propia de los clusters (ver CACHES en settings)
+CACHE_ALIAS = 'clusters'
+
+# Estados persistidos por Incident.save
+STATE_IDS = [IncidentState.PRESENTED, IncidentState.IN_PROGRESS, IncidentState.RESOLVED]
+
+
+class ClusterService:
+
+    def get_clusters(self, min_lat, min_lng, max_lat, max_lng, zoom: int, show_on_map: bool = False):
+        """
+        Agrupa los incidentes de un viewport en celdas de geohash según el zoom.
+
+        Cada celda se calcula una sola vez y se guarda en caché hasta que un
+        incidente dentro de ella cambie (ver invalidate_coordinates).
+
+        Args:
+            min_lat, min_lng, max_lat, max_lng: Viewport en grados
+            zoom: Nivel de zoom del mapa (0-22)
+            show_on_map: Si solo se agrupan los incidentes visibles en el mapa
+
+        Returns:
+            Lista de celdas con incidentes: {'cell', 'count', 'latitude',
+            'longitude', 'states'} y, si la celda contiene un único
+            incidente, 'incident' con sus datos básicos.
+        """
+        precision = self.get_precision(min_lat, min_lng, max_lat, max_lng, zoom)
+        cells = geohash.cells_in_bbox(min_lat, min_lng, max_lat, max_lng, precision, MAX_CLUSTER_CELLS)
+        scope = self._scope(show_on_map)
+
+        keys = {self._cache_key(precision, cell, scope): cell for cell in cells}
+        cache = caches[CACHE_ALIAS]
+        cached = cache.get_many(keys.keys())
+        clusters = {keys[key]: value for key, value in cached.items()}
+
+        missing = [cell for cell in cells if cell not in clusters]
+        if missing:
+            computed = self._aggregate_cells(missing, precision, show_on_map)
+            clusters.update(computed)
+            cache.set_many(
+                {self._cache_key(precision, cell, scope): computed[cell] for cell in missing},
+                timeout=getattr(settings, 'CLUSTER_CACHE_TIMEOUT', 3600)
+            )
+
+        # Las celdas vacías también se guardan en caché (como None) para no volver a consultarlas
+        states_dict = {state['id_state']: state for state in StateService().get_all_states()}
+        return [
+            self._with_state_details(cluster, states_dict)
+            for cell, cluster in sorted(clusters.items())
+            if cluster
+        ]
+
+    def get_precision(self, min_lat, min_lng, max_lat, max_lng, zoom: int):
+        """
+        Retorna la precisión de geohash para un zoom, reducida si el viewport
+        necesitaría más de MAX_CLUSTER_CELLS celdas.
+        """
+        precision = MAX_PRECISION
+        for max_zoom, zoom_precision in ZOOM_PRECISION:
+            if zoom < max_zoom:
+                precision = zoom_precision
+                break
+
+        while precision > 1 and geohash.cells_in_bbox(
+            min_lat, min_lng, max_lat, max_lng, precision, MAX_CLUSTER_CELLS
+        ) is None:
+            precision -= 1
+
+        return precision
+
+    def invalidate_coordinates(self, *coordinates):
+        """
+        Elimina de la caché las celdas (de todas las precisiones) que contienen
+        las coordenadas dadas. Recibe tuplas (latitude, longitude).
+        """
+        keys = []
+        for latitude, longitude in coordinates:
+            if latitude is None or longitude is None:
+                continue
+            point_hash = geohash.encode(latitude, longitude, MAX_PRECISION)
+            for precision in range(1, MAX_PRECISION + 1):
+                for scope in ('all', 'map'):
+                    keys.append(self._cache_key(precision, point_hash[:precision], scope))
+        if keys:
+            caches[CACHE_ALIAS].delete_many(keys)
+
+    def _aggregate_cells(self, cells, precision, show_on_map):
+        """Calcula con una sola consulta agrupada los clusters de las celdas indicadas"""
+        prefixes = Q()
+        for cell in cells:
+            prefixes |= Q(geohash__startswith=cell)
+
+        incidents = Incident.objects.filter(prefixes)
+        if show_on_map:
+            incidents = incidents.filter(show_on_map=True)
+
+        state_counts = {
+            f'state_{id_state}': Count('id_incident', filter=Q(state_id=id_state))
+            for id_state in STATE_IDS
+        }
+
+        rows = incidents.annotate(
+            cell=Substr('geohash', 1, precision)
+        ).values('cell').annotate(
+            count=Count('id_incident'),
+            avg_latitude=Avg('latitude'),
+            avg_longitude=Avg('longitude'),
+            first_incident=Min('id_incident'),
+            first_category=Min('category_id'),
+            **state_counts
+        ).order_by()
+
+        clusters = {cell: None for cell in cells}
+        for row in rows:
+            states = {
+                id_state: row[f'state_{id_state}']
+                for id_state in STATE_IDS
+                if row[f'state_{id_state}']
+            }
+            cluster = {
+                'cell': row['cell'],
+                'count': row['count'],
+                'latitude': float(row['avg_latitude']),
+                'longitude': float(row['avg_longitude']),
+                'states': states,
+            }
+            # Una celda con un solo incidente se devuelve como marcador individual
+            if row['count'] == 1:
+                cluster['incident'] = {
+                    'id_incident': row['first_incident'],
+                    'category': row['first_category'],
+                    'id_state': next(iter(states)),
+                }
+            clusters[row['cell']] = cluster
+
+        return clusters
+
+    def _with_state_details(self, cluster: dict, states_dict: dict):
+        """Completa el desglose por estado con la descripción y el color de cada estado"""
+        cluster = dict(cluster)
+        states = []
+        for id_state, count in cluster['states'].items():
+            state = states_dict.get(id_state, {})
+            states.append({
+                'id_state': id_state,
+                'description_state': state.get('description', 'Estado desconocido'),
+                'color_state': state.get('color', '#000000'),
+                'count': count,
+            })
+        cluster['states'] = states
+        return cluster
+
+    def _scope(self, show_on_map: bool):
+        return 'map' if show_on_map else 'all'
+
+    def _cache_key(self, precision, cell, scope):
+        return f'{CACHE_PREFIX}:{scope}:{precision}:{cell}'
@@ -0,0 +1,145 @@
+from collections import Counter
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from app_maps.models import Incident, IncidentCounter, IncidentState
+
+
+class CounterService:
+    """
+    Contadores de incidentes por estado, categoría y día de registro.
+
+    Las escrituras de IncidentService aplican la diferencia entre el estado
+    anterior y el nuevo de cada incidente dentro de la misma transacción, de
+    modo que leer los totales es una consulta sobre unas pocas filas.
+    Solo se mantienen si INCIDENT_COUNTERS_ENABLED está activo; después de
+    activarlo hay que reconstruirlos con `manage.py rebuild_incident_counters`.
+    """
+
+    def is_enabled(self):
+        return getattr(settings, 'INCIDENT_COUNTERS_ENABLED', False)
+
+    def snapshot(self, incident: Incident):
+        """
+        Retorna las claves (dimension, key) que el incidente suma en los contadores.
+        """
+        return [
+            ('total', ''),
+            ('state', str(incident.state_id)),
+            ('category', str(incident.category_id)),
+            ('day', timezone.localdate(incident.registration_date).isoformat()),
+        ]
+
+    def apply_change(self, before=None, after=None):
+        """
+        Aplica a los contadores la diferencia entre dos snapshots.
+
+        Args:
+            before: Snapshot antes de la escritura (None si el incidente es nuevo)
+            after: Snapshot después de la escritura (None si se eliminó)
+        """
+        if not self.is_enabled():
+            return
+
+        deltas = Counter(after or [])
+        deltas.subtract(before or [])
+
+        with transaction.atomic():
+            for (dimension, key), delta in sorted(deltas.items()):
+                if delta:
+                    self._increment(dimension, key, delta)
+
+    def get_totals(self):
+        """
+        Retorna los totales por estado leyendo solo las filas de contadores.
+
+        Returns:
+            dict: {'total', 'closed', 'in_progress', 'presented'}
+        """
+        counts = dict(
+            IncidentCounter.objects.filter(dimension__in=['total', 'state'])
+            .values_list('key', 'count')
+        )
+        total = counts.get('', 0)
+        closed = counts.get(str(IncidentState.RESOLVED), 0)
+        in_progress = counts.get(str(IncidentState.IN_PROGRESS), 0)
+        return {
+            'total': total,
+            'closed': closed,
+            'in_progress': in_progress,
+            'presented': total - closed - in_progress
+        }
+
+    def compute_counters(self):
+        """Calcula desde cero los contadores a partir de la tabla de incidentes"""
+        counters = {('total', ''): Incident.objects.count()}
+
+        for state_id, count in Incident.objects.values_list('state_id').annotate(count=Count('id_incident')).order_by():
+            counters[('state', str(state_id))] = count
+
+        for category_id, count in Incident.objects.values_list('category_id').annotate(count=Count('id_incident')).order_by():
+            counters[('category', str(category_id))] = count
+
+        days = Incident.objects.annotate(
+            day=TruncDate('registration_date', tzinfo=timezone.get_current_timezone())
+        ).values_list('day').annotate(count=Count('id_incident')).order_by()
+        for day, count in days:
+            counters[('day', day.isoformat())] = count
+
+        return counters
+
+    def rebuild(self):
+        """
+        Reemplaza los contadores por los calculados desde la tabla de incidentes.
+
+        Returns:
+            int: Número de filas de contadores escritas
+        """
+        with transaction.atomic():
+            # Bloquear escrituras concurrentes de incidentes mientras se reconstruye
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute(f'LOCK TABLE {Incident._meta.db_table} IN SHARE MODE')
+
+            counters = self.compute_counters()
+            IncidentCounter.objects.all().delete()
+            IncidentCounter.objects.bulk_create([
+                IncidentCounter(dimension=dimension, key=key, count=count)
+                for (dimension, key), count in counters.items()
+            ], batch_size=1000)
+        return len(counters)
+
+    def verify(self):
+        """
+        Compara los contadores guardados con los calculados desde cero.
+
+        Returns:
+            dict: {(dimension, key): (guardado, esperado)} solo para los que difieren
+        """
+        expected = self.compute_counters()
+        stored = {
+            (dimension, key): count
+            for dimension, key, count in IncidentCounter.objects.values_list('dimension', 'key', 'count')
+        }
+        drift = {}
+        for counter_key in set(expected) | set(stored):
+            stored_count = stored.get(counter_key, 0)
+            expected_count = expected.get(counter_key, 0)
+            if stored_count != expected_count:
+                drift[counter_key] = (stored_count, expected_count)
+        return drift
+
+    def _increment(self, dimension: str, key: str, delta: int):
+        updated = IncidentCounter.objects.filter(dimension=dimension, key=key).update(count=F('count') + delta)
+        if updated:
+            return
+        try:
+            with transaction.atomic():
+                IncidentCounter.objects.create(dimension=dimension, key=key, count=delta)
+        except IntegrityError:
+            # Otro proceso creó la fila al mismo tiempo
+            IncidentCounter.objects.filter(dimension=dimension, key=key).update(count=F('count') + delta)
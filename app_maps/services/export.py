@@ -0,0 +1,260 @@
+import csv
+import io
+from collections import defaultdict
+from decimal import Decimal
+from itertools import islice
+
+import pyarrow
+import pyarrow.parquet
+from django.conf import settings
+from django.utils import timezone
+
+from app_maps import renderers
+from app_maps.models import Incident, Photography
+
+
+# Primeros caracteres con los que Excel interpreta una celda como fórmula
+CSV_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+# Columnas exportadas: (nombre en la exportación, campo del queryset, tipo)
+GEOJSON_FIELDS = [
+    ('id_incident', 'id_incident', 'int'),
+    ('registration_date', 'registration_date', 'datetime'),
+    ('category', 'category_id', 'int'),
+    ('category_name', 'category__description', 'str'),
+    ('id_state', 'state_id', 'int'),
+    ('state', 'state__description', 'str'),
+    ('color', 'state__color', 'str'),
+    ('priority_name', 'priority__description', 'str'),
+    ('summary', 'summary', 'str'),
+    ('reference', 'reference', 'str'),
+    ('show_on_map', 'show_on_map', 'bool'),
+    ('is_closed', 'is_closed', 'bool'),
+    ('closure_date', 'closure_date', 'datetime'),
+    ('latitude', 'latitude', 'float'),
+    ('longitude', 'longitude', 'float'),
+]
+
+# Columnas del reporte tabular (CSV / Parquet): incluye cierre e inspector
+REPORT_FIELDS = [
+    ('id_incident', 'id_incident', 'int'),
+    ('registration_date', 'registration_date', 'datetime'),
+    ('category', 'category_id', 'int'),
+    ('category_name', 'category__description', 'str'),
+    ('id_state', 'state_id', 'int'),
+    ('state', 'state__description', 'str'),
+    ('priority', 'priority_id', 'int'),
+    ('priority_name', 'priority__description', 'str'),
+    ('user_type', 'user_type', 'str'),
+    ('inspector_username', 'inspector__username', 'str'),
+    ('summary', 'summary', 'str'),
+    ('reference', 'reference', 'str'),
+    ('latitude', 'latitude', 'float'),
+    ('longitude', 'longitude', 'float'),
+    ('show_on_map', 'show_on_map', 'bool'),
+    ('is_closed', 'is_closed', 'bool'),
+    ('closure_type', 'closure_type_id', 'int'),
+    ('closure_type_name', 'closure_type__description', 'str'),
+    ('closure_description', 'closure_description', 'str'),
+    ('closure_date', 'closure_date', 'datetime'),
+    ('closure_user_username', 'closure_user__username', 'str'),
+    ('derivation_document', 'derivation_document', 'str'),
+]
+
+
+class IncidentExportService:
+    """
+    Exportación de incidentes para herramientas GIS y reportes.
+
+    Lee una única consulta con los joins de las tablas relacionadas como
+    proyección plana (sin instancias de modelo ni datos personales del
+    ciudadano), por bloques con iterator(), que en PostgreSQL usa un cursor
+    del lado del servidor, así que la memoria no depende de la cantidad de filas.
+    """
+
+    def stream_geojson(self, photo_url=None, **kwargs):
+        """
+        FeatureCollection GeoJSON con los incidentes filtrados, como generador de bytes.
+
+        Args:
+            photo_url: Función id_photography -> URL. Si se indica, cada feature
+                incluye la propiedad 'photos' con las URLs de sus fotografías.
+            **kwargs: Los mismos filtros que IncidentService.get_incidents_by_filters
+
+        Raises:
+            ValueError: Si los filtros no son válidos (antes de empezar a transmitir)
+        """
+        chunks = self.iter_chunks(GEOJSON_FIELDS, **kwargs)
+        return self._stream_geojson(chunks, photo_url)
+
+    def stream_csv(self, **kwargs):
+        """
+        Reporte CSV (UTF-8 con BOM, para que Excel reconozca los acentos) como generador de bytes.
+
+        Raises:
+            ValueError: Si los filtros no son válidos
+        """
+        chunks = self.iter_chunks(REPORT_FIELDS, **kwargs)
+        return self._stream_csv(chunks)
+
+    def stream_parquet(self, **kwargs):
+        """
+        Reporte Parquet como generador de bytes: cada bloque se escribe como un
+        row group, así que nunca se arma la tabla completa en memoria.
+
+        Raises:
+            ValueError: Si los filtros no son válidos
+        """
+        chunks = self.iter_chunks(REPORT_FIELDS, **kwargs)
+        return self._stream_parquet(chunks)
+
+    def iter_chunks(self, fields, **kwargs):
+        """
+        Valida los filtros y retorna un generador de bloques de filas (listas de tuplas
+        en el orden de `fields`).
+
+        Raises:
+            ValueError: Si los filtros no son válidos
+        """
+        # Importación local para evitar el ciclo IncidentService -> servicios de exportación
+        from app_maps.services.incident import IncidentService
+
+        incidents = IncidentService().apply_filters(Incident.objects.all(), **kwargs)
+        rows = incidents.order_by('id_incident').values_list(*[field for _, field, _ in fields])
+        return self._iter_chunks(rows, settings.INCIDENTS_STREAM_CHUNK_SIZE)
+
+    def _iter_chunks(self, rows, chunk_size: int):
+        iterator = rows.iterator(chunk_size=chunk_size)
+        while True:
+            chunk = list(islice(iterator, chunk_size))
+            if not chunk:
+                return
+            yield chunk
+
+    def get_photo_ids(self, incident_ids):
+        """Retorna {id_incident: [id_photography, ...]} para un bloque de incidentes"""
+        photos = defaultdict(list)
+        rows = Photography.objects.filter(incident_id__in=incident_ids).order_by(
+            'incident_id', 'id_photography'
+        ).values_list('incident_id', 'id_photography')
+        for id_incident, id_photography in rows:
+            photos[id_incident].append(id_photography)
+        return photos
+
+    def _format_value(self, value, kind: str):
+        """Convierte un valor de la base de datos a un tipo JSON / CSV"""
+        if value is None:
+            return None
+        if kind == 'datetime':
+            return timezone.localtime(value).isoformat()
+        if kind == 'float' and isinstance(value, Decimal):
+            return float(value)
+        return value
+
+    def _stream_geojson(self, chunks, photo_url):
+        names = [name for name, _, _ in GEOJSON_FIELDS]
+        kinds = [kind for _, _, kind in GEOJSON_FIELDS]
+
+        yield b'{"type":"FeatureCollection","features":['
+        separator = b''
+        for chunk in chunks:
+            photos = self.get_photo_ids([row[0] for row in chunk]) if photo_url else None
+            features = []
+            for row in chunk:
+                properties = {
+                    name: self._format_value(value, kind)
+                    for name, value, kind in zip(names, row, kinds)
+                }
+                longitude = properties.pop('longitude')
+                latitude = properties.pop('latitude')
+                if photos is not None:
+                    properties['photos'] = [
+                        photo_url(id_photography) for id_photography in photos.get(properties['id_incident'], [])
+                    ]
+                features.append(renderers.encode_json({
+                    'type': 'Feature',
+                    'id': properties['id_incident'],
+                    'geometry': {'type': 'Point', 'coordinates': [longitude, latitude]},
+                    'properties': properties,
+                }))
+            # Un solo envío por bloque en lugar de uno por feature
+            yield separator + b','.join(features)
+            separator = b','
+        yield b']}'
+
+    def _escape_csv_value(self, value):
+        """Antepone ' a los textos que Excel ejecutaría como fórmula (inyección CSV / DDE)"""
+        if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES):
+            return "'" + value
+        return value
+
+    def _stream_csv(self, chunks):
+        kinds = [kind for _, _, kind in REPORT_FIELDS]
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+
+        writer.writerow([name for name, _, _ in REPORT_FIELDS])
+        yield b'\xef\xbb\xbf' + buffer.getvalue().encode('utf-8')
+
+        for chunk in chunks:
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(
+                [self._escape_csv_value(self._format_value(value, kind)) for value, kind in zip(row, kinds)]
+                for row in chunk
+            )
+            yield buffer.getvalue().encode('utf-8')
+
+    def _stream_parquet(self, chunks):
+        types = {
+            'int': pyarrow.int64(),
+            'str': pyarrow.string(),
+            'bool': pyarrow.bool_(),
+            'float': pyarrow.float64(),
+            'datetime': pyarrow.timestamp('us', tz=settings.TIME_ZONE),
+        }
+        schema = pyarrow.schema([(name, types[kind]) for name, _, kind in REPORT_FIELDS])
+        kinds = [kind for _, _, kind in REPORT_FIELDS]
+
+        sink = _ParquetSink()
+        with pyarrow.parquet.ParquetWriter(sink, schema, compression='zstd') as writer:
+            for chunk in chunks:
+                columns = [
+                    pyarrow.array(
+                        [float(value) if kind == 'float' and value is not None else value for value in column],
+                        type=schema.field(index).type
+                    )
+                    for index, (column, kind) in enumerate(zip(zip(*chunk), kinds))
+                ]
+                writer.write_table(pyarrow.Table.from_arrays(columns, schema=schema))
+                yield sink.drain()
+        # Al cerrar el writer se escribe el pie del archivo
+        yield sink.drain()
+
+
+class _ParquetSink:
+    """Destino de escritura para ParquetWriter que entrega lo escrito por partes"""
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b''.join(self.parts)
+        self.parts = []
+        return data
@@ -3,6 +3,8 @@ from PIL import Image
 import io
 import os
 
+from app_maps.metrics import IMAGE_OPTIMIZATION_LATENCY, timed
+
 class FileUtils:
     def get_file_information(self, file: UploadedFile):
 
@@ -37,50 +39,52 @@ class FileUtils:
             if not file.content_type.startswith('image/'):
                 return file
             
-            # Abrir la imagen con Pillow
-            image = Image.open(file)
+            # Solo se mide el trabajo de Pillow (decodificar, redimensionar y comprimir)
+            with timed(IMAGE_OPTIMIZATION_LATENCY, 'optimize'):
+                # Abrir la imagen con Pillow
+                image = Image.open(file)
             
-            # Obtener orientación EXIF si existe (para rotar automáticamente)
-            try:
-                from PIL import ImageOps
-                image = ImageOps.exif_transpose(image)
-            except:
-                pass
+                # Obtener orientación EXIF si existe (para rotar automáticamente)
+                try:
+                    from PIL import ImageOps
+                    image = ImageOps.exif_transpose(image)
+                except:
+                    pass
             
-            # Obtener dimensiones originales
-            original_width, original_height = image.size
+                # Obtener dimensiones originales
+                original_width, original_height = image.size
             
-            # Calcular nuevas dimensiones manteniendo el aspect ratio
-            if original_width > max_width or original_height > max_height:
-                # Calcular la proporción de reducción
-                ratio = min(max_width / original_width, max_height / original_height)
-                new_width = int(original_width * ratio)
-                new_height = int(original_height * ratio)
+                # Calcular nuevas dimensiones manteniendo el aspect ratio
+                if original_width > max_width or original_height > max_height:
+                    # Calcular la proporción de reducción
+                    ratio = min(max_width / original_width, max_height / original_height)
+                    new_width = int(original_width * ratio)
+                    new_height = int(original_height * ratio)
                 
-                # Redimensionar usando LANCZOS para mejor calidad
-                image = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
+                    # Redimensionar usando LANCZOS para mejor calidad
+                    image = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
             
-            # Convertir RGBA a RGB si es necesario (para PNGs con transparencia)
-            if image.mode in ('RGBA', 'LA', 'P'):
-                # Crear un fondo blanco
-                background = Image.new('RGB', image.size, (255, 255, 255))
-                if image.mode == 'P':
-                    image = image.convert('RGBA')
-                # Pegar la imagen sobre el fondo blanco
-                if image.mode == 'RGBA':
-                    background.paste(image, mask=image.split()[-1])
-                else:
-                    background.paste(image)
-                image = background
-            elif image.mode != 'RGB':
-                image = image.convert('RGB')
+                # Convertir RGBA a RGB si es necesario (para PNGs con transparencia)
+                if image.mode in ('RGBA', 'LA', 'P'):
+                    # Crear un fondo blanco
+                    background = Image.new('RGB', image.size, (255, 255, 255))
+                    if image.mode == 'P':
+                        image = image.convert('RGBA')
+                    # Pegar la imagen sobre el fondo blanco
+                    if image.mode == 'RGBA':
+                        background.paste(image, mask=image.split()[-1])
+                    else:
+                        background.paste(image)
+                    image = background
+                elif image.mode != 'RGB':
+                    image = image.convert('RGB')
             
-            # Guardar la imagen optimizada en memoria
-            output = io.BytesIO()
+                # Guardar la imagen optimizada en memoria
+                output = io.BytesIO()
             
-            # Siempre guardar como JPEG para mejor compresión
-            image.save(output, format='JPEG', quality=quality, optimize=True)
-            output.seek(0)
+                # Siempre guardar como JPEG para mejor compresión
+                image.save(output, format='JPEG', quality=quality, optimize=True)
+                output.seek(0)
             
             # Obtener el nombre del archivo sin extensión y agregar .jpg
             original_name = os.path.splitext(file.name)[0]
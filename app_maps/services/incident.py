@@ -1,49 +1,58 @@
 from django.contrib.auth.models import User
-from app_maps.models import Incident, Photography, IncidentState
+from app_maps.models import Incident, IncidentChange, Photography, IncidentState
 
-from app_maps.serializers import IncidentSerializer, PhotographySerializer, IncidentStateSerializer
+from app_maps import renderers
+from app_maps.serializers import IncidentSerializer, PhotographySerializer, serialize_incident_list
 from app_maps.services.cloudflare import CloudflareService
+from app_maps.services.clusters import ClusterService
+from app_maps.services.counters import CounterService
+from app_maps.services.incident_changes import IncidentChangeService
+from app_maps.services.states import StateService
+from app_maps.services.incident_statistics import IncidentStatisticsService
+from app_maps.services.vector_tiles import VectorTileService
 from app_maps.services.photography import PhotographyService
+from app_maps.services.photo_jobs import PhotoJobService
 from app_maps.services.file_utils import FileUtils
+from app_maps import geohash
+from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.core.files.uploadedfile import UploadedFile
-import tempfile
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection, transaction
+from django.db.models import Count, Exists, F, Max, OuterRef, Q
+from django.utils import timezone
+from datetime import datetime
+import base64
+import json
+import os
+import re
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 
 class IncidentService:
     def __init__(self):
         incidents = Incident.objects.all()
         serializer = IncidentSerializer(incidents, many=True)
     
-    def get_incident_by_id(self, id: int):
+    def get_incident_by_id(self, id: int, photo_jobs: bool = False):
        # Optimización: usar select_related y prefetch_related para evitar N+1 queries
-        incident = Incident.objects.select_related(
-            'category',
-            'priority', 
-            'closure_type',
-            'inspector',
-            'closure_user'
-        ).prefetch_related('photographs').get(id_incident=id)
-        incident_serializer = IncidentSerializer(incident)
-
-        incident_serializer_data = incident_serializer.data
-
-        incident_serializer_data = self.add_state_to_incident(incident_serializer_data, self.get_states_dict())
-
-        return incident_serializer_data
+        incident = self.get_incidents_queryset().get(id_incident=id)
+        data = serialize_incident_list([incident])[0]
+        if photo_jobs:
+            data['photo_jobs'] = PhotoJobService().get_jobs(id)
+        return data
     
     def get_all_incidents(self):
         # Optimización: usar select_related y prefetch_related para evitar N+1 queries
-        incidents = Incident.objects.select_related(
-            'category',
-            'priority', 
-            'closure_type',
-            'inspector',
-            'closure_user'
-        ).prefetch_related('photographs')
+        incidents = self.get_incidents_queryset()
         serializer = IncidentSerializer(incidents, many=True)
         return serializer.data
     
     def add_incident(self, **kwargs):
 
+        incident = None
+
         try:
         
             category_id = kwargs.get('category_id')
@@ -73,97 +82,397 @@ class IncidentService:
                 citizen_email = kwargs.get('citizen_email')
                 user_type = 'citizen'        
 
-            incident = Incident.objects.create(
-                user_type=user_type,
-                category_id=category_id,
-                latitude=latitude,
-                longitude=longitude,
-                summary=summary,
-                reference=reference,
-                show_on_map=show_on_map,            
-                inspector=inspector,
-                citizen_name=citizen_name,
-                citizen_lastname=citizen_lastname,
-                citizen_phone=citizen_phone,
-                citizen_email=citizen_email,
-            )
+            with transaction.atomic():
+                incident = Incident.objects.create(
+                    user_type=user_type,
+                    category_id=category_id,
+                    latitude=latitude,
+                    longitude=longitude,
+                    summary=summary,
+                    reference=reference,
+                    show_on_map=show_on_map,            
+                    inspector=inspector,
+                    citizen_name=citizen_name,
+                    citizen_lastname=citizen_lastname,
+                    citizen_phone=citizen_phone,
+                    citizen_email=citizen_email,
+                )
+                self.apply_snapshots(after=self.take_snapshot(incident))
+                IncidentChangeService().record(incident.id_incident)
 
-            for file in files:
-                self.add_photography(incident.id_incident, file)
+            photo_jobs = self.save_photographs(incident.id_incident, files)
 
-            if len(files) > 0:
-                self.add_photography_miniature(incident.id_incident, files[0])
+            self.invalidate_map_caches(incident.coordinates)
 
             serializer = IncidentSerializer(incident)
-            return serializer.data
+            return self.with_photo_jobs(serializer.data, photo_jobs)
         
         except Exception as e:
             if incident:
-                incident.delete()
+                with transaction.atomic():
+                    self.apply_snapshots(before=self.take_snapshot(incident))
+                    IncidentChangeService().record(incident.id_incident, IncidentChange.ACTION_DELETE)
+                    incident.delete()
             raise Exception(e)
 
 
         
+    def save_photographs(self, id_incident: int, files):
+        """
+        Procesa las fotografías durante la petición (PHOTO_PROCESSING_MODE = 'sync')
+        o las deja en la cola para `manage.py process_photo_jobs` ('async').
+
+        Returns:
+            list[PhotoJob]: Trabajos creados (vacía en modo 'sync')
+        """
+        if settings.PHOTO_PROCESSING_MODE == 'async':
+            return PhotoJobService().enqueue(id_incident, files)
+        self.add_photographs(id_incident, files)
+        return []
+
+    def with_photo_jobs(self, data, photo_jobs):
+        """Agrega a la respuesta el estado de las fotografías encoladas, si las hay"""
+        if photo_jobs:
+            data['photo_jobs'] = PhotoJobService().get_jobs(photo_jobs[0].incident_id)
+        return data
+
     def add_photography(self, id_incident: int, file: UploadedFile):
-        
+        return self.add_photographs(id_incident, [file], miniature=False)
+
+    def add_photographs(self, id_incident: int, files, miniature: bool = True):
+        """
+        Optimiza y sube a R2 todas las fotografías en paralelo (hilos acotados por
+        PHOTO_UPLOAD_WORKERS) y las registra con un solo bulk_create.
+
+        Los hilos solo usan Pillow y R2, nunca la base de datos. Si alguna subida
+        falla se eliminan de R2 las que sí se subieron y se lanza la excepción.
+
+        Args:
+            id_incident: ID del incidente
+            files: Archivos subidos
+            miniature: Subir también la miniatura de la primera fotografía
+
+        Returns:
+            list[Photography]: Fotografías registradas
+        """
+        if not files:
+            return []
+
+        workers = max(min(settings.PHOTO_UPLOAD_WORKERS, len(files)), 1)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='photo-upload') as executor:
+            futures = [
+                executor.submit(self.upload_photography, id_incident, file, miniature and index == 0)
+                for index, file in enumerate(files)
+            ]
+            results = [future.result() if not future.exception() else None for future in futures]
+            errors = [future.exception() for future in futures if future.exception()]
+
+        if errors:
+            # No dejar objetos huérfanos en R2
+            cloudflare_service = CloudflareService()
+            for result in results:
+                for r2_key in (result or {}).values():
+                    if r2_key:
+                        cloudflare_service.delete_file(r2_key)
+            raise Exception(errors[0])
+
+        photographs = Photography.objects.bulk_create([
+            Photography(
+                incident_id=id_incident,
+                name=file.name,
+                content_type=file.content_type,
+                file_size=file.size,
+                r2_key=result['r2_key'],
+            )
+            for file, result in zip(files, results)
+        ])
+        self.touch_incident(id_incident)
+        return photographs
+
+    def upload_photography(self, id_incident: int, file: UploadedFile, miniature: bool = False,
+                           defer_miniature: bool = False):
+        """
+        Optimiza y sube una fotografía (y, si se pide, su miniatura). Se ejecuta en
+        los hilos de add_photographs: no debe usar la base de datos.
+
+        Con `defer_miniature` la miniatura se genera pero no se sube: la clave
+        miniature.jpg es fija por incidente, así que el worker de la cola la sube
+        con upload_photography_miniature solo cuando la fotografía queda registrada.
+
+        Returns:
+            dict: {'r2_key', 'miniature_key', 'miniature_file'}
+        """
         # Optimizar la imagen antes de subirla
         file_utils = FileUtils()
         optimized_file = file_utils.optimize_image(file, max_width=1024, max_height=1024, quality=80)
 
-        with tempfile.NamedTemporaryFile(delete=True) as temp_file:
-            for chunk in optimized_file.chunks():
-                temp_file.write(chunk)
-            temp_file.seek(0)
+        upload_file_service = CloudflareService()
+        response_upload = upload_file_service.upload_fileobj(
+            optimized_file, id_incident, file.content_type, file_extension=os.path.splitext(optimized_file.name)[1]
+        )
+        if not response_upload.get('success', False):
+            raise Exception(response_upload.get('error', 'Error subiendo el archivo'))
+
+        miniature_key = None
+        miniature_file = None
+        if miniature:
+            # La miniatura se obtiene de la imagen ya optimizada (1024px) en lugar de
+            # decodificar otra vez el archivo original
+            optimized_file.seek(0)
+            try:
+                miniature_file = self.build_photography_miniature(optimized_file)
+                if not defer_miniature:
+                    miniature_key = self.upload_photography_miniature(id_incident, miniature_file)
+                    miniature_file = None
+            except Exception:
+                upload_file_service.delete_file(response_upload['r2_key'])
+                raise
+
+        return {'r2_key': response_upload['r2_key'], 'miniature_key': miniature_key, 'miniature_file': miniature_file}
 
-            upload_file_service = CloudflareService()
-            response_upload = upload_file_service.upload_file(temp_file.name, id_incident, file.content_type)
-            success = response_upload.get('success', False)
-            r2_key = response_upload.get('r2_key', None)
-            error = response_upload.get('error', 'Error subiendo el archivo')
-            
-            if not success:                
-                raise Exception(error)                
-            
-            photography_service = PhotographyService()
+    def add_photography_miniature(self, id_incident: int, file: UploadedFile):
+        return self.upload_photography_miniature(id_incident, self.build_photography_miniature(file))
 
-            info_photography = {
-                'id_incident': id_incident,
-                'name': file.name,
-                'content_type': file.content_type,
-                'file_size': file.size,
-                'r2_key': r2_key
-            }
-            photography_service.add_photography(**info_photography)
+    def build_photography_miniature(self, file: UploadedFile):
+        """Miniatura de 128px de la fotografía, sin subirla"""
+        return FileUtils().optimize_image(file, max_width=128, max_height=128, quality=80)
 
-    def add_photography_miniature(self, id_incident: int, file: UploadedFile):
-         # Optimizar la imagen antes de subirla
-        file_utils = FileUtils()
-        optimized_file = file_utils.optimize_image(file, max_width=128, max_height=128, quality=80)
-
-        with tempfile.NamedTemporaryFile(delete=True) as temp_file:
-            for chunk in optimized_file.chunks():
-                temp_file.write(chunk)
-            temp_file.seek(0)
-
-            upload_file_service = CloudflareService()
-            response_upload = upload_file_service.upload_file(temp_file.name, id_incident, file.content_type, name_key='miniature.jpg')
-            success = response_upload.get('success', False)
-            r2_key = response_upload.get('r2_key', None)
-            error = response_upload.get('error', 'Error subiendo el archivo')
-            
-            if not success:                
-                raise Exception(error)                
+    def upload_photography_miniature(self, id_incident: int, miniature_file: UploadedFile):
+        """Sube la miniatura generada con build_photography_miniature a la clave miniature.jpg del incidente"""
+        miniature_file.seek(0)
+        upload_file_service = CloudflareService()
+        response_upload = upload_file_service.upload_fileobj(
+            miniature_file, id_incident, miniature_file.content_type, name_key='miniature.jpg'
+        )
+        success = response_upload.get('success', False)
+        r2_key = response_upload.get('r2_key', None)
+        error = response_upload.get('error', 'Error subiendo el archivo')
 
-            return r2_key
-            
+        if not success:
+            raise Exception(error)
 
+        return r2_key
 
     def get_incidents_by_filters(self, **kwargs):
+        incidents = self.get_incidents_queryset()
+        incidents = self.apply_filters(incidents, **kwargs)
+        return self.serialize_incidents(incidents)
+
+    def stream_incidents_json(self, **kwargs):
+        """
+        Igual que get_incidents_by_filters pero como generador de bytes JSON
+        ({'message', 'content': [...]}) para un StreamingHttpResponse.
+
+        El queryset se recorre por bloques de INCIDENTS_STREAM_CHUNK_SIZE
+        (las fotografías se precargan por bloque), así que la memoria no
+        crece con el tamaño del resultado. Los filtros se validan antes de
+        retornar el generador para que los errores se respondan como 400.
+
+        Raises:
+            ValueError: Si los filtros no son válidos
+        """
+        incidents = self.apply_filters(self.get_incidents_queryset(), **kwargs)
+        return self._stream_json(incidents, settings.INCIDENTS_STREAM_CHUNK_SIZE)
+
+    def _stream_json(self, incidents, chunk_size: int):
+        yield b'{"message":"Incidents retrieved successfully","content":['
+        rows = incidents.iterator(chunk_size=chunk_size)
+        separator = b''
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            # Un solo envío por bloque en lugar de uno por incidente
+            yield separator + b','.join(renderers.encode_json(incident) for incident in self.serialize_incidents(chunk))
+            separator = b','
+        yield b']}'
+
+    def get_incidents_validator(self, **kwargs):
+        """
+        Validador barato para GET condicional: fecha de la última escritura y
+        cantidad de incidentes del conjunto filtrado, sin serializar nada.
+        La cantidad detecta eliminaciones que no cambian la fecha máxima.
+
+        Returns:
+            dict: {'last_modified', 'count'}, o None si los filtros, el cursor o
+            page_size no son válidos (sin consultar; la vista responde el error)
+        """
+        try:
+            # Los mismos errores que get_incidents_page, antes de consultar
+            if 'cursor' in kwargs or 'page_size' in kwargs:
+                self.parse_page_size(kwargs.get('page_size'))
+                if kwargs.get('cursor'):
+                    self.decode_cursor(kwargs['cursor'])
+            incidents = self.apply_filters(Incident.objects.all(), **kwargs)
+        except (ValueError, ValidationError):
+            # ValidationError: valores que el ORM rechaza (por ejemplo show_on_map=yes)
+            return None
+        return incidents.order_by().aggregate(
+            last_modified=Max('updated_at'),
+            count=Count('id_incident'),
+        )
+
+    def get_incident_last_modified(self, id_incident: int):
+        """Fecha de la última escritura de un incidente (None si no existe)"""
+        return Incident.objects.filter(id_incident=id_incident).values_list('updated_at', flat=True).first()
+
+    def touch_incident(self, id_incident: int):
+        """Marca el incidente como modificado (por ejemplo, al cambiar sus fotografías)"""
+        with transaction.atomic():
+            Incident.objects.filter(id_incident=id_incident).update(updated_at=timezone.now())
+            IncidentChangeService().record(id_incident)
+
+    def get_incidents_page(self, **kwargs):
+        """
+        Obtiene una página de incidentes usando paginación por cursor (keyset).
+
+        El cursor es opaco y codifica (registration_date, id_incident) del último
+        incidente de la página anterior, en el mismo orden que Incident.Meta.ordering.
+        Cada página cuesta lo mismo sin importar qué tan profunda sea.
+
+        Args:
+            cursor: Cursor devuelto por la página anterior (opcional)
+            page_size: Tamaño de página (opcional, limitado por INCIDENTS_MAX_PAGE_SIZE)
+            **kwargs: Los mismos filtros que get_incidents_by_filters
+
+        Returns:
+            dict: {'results': [...], 'next_cursor': str o None}
+
+        Raises:
+            ValueError: Si el cursor o el tamaño de página no son válidos
+        """
+        page_size = self.parse_page_size(kwargs.get('page_size'))
+
+        incidents = self.get_incidents_queryset()
+        incidents = self.apply_filters(incidents, **kwargs)
+        incidents = list(self.get_page_queryset(incidents, kwargs.get('cursor'), page_size))
+        has_next = len(incidents) > page_size
+        incidents = incidents[:page_size]
+
+        next_cursor = None
+        if has_next:
+            last = incidents[-1]
+            next_cursor = self.encode_cursor(last.registration_date, last.id_incident)
+
+        return {
+            'results': self.serialize_incidents(incidents),
+            'next_cursor': next_cursor
+        }
+
+    def get_page_queryset(self, incidents, cursor, page_size: int):
+        """
+        Restringe un queryset a la página que sigue al cursor, con un registro
+        extra para saber si existe una página siguiente.
+
+        Raises:
+            ValueError: Si el cursor no es válido
+        """
+        if cursor:
+            registration_date, id_incident = self.decode_cursor(cursor)
+            incidents = incidents.filter(
+                Q(registration_date__lt=registration_date) |
+                Q(registration_date=registration_date, id_incident__lt=id_incident)
+            )
+        return incidents.order_by('-registration_date', '-id_incident')[:page_size + 1]
+
+    def get_incident_markers(self, **kwargs):
+        """
+        Proyección liviana de incidentes para dibujar marcadores en el mapa.
+
+        Solo lee las columnas necesarias con values() (sin joins a usuarios ni
+        prefetch de fotografías) y arma los diccionarios sin pasar por DRF.
+
+        Args:
+            **kwargs: Los mismos filtros que get_incidents_by_filters
+
+        Returns:
+            list[dict]: id_incident, latitude, longitude, category, id_state,
+            color_state, has_photo y registration_date
+        """
+        incidents = self.apply_filters(Incident.objects.all(), **kwargs)
+        rows = incidents.annotate(
+            has_photo=Exists(Photography.objects.filter(incident_id=OuterRef('id_incident')))
+        ).values_list(
+            'id_incident', 'latitude', 'longitude', 'category_id',
+            'state_id', 'state__color', 'has_photo', 'registration_date'
+        )
+
+        markers = []
+        for id_incident, latitude, longitude, category_id, id_state, color_state, has_photo, registration_date in rows:
+            markers.append({
+                'id_incident': id_incident,
+                'latitude': float(latitude),
+                'longitude': float(longitude),
+                'category': category_id,
+                'id_state': id_state,
+                'color_state': color_state,
+                'has_photo': has_photo,
+                'registration_date': timezone.localtime(registration_date).isoformat(),
+            })
+        return markers
+
+    def get_incidents_queryset(self):
+        # Optimización: usar select_related y prefetch_related para evitar N+1 queries
+        # select_related para relaciones ForeignKey, prefetch_related para OneToMany
+        return Incident.objects.select_related(
+            'category',           # Para category.description
+            'priority',           # Para priority.description  
+            'closure_type',       # Para closure_type.description
+            'inspector',          # Para inspector.username
+            'closure_user',       # Para closure_user.username
+            'state'               # Para state.description y state.color
+        ).prefetch_related('photographs')  # Para fotografías (OneToMany)
+
+    def serialize_incidents(self, incidents):
+        # Misma salida que IncidentSerializer(incidents, many=True).data, sin el costo de ModelSerializer
+        return serialize_incident_list(incidents)
+
+    def parse_page_size(self, page_size):
+        """Valida el tamaño de página y lo limita a INCIDENTS_MAX_PAGE_SIZE"""
+        max_page_size = settings.INCIDENTS_MAX_PAGE_SIZE
+        if page_size in (None, ''):
+            return min(settings.REST_FRAMEWORK.get('PAGE_SIZE', max_page_size), max_page_size)
+        try:
+            page_size = int(page_size)
+        except (TypeError, ValueError):
+            raise ValueError("page_size must be an integer")
+        if page_size < 1:
+            raise ValueError("page_size must be greater than 0")
+        return min(page_size, max_page_size)
+
+    def encode_cursor(self, registration_date, id_incident: int):
+        payload = json.dumps([registration_date.isoformat(), id_incident])
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor: str):
+        try:
+            padding = '=' * (-len(cursor) % 4)
+            registration_date, id_incident = json.loads(base64.urlsafe_b64decode(cursor + padding))
+            return datetime.fromisoformat(registration_date), int(id_incident)
+        except (TypeError, ValueError):
+            raise ValueError("Invalid cursor")
+
+    def apply_filters(self, incidents, **kwargs):
+        """
+        Aplica los filtros públicos de incidentes sobre un queryset.
+
+        Args:
+            incidents: QuerySet de Incident sobre el que aplicar los filtros
+            **kwargs: Filtros (id_category, id_state, show_on_map, text_search,
+                id_incident, registration_period, min_lat, max_lat, min_lng, max_lng)
+
+        Returns:
+            QuerySet filtrado
+
+        Raises:
+            ValueError: Si el viewport está incompleto o no es válido
+        """
         id_category = kwargs.get('id_category')
         id_state = kwargs.get('id_state')
         show_on_map = kwargs.get('show_on_map')
         text_search = kwargs.get('text_search')
         id_incident = kwargs.get('id_incident')
+        viewport = self.parse_viewport(**kwargs)
         
         registration_period = kwargs.get('registration_period')
         if registration_period:
@@ -173,16 +482,6 @@ class IncidentService:
             from_date = None
             to_date = None
 
-        # Optimización: usar select_related y prefetch_related para evitar N+1 queries
-        # select_related para relaciones ForeignKey, prefetch_related para OneToMany
-        incidents = Incident.objects.select_related(
-            'category',           # Para category.description
-            'priority',           # Para priority.description  
-            'closure_type',       # Para closure_type.description
-            'inspector',          # Para inspector.username
-            'closure_user'        # Para closure_user.username
-        ).prefetch_related('photographs')  # Para fotografías (OneToMany)
-
         if id_incident:
             incidents = incidents.filter(id_incident=id_incident)
 
@@ -190,13 +489,7 @@ class IncidentService:
             incidents = incidents.filter(category_id=id_category)
 
         if id_state: 
-            id_state = int(id_state)                        
-            if id_state == 3:            
-                incidents = incidents.filter(is_closed=True)
-            elif id_state == 2:            
-                incidents = incidents.filter(is_closed=False, priority__isnull=False)
-            elif id_state == 1:            
-                incidents = incidents.filter(is_closed=False, priority__isnull=True)
+            incidents = incidents.filter(state_id=int(id_state))
             
         if registration_period:
             incidents = incidents.filter(registration_date__range=(from_date, to_date))
@@ -204,68 +497,87 @@ class IncidentService:
         if show_on_map:
             incidents = incidents.filter(show_on_map=show_on_map)
 
+        if viewport:
+            incidents = self.filter_by_viewport(incidents, *viewport)
+
         if text_search:
-            incidents = incidents.filter(summary__icontains=text_search) | incidents.filter(reference__icontains=text_search) 
+            incidents = self.filter_by_text(incidents, text_search)
 
-        serializer = IncidentSerializer(incidents, many=True)
+        return incidents
 
-        incidentes_serializer = serializer.data
-        incidentes_serializer_with_state = []
+    def filter_by_text(self, incidents, text_search: str):
+        """
+        Filtra incidentes por texto en summary y reference.
 
-        # Optimización: crear diccionario indexado de estados una sola vez
-        states_dict = self.get_states_dict()
+        En PostgreSQL usa el vector de búsqueda (configuración 'spanish', sin
+        tildes) con índice GIN y ordena por relevancia; cada palabra se busca
+        como prefijo para conservar el comportamiento de búsqueda parcial.
+        En otros motores (SQLite) usa icontains.
+        """
+        if connection.vendor != 'postgresql':
+            return incidents.filter(Q(summary__icontains=text_search) | Q(reference__icontains=text_search))
 
-        # Optimización: usar list comprehension en lugar de loop + append
-        incidentes_serializer_with_state = [
-            self.add_state_to_incident(incident, states_dict) 
-            for incident in incidentes_serializer
-        ]
+        words = re.findall(r'\w+', self.remove_accents(text_search).lower())
+        if not words:
+            return incidents.none()
 
-        return incidentes_serializer_with_state
+        query = SearchQuery(' & '.join(f'{word}:*' for word in words), config='spanish', search_type='raw')
+        return incidents.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F('search_vector'), query)
+        ).order_by('-search_rank', '-registration_date', '-id_incident')
 
-    
+    def remove_accents(self, text: str):
+        """Elimina tildes y diéresis para que coincida con unaccent() del vector de búsqueda"""
+        normalized = unicodedata.normalize('NFKD', text)
+        return ''.join(char for char in normalized if not unicodedata.combining(char))
 
-    
-    def get_all_states(self):
-        states = IncidentState.objects.all()
-        serializer = IncidentStateSerializer(states, many=True)
-        return serializer.data
-    
-    def get_states_dict(self):
-        """Optimización: retorna un diccionario indexado por id_state para búsquedas O(1)"""
-        states_list = self.get_all_states()
-        return {state['id_state']: state for state in states_list}
+    def parse_viewport(self, **kwargs):
+        """
+        Obtiene el viewport (min_lat, min_lng, max_lat, max_lng) de los filtros.
 
-        
-    def add_state_to_incident(self, incident_serializer: dict, states_dict: dict):
-        """Optimizada: usa diccionario indexado para búsquedas O(1) en lugar de O(n)"""
-        if not states_dict:
-            states_dict = self.get_states_dict()
-
-        # Determinar el id_state basado en la lógica del negocio
-        if incident_serializer.get('is_closed') == True:
-            state_id = 3  # Resuelto
-        elif incident_serializer.get('priority') is not None:
-            state_id = 2  # En proceso
-        else:
-            state_id = 1  # Presentado
-        
-        # Búsqueda optimizada O(1) usando diccionario
-        state = states_dict.get(state_id)
-        
-        if state:
-            incident_serializer['id_state'] = state['id_state']
-            incident_serializer['description_state'] = state['description']
-            incident_serializer['color_state'] = state.get('color', '#000000')
-        else:
-            # Estado por defecto si no se encuentra
-            incident_serializer['id_state'] = 1
-            incident_serializer['description_state'] = 'Estado desconocido'
-            incident_serializer['color_state'] = '#000000'
+        Returns:
+            tuple de floats o None si no se envió ningún límite
 
-        return incident_serializer
-        
+        Raises:
+            ValueError: Si faltan límites o no son coherentes
+        """
+        keys = ('min_lat', 'min_lng', 'max_lat', 'max_lng')
+        values = [kwargs.get(key) for key in keys]
+        if all(value in (None, '') for value in values):
+            return None
+        if any(value in (None, '') for value in values):
+            raise ValueError(f"Viewport requires all of: {', '.join(keys)}")
+
+        try:
+            min_lat, min_lng, max_lat, max_lng = (float(value) for value in values)
+        except (TypeError, ValueError):
+            raise ValueError("Viewport bounds must be numbers")
+
+        if not (-90 <= min_lat <= max_lat <= 90) or not (-180 <= min_lng <= max_lng <= 180):
+            raise ValueError("Invalid viewport: expected min_lat <= max_lat and min_lng <= max_lng")
 
+        return min_lat, min_lng, max_lat, max_lng
+
+    def filter_by_viewport(self, incidents, min_lat, min_lng, max_lat, max_lng):
+        """
+        Filtra incidentes dentro de un viewport.
+        Los prefijos de geohash que cubren el viewport usan el índice de la
+        columna geohash; el rango exacto de coordenadas descarta los bordes.
+        """
+        prefixes = geohash.cover_bbox(min_lat, min_lng, max_lat, max_lng)
+        if prefixes:
+            cells = Q()
+            for prefix in prefixes:
+                cells |= Q(geohash__startswith=prefix)
+            incidents = incidents.filter(cells)
+
+        return incidents.filter(
+            latitude__range=(min_lat, max_lat),
+            longitude__range=(min_lng, max_lng),
+        )
+
+    def get_all_states(self):
+        return StateService().get_all_states()
     
     def get_photography_miniature_url(self, id_incident: int):
         key = f"incidents/{id_incident}/miniature.jpg"
@@ -300,57 +612,62 @@ class IncidentService:
             'closure_description',  # Descripción del cierre
         }
         
+        # Validar que solo se actualicen campos permitidos
+        invalid_fields = set(update_data.keys()) - ALLOWED_FIELDS
+        if invalid_fields:
+            raise ValueError(
+                f"Cannot update fields: {', '.join(invalid_fields)}. "
+                f"Allowed fields: {', '.join(ALLOWED_FIELDS)}"
+            )
+
         try:
-            # Verificar que el incidente existe
-            incident = Incident.objects.get(id_incident=id_incident)
-            
-            # Validar que solo se actualicen campos permitidos
-            invalid_fields = set(update_data.keys()) - ALLOWED_FIELDS
-            if invalid_fields:
-                raise ValueError(
-                    f"Cannot update fields: {', '.join(invalid_fields)}. "
-                    f"Allowed fields: {', '.join(ALLOWED_FIELDS)}"
-                )
-            
-            # Actualizar cada campo proporcionado
-            for field, value in update_data.items():
-                if field == 'show_on_map':
-                    incident.show_on_map = bool(value)
+            with transaction.atomic():
+                # Bloquear la fila antes del snapshot: dos PATCH simultáneos aplicarían
+                # a contadores y estadísticas la misma diferencia dos veces
+                incident = Incident.objects.select_for_update().get(id_incident=id_incident)
+                previous_snapshot = self.take_snapshot(incident)
+
+                # Actualizar cada campo proporcionado
+                for field, value in update_data.items():
+                    if field == 'show_on_map':
+                        incident.show_on_map = bool(value)
                 
-                elif field == 'is_closed':
-                    incident.is_closed = bool(value)
-                    # Si se está cerrando, registrar fecha y usuario
-                    if incident.is_closed:
-                        from django.utils import timezone
-                        incident.closure_date = timezone.now()
-                        if user:
-                            incident.closure_user = user
-                    else:
-                        incident.closure_date = None
-                        incident.closure_user = None
+                    elif field == 'is_closed':
+                        incident.is_closed = bool(value)
+                        # Si se está cerrando, registrar fecha y usuario
+                        if incident.is_closed:
+                            from django.utils import timezone
+                            incident.closure_date = timezone.now()
+                            if user:
+                                incident.closure_user = user
+                        else:
+                            incident.closure_date = None
+                            incident.closure_user = None
                 
-                elif field == 'priority':
-                    # Puede ser None o un ID de prioridad
-                    if value is None:
-                        incident.priority = None
-                    else:
-                        incident.priority_id = int(value)
+                    elif field == 'priority':
+                        # Puede ser None o un ID de prioridad
+                        if value is None:
+                            incident.priority = None
+                        else:
+                            incident.priority_id = int(value)
                 
-                elif field == 'derivation_document':
-                    incident.derivation_document = value if value else None
+                    elif field == 'derivation_document':
+                        incident.derivation_document = value if value else None
                 
-                elif field == 'closure_type':
-                    if value is None:
-                        incident.closure_type = None
-                    else:
-                        incident.closure_type_id = int(value)
+                    elif field == 'closure_type':
+                        if value is None:
+                            incident.closure_type = None
+                        else:
+                            incident.closure_type_id = int(value)
                 
-                elif field == 'closure_description':
-                    incident.closure_description = value if value else None
-            
-            # Guardar cambios
-            incident.save()
+                    elif field == 'closure_description':
+                        incident.closure_description = value if value else None
             
+                incident.save()
+                self.apply_snapshots(previous_snapshot, self.take_snapshot(incident))
+                IncidentChangeService().record(incident.id_incident)
+                self.invalidate_map_caches(incident.coordinates)
+
             # Retornar incidente actualizado serializado
             return self.get_incident_by_id(id_incident)
             
@@ -399,38 +716,49 @@ class IncidentService:
 
            
 
+            # Las fotografías se suben a R2 fuera de la transacción para no
+            # mantener la fila bloqueada durante las subidas
             self.delete_photographys(incident.id_incident)
 
-            for file in files:
-                self.add_photography(incident.id_incident, file)
-
-            if len(files) > 0:
-                self.add_photography_miniature(incident.id_incident, files[0])
-
-            incident.latitude = latitude
-            incident.longitude = longitude
-            incident.summary = summary
-            incident.reference = reference
-            incident.show_on_map = show_on_map
-            incident.inspector = inspector
-            incident.citizen_name = citizen_name
-            incident.citizen_lastname = citizen_lastname
-            incident.citizen_phone = citizen_phone
-            incident.citizen_email = citizen_email
-            incident.save()
+            photo_jobs = self.save_photographs(incident.id_incident, files)
+
+            with transaction.atomic():
+                # Releer con bloqueo: el snapshot debe ser el de la fila que se sobrescribe
+                incident = Incident.objects.select_for_update().get(id_incident=id_incident)
+                if incident.is_closed:
+                    raise Exception(f"Incident with ID {id_incident} is closed")
+                previous_coordinates = incident.coordinates
+                previous_snapshot = self.take_snapshot(incident)
+
+                incident.latitude = latitude
+                incident.longitude = longitude
+                incident.summary = summary
+                incident.reference = reference
+                incident.show_on_map = show_on_map
+                incident.inspector = inspector
+                incident.citizen_name = citizen_name
+                incident.citizen_lastname = citizen_lastname
+                incident.citizen_phone = citizen_phone
+                incident.citizen_email = citizen_email
+                incident.save()
+                self.apply_snapshots(previous_snapshot, self.take_snapshot(incident))
+                IncidentChangeService().record(incident.id_incident)
+                self.invalidate_map_caches(previous_coordinates, incident.coordinates)
 
             serializer = IncidentSerializer(incident)
-            return serializer.data
+            return self.with_photo_jobs(serializer.data, photo_jobs)
         
         except Exception as e:          
             raise Exception(e)
 
     def delete_photographys(self, incident_id: int):
         try:
+            PhotoJobService().cancel(incident_id)
             photographs = Photography.objects.filter(incident_id=incident_id)
             for photograph in photographs:
                 photography_service = PhotographyService()
                 photography_service.delete_photography_by_id(photograph.id_photography)
+            self.touch_incident(incident_id)
             return True
         except Exception as e:
             raise Exception(e)
@@ -440,17 +768,64 @@ class IncidentService:
         try:
             incident = Incident.objects.get(id_incident=id_incident)
             self.delete_photographys(incident.id_incident)
-            incident.delete()
+            with transaction.atomic():
+                incident = Incident.objects.select_for_update().get(id_incident=id_incident)
+                coordinates = incident.coordinates
+                self.apply_snapshots(before=self.take_snapshot(incident))
+                IncidentChangeService().record(incident.id_incident, IncidentChange.ACTION_DELETE)
+                incident.delete()
+            self.invalidate_map_caches(coordinates)
             return True
         except Exception as e:
             raise Exception(e)
 
 
+    def take_snapshot(self, incident: Incident):
+        """
+        Claves con las que el incidente aporta a los contadores y a las estadísticas.
+        Se toma antes y después de cada escritura para aplicar solo la diferencia.
+        """
+        return {
+            'counters': CounterService().snapshot(incident),
+            'statistics': IncidentStatisticsService().snapshot(incident),
+        }
+
+    def apply_snapshots(self, before: dict = None, after: dict = None):
+        """
+        Actualiza contadores y estadísticas con la diferencia entre dos snapshots.
+        Debe llamarse dentro de la misma transacción que la escritura del incidente.
+        """
+        before = before or {}
+        after = after or {}
+        CounterService().apply_change(before.get('counters'), after.get('counters'))
+        IncidentStatisticsService().apply_change(before.get('statistics'), after.get('statistics'))
+
+    def invalidate_map_caches(self, *coordinates):
+        """
+        Invalida las cachés del mapa para las coordenadas afectadas por una escritura.
+        Recibe tuplas (latitude, longitude) y se ejecuta al confirmar la transacción.
+        """
+        def invalidate():
+            ClusterService().invalidate_coordinates(*coordinates)
+            VectorTileService().invalidate_coordinates(*coordinates)
+
+        transaction.on_commit(invalidate)
+
     def total_incidents(self):
         try:
-            total = Incident.objects.count()
-            closed = Incident.objects.filter(is_closed=True).count()
-            in_progress = Incident.objects.filter(priority__isnull=False, is_closed=False).count()
+            # Con contadores activos la lectura es O(1); si no, una sola consulta agregada
+            counter_service = CounterService()
+            if counter_service.is_enabled():
+                return counter_service.get_totals()
+
+            totals = Incident.objects.aggregate(
+                total=Count('id_incident'),
+                closed=Count('id_incident', filter=Q(state_id=IncidentState.RESOLVED)),
+                in_progress=Count('id_incident', filter=Q(state_id=IncidentState.IN_PROGRESS)),
+            )
+            total = totals['total']
+            closed = totals['closed']
+            in_progress = totals['in_progress']
             presented = total - closed - in_progress
             
             return {
@@ -0,0 +1,78 @@
+from django.conf import settings
+
+from app_maps.models import IncidentChange
+
+
+class IncidentChangeService:
+    """
+    Log de cambios de incidentes para la sincronización incremental de clientes.
+
+    Cada escritura de IncidentService agrega una fila (upsert o delete) en la
+    misma transacción. Los clientes guardan el último `seq` recibido y piden
+    solo lo posterior a él.
+
+    En PostgreSQL el seq definitivo se asigna al confirmar la transacción (ver
+    0013_incidentchange), así un cambio nunca aparece con un seq menor que otro
+    ya leído por un cliente, sin bloquear las escrituras mientras duran.
+    """
+
+    def record(self, id_incident: int, action: str = IncidentChange.ACTION_UPSERT):
+        """
+        Registra un cambio del incidente. Debe llamarse dentro de la transacción
+        de la escritura.
+        """
+        IncidentChange.objects.create(id_incident=id_incident, action=action)
+
+    def get_changes(self, since=None, page_size=None):
+        """
+        Incidentes creados o modificados y eliminados después del cursor `since`.
+
+        Args:
+            since: Último seq recibido por el cliente (0 o vacío para sincronizar todo)
+            page_size: Máximo de filas del log a leer (por defecto INCIDENTS_MAX_PAGE_SIZE)
+
+        Returns:
+            dict: {'incidents': [...], 'deleted': [ids], 'cursor', 'has_more'}
+
+        Raises:
+            ValueError: Si el cursor o el tamaño de página no son válidos
+        """
+        # Importación local para evitar el ciclo IncidentService -> IncidentChangeService
+        from app_maps.services.incident import IncidentService
+
+        incident_service = IncidentService()
+        try:
+            since = int(since or 0)
+        except (TypeError, ValueError):
+            raise ValueError("since must be an integer")
+        if since < 0:
+            raise ValueError("since must be greater than or equal to 0")
+        page_size = incident_service.parse_page_size(page_size) if page_size else settings.INCIDENTS_MAX_PAGE_SIZE
+
+        changes = list(
+            IncidentChange.objects.filter(seq__gt=since)
+            .order_by('seq')
+            .values_list('seq', 'id_incident', 'action')[:page_size + 1]
+        )
+        has_more = len(changes) > page_size
+        changes = changes[:page_size]
+
+        # Solo importa la última acción de cada incidente dentro del lote
+        latest = {}
+        for _, id_incident, action in changes:
+            latest[id_incident] = action
+
+        upserted_ids = [id_incident for id_incident, action in latest.items() if action == IncidentChange.ACTION_UPSERT]
+        incidents = incident_service.get_incidents_queryset().filter(id_incident__in=upserted_ids) if upserted_ids else []
+        incidents = incident_service.serialize_incidents(incidents)
+
+        # Un upsert cuyo incidente ya no existe se eliminó en un lote posterior
+        found_ids = {incident['id_incident'] for incident in incidents}
+        deleted = sorted(id_incident for id_incident in latest if id_incident not in found_ids)
+
+        return {
+            'incidents': incidents,
+            'deleted': deleted,
+            'cursor': changes[-1][0] if changes else since,
+            'has_more': has_more,
+        }
@@ -0,0 +1,238 @@
+import bisect
+from collections import Counter, defaultdict
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from app_maps.models import Incident, IncidentCloseTimeStatistic, IncidentDailyStatistic
+
+
+class IncidentStatisticsService:
+    """
+    Estadísticas de incidentes por día, semana o mes a partir de tablas de rollup.
+
+    Las escrituras de IncidentService aplican la diferencia entre el estado
+    anterior y el nuevo de cada incidente (igual que los contadores), así que
+    consultar un año de datos agrupa unos pocos miles de filas pre-agregadas
+    en lugar de recorrer la tabla de incidentes.
+    """
+
+    # Límite superior (en horas) de cada bucket de tiempo hasta el cierre.
+    # El último bucket no tiene límite superior.
+    CLOSE_TIME_BUCKETS = [1, 2, 4, 8, 12, 24, 48, 72, 120, 168, 336, 720, 1440, 2160, 4320, 8760]
+
+    PERIODS = {
+        'day': None,
+        'week': TruncWeek,
+        'month': TruncMonth,
+    }
+
+    PERCENTILES = [50, 90, 95]
+
+    def snapshot(self, incident: Incident):
+        """
+        Retorna las claves de rollup a las que aporta el incidente.
+        """
+        keys = [('registered', timezone.localdate(incident.registration_date), incident.category_id, incident.state_id)]
+        if incident.is_closed and incident.closure_date:
+            keys.append((
+                'closed',
+                timezone.localdate(incident.closure_date),
+                incident.category_id,
+                self.get_bucket(incident.closure_date - incident.registration_date),
+            ))
+        return keys
+
+    def apply_change(self, before=None, after=None):
+        """
+        Aplica a los rollups la diferencia entre dos snapshots.
+
+        Args:
+            before: Snapshot antes de la escritura (None si el incidente es nuevo)
+            after: Snapshot después de la escritura (None si se eliminó)
+        """
+        deltas = Counter(after or [])
+        deltas.subtract(before or [])
+
+        with transaction.atomic():
+            for (kind, day, category_id, value), delta in sorted(deltas.items(), key=str):
+                if not delta:
+                    continue
+                if kind == 'registered':
+                    self._increment(IncidentDailyStatistic, 'registered', delta,
+                                    day=day, category_id=category_id, state_id=value)
+                else:
+                    self._increment(IncidentCloseTimeStatistic, 'closed', delta,
+                                    day=day, category_id=category_id, bucket=value)
+
+    def get_bucket(self, duration):
+        """Retorna el índice del bucket de tiempo hasta el cierre para un timedelta"""
+        hours = max(duration.total_seconds(), 0) / 3600
+        return bisect.bisect_left(self.CLOSE_TIME_BUCKETS, hours)
+
+    def get_statistics(self, period: str = 'day', from_date=None, to_date=None, id_category=None):
+        """
+        Incidentes registrados y cerrados agrupados por periodo, categoría y estado,
+        con percentiles aproximados del tiempo hasta el cierre.
+
+        Args:
+            period: 'day', 'week' o 'month'
+            from_date: Fecha inicial (date, inclusive)
+            to_date: Fecha final (date, inclusive)
+            id_category: Filtrar por categoría (opcional)
+
+        Returns:
+            dict: {'period', 'registered': [...], 'closed': [...], 'time_to_close': {...}}
+
+        Raises:
+            ValueError: Si el periodo no es válido
+        """
+        if period not in self.PERIODS:
+            raise ValueError(f"Invalid period '{period}'. Allowed: {', '.join(self.PERIODS)}")
+
+        registered_rows = self._filter(IncidentDailyStatistic.objects.all(), from_date, to_date, id_category)
+        registered_rows = self._group_by_period(registered_rows, period).values(
+            'period', 'category_id', 'state_id'
+        ).annotate(registered=Sum('registered')).filter(registered__gt=0).order_by('period', 'category_id', 'state_id')
+
+        registered = [
+            {
+                'period': row['period'].isoformat(),
+                'category': row['category_id'],
+                'id_state': row['state_id'],
+                'registered': row['registered'],
+            }
+            for row in registered_rows
+        ]
+
+        closed_rows = self._filter(IncidentCloseTimeStatistic.objects.all(), from_date, to_date, id_category)
+        closed_rows = self._group_by_period(closed_rows, period).values(
+            'period', 'category_id', 'bucket'
+        ).annotate(closed=Sum('closed')).filter(closed__gt=0).order_by('period', 'category_id', 'bucket')
+
+        closed_by_period = defaultdict(lambda: defaultdict(Counter))
+        total_buckets = Counter()
+        for row in closed_rows:
+            closed_by_period[row['period']][row['category_id']][row['bucket']] += row['closed']
+            total_buckets[row['bucket']] += row['closed']
+
+        closed = []
+        for period_start, categories in closed_by_period.items():
+            for category_id, buckets in categories.items():
+                item = {
+                    'period': period_start.isoformat(),
+                    'category': category_id,
+                    'closed': sum(buckets.values()),
+                }
+                item.update(self.get_percentiles(buckets))
+                closed.append(item)
+
+        time_to_close = {'closed': sum(total_buckets.values())}
+        time_to_close.update(self.get_percentiles(total_buckets))
+
+        return {
+            'period': period,
+            'registered': registered,
+            'closed': closed,
+            'time_to_close': time_to_close,
+        }
+
+    def get_percentiles(self, buckets: Counter):
+        """
+        Estima percentiles (en horas) interpolando linealmente dentro de cada bucket.
+        """
+        total = sum(buckets.values())
+        result = {}
+        for percentile in self.PERCENTILES:
+            key = f'p{percentile}_hours'
+            if not total:
+                result[key] = None
+                continue
+
+            target = total * percentile / 100
+            accumulated = 0
+            for bucket in sorted(buckets):
+                count = buckets[bucket]
+                if accumulated + count >= target:
+                    lower = self.CLOSE_TIME_BUCKETS[bucket - 1] if bucket > 0 else 0
+                    if bucket >= len(self.CLOSE_TIME_BUCKETS):
+                        result[key] = float(lower)
+                    else:
+                        upper = self.CLOSE_TIME_BUCKETS[bucket]
+                        result[key] = round(lower + (upper - lower) * (target - accumulated) / count, 2)
+                    break
+                accumulated += count
+        return result
+
+    def rebuild(self):
+        """
+        Recalcula desde cero las tablas de rollup a partir de la tabla de incidentes.
+
+        Returns:
+            tuple: (filas diarias, filas de tiempo de cierre) escritas
+        """
+        with transaction.atomic():
+            # Bloquear escrituras concurrentes de incidentes mientras se reconstruye
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute(f'LOCK TABLE {Incident._meta.db_table} IN SHARE MODE')
+
+            daily = Incident.objects.annotate(
+                day=TruncDate('registration_date', tzinfo=timezone.get_current_timezone())
+            ).values_list('day', 'category_id', 'state_id').annotate(count=Count('id_incident')).order_by()
+
+            daily_rows = [
+                IncidentDailyStatistic(day=day, category_id=category_id, state_id=state_id, registered=count)
+                for day, category_id, state_id, count in daily
+            ]
+
+            close_times = Counter()
+            closed_incidents = Incident.objects.filter(
+                is_closed=True, closure_date__isnull=False
+            ).values_list('registration_date', 'closure_date', 'category_id')
+            for registration_date, closure_date, category_id in closed_incidents.iterator(chunk_size=5000):
+                close_times[(
+                    timezone.localdate(closure_date),
+                    category_id,
+                    self.get_bucket(closure_date - registration_date),
+                )] += 1
+
+            close_rows = [
+                IncidentCloseTimeStatistic(day=day, category_id=category_id, bucket=bucket, closed=count)
+                for (day, category_id, bucket), count in close_times.items()
+            ]
+
+            IncidentDailyStatistic.objects.all().delete()
+            IncidentCloseTimeStatistic.objects.all().delete()
+            IncidentDailyStatistic.objects.bulk_create(daily_rows, batch_size=1000)
+            IncidentCloseTimeStatistic.objects.bulk_create(close_rows, batch_size=1000)
+
+        return len(daily_rows), len(close_rows)
+
+    def _filter(self, queryset, from_date, to_date, id_category):
+        if from_date:
+            queryset = queryset.filter(day__gte=from_date)
+        if to_date:
+            queryset = queryset.filter(day__lte=to_date)
+        if id_category:
+            queryset = queryset.filter(category_id=id_category)
+        return queryset
+
+    def _group_by_period(self, queryset, period: str):
+        trunc = self.PERIODS[period]
+        if trunc is None:
+            return queryset.annotate(period=F('day'))
+        return queryset.annotate(period=trunc('day'))
+
+    def _increment(self, model, field: str, delta: int, **keys):
+        updated = model.objects.filter(**keys).update(**{field: F(field) + delta})
+        if updated:
+            return
+        try:
+            with transaction.atomic():
+                model.objects.create(**keys, **{field: delta})
+        except IntegrityError:
+            # Otro proceso creó la fila al mismo tiempo
+            model.objects.filter(**keys).update(**{field: F(field) + delta})
@@ -0,0 +1,187 @@
+import os
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from app_maps.models import Photography, PhotoJob
+
+
+class PhotoJobService:
+    """
+    Cola de procesamiento de fotografías en la base de datos (sin broker externo).
+
+    La petición guarda los archivos originales en PHOTO_SPOOL_DIR y crea un
+    PhotoJob por archivo; `manage.py process_photo_jobs` los toma con un lease
+    (UPDATE condicional, así dos workers nunca procesan el mismo trabajo), los
+    optimiza, los sube a R2 y registra la Photography. Los errores se reintentan
+    con espera exponencial hasta PHOTO_JOB_MAX_ATTEMPTS intentos.
+    """
+
+    def enqueue(self, id_incident: int, files):
+        """
+        Guarda los archivos en el spool y crea sus trabajos.
+
+        Returns:
+            list[PhotoJob]: Trabajos creados
+        """
+        os.makedirs(settings.PHOTO_SPOOL_DIR, exist_ok=True)
+        jobs = []
+        try:
+            for index, file in enumerate(files):
+                spool_path = os.path.join(
+                    settings.PHOTO_SPOOL_DIR, f"{uuid.uuid4().hex}{os.path.splitext(file.name)[1]}"
+                )
+                with open(spool_path, 'wb') as spool_file:
+                    for chunk in file.chunks():
+                        spool_file.write(chunk)
+                jobs.append(PhotoJob(
+                    incident_id=id_incident,
+                    spool_path=spool_path,
+                    name=file.name,
+                    content_type=file.content_type or '',
+                    file_size=file.size,
+                    make_miniature=index == 0,
+                ))
+            return PhotoJob.objects.bulk_create(jobs)
+        except Exception:
+            self.remove_spool_files(job.spool_path for job in jobs)
+            raise
+
+    def lease(self, worker: str, limit: int):
+        """
+        Toma hasta `limit` trabajos disponibles para `worker`.
+
+        Cada trabajo se reclama con un UPDATE condicionado a que siga disponible:
+        si otro worker lo tomó antes, el UPDATE no afecta filas y se omite.
+
+        Returns:
+            list[PhotoJob]: Trabajos tomados (con attempts ya incrementado)
+        """
+        now = timezone.now()
+        available = (
+            Q(status=PhotoJob.STATUS_PENDING, available_at__lte=now)
+            | Q(status=PhotoJob.STATUS_PROCESSING, leased_until__lt=now)
+        )
+        candidates = list(
+            PhotoJob.objects.filter(available).order_by('available_at', 'id_photo_job')
+            .values_list('id_photo_job', flat=True)[:limit * 2]
+        )
+
+        leased = []
+        for id_photo_job in candidates:
+            updated = PhotoJob.objects.filter(available, id_photo_job=id_photo_job).update(
+                status=PhotoJob.STATUS_PROCESSING,
+                leased_by=worker,
+                leased_until=now + timedelta(seconds=settings.PHOTO_JOB_LEASE_SECONDS),
+                attempts=F('attempts') + 1,
+            )
+            if updated:
+                leased.append(id_photo_job)
+            if len(leased) >= limit:
+                break
+
+        return list(PhotoJob.objects.filter(id_photo_job__in=leased))
+
+    def open_file(self, job: PhotoJob) -> UploadedFile:
+        """Archivo del spool como UploadedFile, listo para FileUtils.optimize_image"""
+        return UploadedFile(
+            open(job.spool_path, 'rb'), name=job.name, content_type=job.content_type, size=job.file_size
+        )
+
+    def complete(self, job: PhotoJob, worker: str, r2_key: str) -> bool:
+        """
+        Registra la fotografía y marca el trabajo como terminado, solo si el lease
+        sigue siendo de `worker` (si venció y otro worker lo tomó, retorna False).
+        """
+        # Importación local para evitar el ciclo IncidentService -> PhotoJobService
+        from app_maps.services.incident import IncidentService
+
+        with transaction.atomic():
+            leased = PhotoJob.objects.select_for_update().filter(
+                id_photo_job=job.id_photo_job, status=PhotoJob.STATUS_PROCESSING, leased_by=worker
+            ).exists()
+            if not leased:
+                return False
+            photography = Photography.objects.create(
+                incident_id=job.incident_id,
+                name=job.name,
+                content_type=job.content_type,
+                file_size=job.file_size,
+                r2_key=r2_key,
+            )
+            PhotoJob.objects.filter(id_photo_job=job.id_photo_job).update(
+                status=PhotoJob.STATUS_DONE,
+                photography=photography,
+                leased_until=None,
+                last_error=None,
+            )
+            IncidentService().touch_incident(job.incident_id)
+
+        self.remove_spool_files([job.spool_path])
+        return True
+
+    def fail(self, job: PhotoJob, worker: str, error: str):
+        """
+        Reprograma el trabajo con espera exponencial, o lo marca como fallido si
+        agotó sus intentos (el archivo queda en el spool para revisarlo).
+        """
+        if job.attempts >= settings.PHOTO_JOB_MAX_ATTEMPTS:
+            changes = {'status': PhotoJob.STATUS_FAILED}
+        else:
+            delay = settings.PHOTO_JOB_RETRY_BACKOFF * 2 ** (job.attempts - 1)
+            changes = {
+                'status': PhotoJob.STATUS_PENDING,
+                'available_at': timezone.now() + timedelta(seconds=delay),
+            }
+        updated = PhotoJob.objects.filter(
+            id_photo_job=job.id_photo_job, status=PhotoJob.STATUS_PROCESSING, leased_by=worker
+        ).update(leased_until=None, last_error=error[:2000], **changes)
+        # Los reintentos no cambian el resultado visible: solo el fallo definitivo
+        if updated and changes['status'] == PhotoJob.STATUS_FAILED:
+            self.touch_incidents([job.incident_id])
+
+    def cancel(self, id_incident: int):
+        """Elimina los trabajos sin terminar de un incidente y sus archivos del spool"""
+        jobs = PhotoJob.objects.filter(incident_id=id_incident).exclude(status=PhotoJob.STATUS_DONE)
+        spool_paths = list(jobs.values_list('spool_path', flat=True))
+        jobs.delete()
+        transaction.on_commit(lambda: self.remove_spool_files(spool_paths))
+
+    def get_jobs(self, id_incident: int):
+        """Estado de procesamiento de cada fotografía del incidente"""
+        return [
+            {
+                'id_photo_job': job['id_photo_job'],
+                'name': job['name'],
+                'status': job['status'],
+                'attempts': job['attempts'],
+                'id_photography': job['photography_id'],
+                'error': job['last_error'] if job['status'] == PhotoJob.STATUS_FAILED else None,
+            }
+            for job in PhotoJob.objects.filter(incident_id=id_incident).order_by('id_photo_job').values(
+                'id_photo_job', 'name', 'status', 'attempts', 'photography_id', 'last_error'
+            )
+        ]
+
+    def touch_incidents(self, incident_ids):
+        """
+        Invalida el ETag del detalle cuando un trabajo termina (complete o fallo
+        definitivo); tomar o reprogramar un trabajo no lo toca.
+        """
+        from app_maps.services.incident import IncidentService
+
+        incident_service = IncidentService()
+        for id_incident in incident_ids:
+            incident_service.touch_incident(id_incident)
+
+    def remove_spool_files(self, spool_paths):
+        for spool_path in spool_paths:
+            try:
+                os.remove(spool_path)
+            except FileNotFoundError:
+                pass
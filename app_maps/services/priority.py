@@ -1,13 +1,21 @@
 from app_maps.models import IncidentPriority
 from app_maps.serializers import IncidentPrioritySerializer
+from app_maps.services.reference_data import ReferenceDataCache
 
 class PriorityService:    
     def get_priority_by_id(self, id: int):
-        priority = IncidentPriority.objects.get(id_priority=id)
-        serializer = IncidentPrioritySerializer(priority)
-        return serializer.data
+        try:
+            priority = {row['id_priority']: row for row in self.get_all_priorities()}.get(int(id))
+        except (TypeError, ValueError):
+            priority = None
+        if priority is None:
+            raise IncidentPriority.DoesNotExist(f"Priority with ID {id} not found")
+        return priority
     
     def get_all_priorities(self):
+        return ReferenceDataCache().get('priorities', self._load_priorities)
+
+    def _load_priorities(self):
         priorities = IncidentPriority.objects.all().order_by('id_priority')
         serializer = IncidentPrioritySerializer(priorities, many=True)
-        return serializer.data
\ No newline at end of file
+        return serializer.data
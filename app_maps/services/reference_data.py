@@ -0,0 +1,66 @@
+import hashlib
+import threading
+import uuid
+
+from django.core.cache import cache
+
+
+VERSION_KEY = 'reference-data-version'
+
+# Copia en memoria del proceso: {nombre: (versión, filas)}
+_local_cache = {}
+_lock = threading.Lock()
+
+
+class ReferenceDataCache:
+    """
+    Caché en memoria de las tablas de referencia (categorías, estados,
+    prioridades y tipos de cierre).
+
+    Cada proceso guarda su propia copia de las filas serializadas junto con la
+    versión con la que se cargaron. La versión vive en la caché compartida de
+    Django y se renueva al guardar o eliminar un registro (ver app_maps.signals),
+    así que en estado estable una consulta cuesta una lectura de la caché y
+    ninguna a la base de datos.
+    """
+
+    def get(self, name: str, loader):
+        """
+        Retorna las filas de `name`, cargándolas con `loader` si la versión cambió.
+
+        Args:
+            name: Nombre de la tabla de referencia
+            loader: Función sin argumentos que retorna la lista de filas serializadas
+
+        Returns:
+            list: Copia de las filas (se pueden modificar sin afectar la caché)
+        """
+        version = self.get_version()
+        entry = _local_cache.get(name)
+        if entry is None or entry[0] != version:
+            rows = tuple(dict(row) for row in loader())
+            with _lock:
+                _local_cache[name] = (version, rows)
+        else:
+            rows = entry[1]
+        return [dict(row) for row in rows]
+
+    def get_version(self) -> str:
+        version = cache.get(VERSION_KEY)
+        if version is None:
+            # add() no pisa la versión si otro proceso la creó al mismo tiempo
+            cache.add(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+            version = cache.get(VERSION_KEY)
+            if version is None:
+                # Caché sin almacenamiento (DummyCache): no reutilizar copias
+                version = uuid.uuid4().hex
+        return version
+
+    def bump_version(self):
+        """Invalida las copias de todos los procesos"""
+        cache.set(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+
+    def get_etag(self, *parts) -> str:
+        """ETag para una respuesta que depende solo de las tablas de referencia y de `parts`"""
+        value = ':'.join(str(part) for part in (self.get_version(), *parts))
+        return hashlib.md5(value.encode('utf-8')).hexdigest()
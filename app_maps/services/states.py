@@ -1,19 +1,22 @@
 from app_maps.models import IncidentState
 from app_maps.serializers import IncidentStateSerializer
+from app_maps.services.reference_data import ReferenceDataCache
 
 class StateService:
-    def __init__(self):
-        states = IncidentState.objects.all()
-        serializer = IncidentStateSerializer(states, many=True)
     
     def get_state_by_id(self, id: int):
-        state = IncidentState.objects.get(id=id)
-        serializer = IncidentStateSerializer(state)
-        return serializer.data
+        try:
+            state = {row['id_state']: row for row in self.get_all_states()}.get(int(id))
+        except (TypeError, ValueError):
+            state = None
+        if state is None:
+            raise IncidentState.DoesNotExist(f"State with ID {id} not found")
+        return state
     
     def get_all_states(self):
+        return ReferenceDataCache().get('states', self._load_states)
+
+    def _load_states(self):
         states = IncidentState.objects.all()
         serializer = IncidentStateSerializer(states, many=True)
         return serializer.data
-    
-    
\ No newline at end of file
@@ -0,0 +1,292 @@
+import csv
+import io
+import random
+from datetime import timedelta
+from itertools import accumulate
+from operator import attrgetter
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.utils import timezone
+
+from app_maps.geohash import encode as encode_geohash
+from app_maps.models import (
+    Incident,
+    IncidentCategory,
+    IncidentChange,
+    IncidentClosureType,
+    IncidentPriority,
+    Photography,
+)
+
+
+# Centro de Piura, usado como ciudad por defecto para los datos sintéticos
+DEFAULT_CENTER = (-5.19449, -80.63282)
+# Dispersión (desviación estándar en grados, ~3 km) alrededor de cada centro
+DEFAULT_SPREAD = 0.03
+
+SUMMARIES = [
+    'Bache en la calzada',
+    'Semáforo malogrado',
+    'Señal de tránsito caída',
+    'Buzón sin tapa',
+    'Poste de alumbrado apagado',
+    'Acumulación de basura en la vía',
+    'Vereda rota',
+    'Aniego por rotura de tubería',
+    'Árbol caído sobre la pista',
+    'Falta de señalización en cruce peatonal',
+]
+REFERENCES = [
+    'Esquina de Av. Grau con Av. Loreto',
+    'Frente al mercado central',
+    'Cerca del colegio',
+    'Altura de la cuadra 5',
+    'Costado del parque',
+    '',
+]
+CITIZEN_NAMES = ['María', 'José', 'Rosa', 'Luis', 'Carmen', 'Juan', 'Ana', 'Carlos', 'Lucía', 'Jorge']
+CITIZEN_LASTNAMES = ['García', 'Flores', 'Rodríguez', 'Quispe', 'Sánchez', 'Ramírez', 'Chávez', 'Castillo']
+CLOSURE_DESCRIPTIONS = ['Atendido por la cuadrilla', 'Derivado a la entidad competente', 'Sin evidencia en campo']
+
+
+class SyntheticDataService:
+    """
+    Genera incidentes sintéticos con bulk_create (o COPY en PostgreSQL) para
+    pruebas de rendimiento y planificación de capacidad.
+
+    Los incidentes se agrupan alrededor de uno o más centros, las categorías
+    siguen una distribución sesgada (Zipf) y las proporciones de estados y de
+    inspectores / ciudadanos son configurables, respetando las reglas de
+    Incident.save (show_on_map según el tipo de usuario, geohash y estado derivados).
+    """
+
+    def __init__(self, seed: int = None, centers=None, category_skew: float = 1.0,
+                 closed_ratio: float = 0.3, in_progress_ratio: float = 0.35,
+                 inspector_ratio: float = 0.5, days: int = 0):
+        """
+        Args:
+            seed: Semilla para que los datos sean reproducibles
+            centers: Lista de (latitude, longitude, spread); por defecto DEFAULT_CENTER
+            category_skew: Exponente Zipf de las categorías (0 = uniforme)
+            closed_ratio: Fracción de incidentes cerrados
+            in_progress_ratio: Fracción de incidentes abiertos con prioridad (en proceso)
+            inspector_ratio: Fracción de incidentes registrados por inspectores
+            days: Las fechas de registro se reparten en los últimos `days` días (0 = ahora)
+
+        Raises:
+            ValueError: Si las proporciones no son válidas
+        """
+        if not 0 <= closed_ratio <= 1 or not 0 <= in_progress_ratio <= 1 or not 0 <= inspector_ratio <= 1:
+            raise ValueError("Ratios must be between 0 and 1")
+        if closed_ratio + in_progress_ratio > 1:
+            raise ValueError("closed_ratio + in_progress_ratio cannot exceed 1")
+
+        self.random = random.Random(seed)
+        self.centers = centers or [(*DEFAULT_CENTER, DEFAULT_SPREAD)]
+        self.category_skew = category_skew
+        self.closed_ratio = closed_ratio
+        self.in_progress_ratio = in_progress_ratio
+        self.inspector_ratio = inspector_ratio
+        self.days = days
+
+    def create_incidents(self, count: int, batch_size: int = 5000, photo_ratio: float = 0.5,
+                         use_copy: bool = False, record_changes: bool = False):
+        """
+        Crea `count` incidentes (y fotografías para una fracción de ellos) por lotes.
+
+        Args:
+            count: Número de incidentes a crear
+            batch_size: Tamaño de cada lote
+            photo_ratio: Fracción de incidentes que tendrán una fotografía
+            use_copy: Insertar con COPY (solo PostgreSQL), varias veces más rápido que bulk_create
+            record_changes: Registrar cada incidente en el log de cambios (incident_change)
+
+        Returns:
+            int: Número de incidentes creados
+
+        Raises:
+            ValueError: Si se pide COPY con una base de datos que no es PostgreSQL
+        """
+        if use_copy and connection.vendor != 'postgresql':
+            raise ValueError("COPY is only available on PostgreSQL")
+
+        references = self.get_references()
+        created = 0
+        while created < count:
+            size = min(batch_size, count - created)
+            incidents = [self.build_incident(references) for _ in range(size)]
+
+            if use_copy:
+                self.assign_ids(incidents)
+                _copy(Incident, incidents, include_pk=True)
+            else:
+                incidents = _bulk_create(Incident, incidents, ['registration_date', 'updated_at'], batch_size)
+
+            photographs = [
+                Photography(
+                    incident_id=incident.id_incident,
+                    name='photo.jpg',
+                    content_type='image/jpeg',
+                    file_size=self.random.randint(50_000, 400_000),
+                    r2_key=f'incidents/{incident.id_incident}/photo.jpg',
+                    upload_date=incident.registration_date,
+                )
+                for incident in incidents
+                if self.random.random() < photo_ratio
+            ]
+            changes = [
+                IncidentChange(
+                    id_incident=incident.id_incident,
+                    action=IncidentChange.ACTION_UPSERT,
+                    changed_at=incident.updated_at,
+                )
+                for incident in incidents
+            ] if record_changes else []
+
+            if use_copy:
+                _copy(Photography, photographs)
+                _copy(IncidentChange, changes)
+            else:
+                _bulk_create(Photography, photographs, ['upload_date'], batch_size)
+                _bulk_create(IncidentChange, changes, ['changed_at'], batch_size)
+
+            created += size
+        return created
+
+    def build_incident(self, references: dict):
+        """Construye (sin guardar) un incidente aleatorio alrededor de uno de los centros"""
+        center_latitude, center_longitude, spread = self.random.choice(self.centers)
+        latitude = round(center_latitude + self.random.gauss(0, spread), 8)
+        longitude = round(center_longitude + self.random.gauss(0, spread), 8)
+        now = timezone.now()
+        registration_date = now - timedelta(seconds=self.random.uniform(0, self.days * 86400))
+
+        incident = Incident(
+            registration_date=registration_date,
+            category_id=self.random.choices(references['category_ids'], cum_weights=references['category_weights'])[0],
+            latitude=latitude,
+            longitude=longitude,
+            geohash=encode_geohash(latitude, longitude),
+            summary=self.random.choice(SUMMARIES),
+            reference=self.random.choice(REFERENCES),
+        )
+
+        # Mismas reglas que Incident.save: bulk_create y COPY no lo llaman
+        if self.random.random() < self.inspector_ratio:
+            incident.user_type = '1'
+            incident.show_on_map = True
+            incident.inspector_id = self.random.choice(references['user_ids']) if references['user_ids'] else None
+        else:
+            incident.user_type = '2'
+            incident.show_on_map = False
+            incident.citizen_name = self.random.choice(CITIZEN_NAMES)
+            incident.citizen_lastname = self.random.choice(CITIZEN_LASTNAMES)
+            incident.citizen_phone = f'9{self.random.randint(0, 99_999_999):08d}'
+
+        state = self.random.random()
+        if state < self.closed_ratio:
+            incident.is_closed = True
+            # Tiempo de atención con distribución exponencial (media de 3 días), sin pasar de ahora
+            incident.closure_date = min(registration_date + timedelta(days=self.random.expovariate(1 / 3)), now)
+            incident.closure_type_id = self.random.choice(references['closure_type_ids']) if references['closure_type_ids'] else None
+            incident.closure_description = self.random.choice(CLOSURE_DESCRIPTIONS)
+            incident.closure_user_id = self.random.choice(references['user_ids']) if references['user_ids'] else None
+        elif state < self.closed_ratio + self.in_progress_ratio and references['priority_ids']:
+            incident.priority_id = self.random.choice(references['priority_ids'])
+
+        incident.state_id = incident.compute_state_id()
+        incident.updated_at = incident.closure_date or registration_date
+        return incident
+
+    def assign_ids(self, incidents):
+        """Reserva ids de la secuencia de incident (necesario para COPY, que no los retorna)"""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT nextval(pg_get_serial_sequence(%s, %s)) FROM generate_series(1, %s)",
+                [Incident._meta.db_table, Incident._meta.pk.column, len(incidents)]
+            )
+            for incident, (id_incident,) in zip(incidents, cursor.fetchall()):
+                incident.id_incident = id_incident
+
+    def get_references(self):
+        """Ids de las tablas relacionadas y pesos acumulados (Zipf) de las categorías"""
+        category_ids = list(IncidentCategory.objects.order_by('id_category').values_list('id_category', flat=True))
+        if not category_ids:
+            category_ids = [IncidentCategory.objects.create(description='Categoría sintética').id_category]
+        weights = [1 / (rank + 1) ** self.category_skew for rank in range(len(category_ids))]
+
+        return {
+            'category_ids': category_ids,
+            'category_weights': list(accumulate(weights)),
+            'priority_ids': list(IncidentPriority.objects.values_list('id_priority', flat=True)),
+            'closure_type_ids': list(IncidentClosureType.objects.values_list('id_closure_type', flat=True)),
+            'user_ids': list(User.objects.filter(is_active=True).order_by('id').values_list('id', flat=True)[:100]),
+        }
+
+
+def _bulk_create(model, objects, timestamp_fields, batch_size: int):
+    """
+    bulk_create conservando las fechas generadas. auto_now / auto_now_add las
+    reemplazan por la hora actual al insertar, así que se vuelven a escribir con
+    un UPDATE ... FROM (VALUES ...) por lote. COPY no lo necesita: escribe los
+    valores tal cual.
+    """
+    if not objects:
+        return objects
+    timestamps = [[getattr(obj, name) for name in timestamp_fields] for obj in objects]
+    objects = model.objects.bulk_create(objects, batch_size=batch_size)
+
+    # bulk_update arma un CASE WHEN por fila y multiplica el tiempo de la inserción
+    quote = connection.ops.quote_name
+    fields = [model._meta.get_field(name) for name in timestamp_fields]
+    assignments = ', '.join(
+        f'{quote(field.column)} = v.column{index}' for index, field in enumerate(fields, 2)
+    )
+    chunk_size = 500
+    with connection.cursor() as cursor:
+        for start in range(0, len(objects), chunk_size):
+            chunk = list(zip(objects[start:start + chunk_size], timestamps[start:start + chunk_size]))
+            placeholders = ', '.join(['(' + ', '.join(['%s'] * (len(fields) + 1)) + ')'] * len(chunk))
+            params = []
+            for obj, values in chunk:
+                params.append(obj.pk)
+                params.extend(field.get_db_prep_value(value, connection) for field, value in zip(fields, values))
+            cursor.execute(
+                f'UPDATE {quote(model._meta.db_table)} SET {assignments} '
+                f'FROM (VALUES {placeholders}) AS v '
+                f'WHERE {quote(model._meta.db_table)}.{quote(model._meta.pk.column)} = v.column1',
+                params
+            )
+
+    for obj, values in zip(objects, timestamps):
+        for name, value in zip(timestamp_fields, values):
+            setattr(obj, name, value)
+    return objects
+
+
+def _copy(model, objects, include_pk: bool = False):
+    """Inserta `objects` con COPY ... FROM STDIN (PostgreSQL / psycopg2)"""
+    if not objects:
+        return
+    fields = [
+        field for field in model._meta.concrete_fields
+        if (include_pk or not field.primary_key) and field.column != 'search_vector'
+    ]
+    # Los valores generados ya son tipos simples (int, str, Decimal, bool, datetime)
+    # cuyo str() acepta PostgreSQL: no hace falta get_db_prep_save por cada celda
+    get_values = attrgetter(*[field.attname for field in fields])
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows(
+        [r'\N' if value is None else value for value in get_values(obj)]
+        for obj in objects
+    )
+    buffer.seek(0)
+
+    columns = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+    with connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {connection.ops.quote_name(model._meta.db_table)} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+            buffer
+        )
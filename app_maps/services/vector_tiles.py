@@ -0,0 +1,258 @@
+import math
+
+from django.conf import settings
+from django.core.cache import cache
+
+from app_maps.models import Incident
+from app_maps.services.clusters import ClusterService
+from app_maps.services.reference_data import ReferenceDataCache
+
+
+CACHE_PREFIX = 'incident-tiles'
+
+LAYER_NAME = 'incidents'
+
+# Resolución interna de cada tile (valor por defecto de la especificación MVT)
+TILE_EXTENT = 4096
+
+# Margen alrededor del tile para que los íconos en el borde no se corten
+TILE_BUFFER = 64
+
+
+class VectorTileService:
+    """
+    Genera tiles vectoriales (Mapbox Vector Tile 2.1) con los incidentes visibles en el mapa.
+
+    Desde VECTOR_TILE_CLUSTER_ZOOM cada feature es un incidente con las propiedades
+    id, category, id_state y color; por debajo de ese zoom (o si un tile superaría
+    VECTOR_TILE_MAX_FEATURES) los features son los clusters de ClusterService, con
+    las propiedades cluster, count e id_state (el estado con más incidentes).
+
+    Los tiles de incidentes se guardan en caché y solo se regeneran cuando un
+    incidente dentro de ellos cambia (ver invalidate_coordinates) o cambian los
+    datos de referencia (la clave incluye la versión de ReferenceDataCache, por
+    el color del estado). Los tiles de clusters no se guardan: ClusterService ya
+    mantiene en caché cada celda.
+    """
+
+    def get_tile(self, z: int, x: int, y: int) -> bytes:
+        """
+        Retorna el tile (z, x, y) codificado en formato MVT.
+
+        Raises:
+            ValueError: Si las coordenadas del tile no son válidas
+        """
+        max_zoom = getattr(settings, 'VECTOR_TILE_MAX_ZOOM', 20)
+        if not (0 <= z <= max_zoom) or not (0 <= x < 2 ** z) or not (0 <= y < 2 ** z):
+            raise ValueError(f"Invalid tile coordinates {z}/{x}/{y}")
+
+        if z < self._cluster_zoom():
+            return self._encode_features(self._get_cluster_features(z, x, y))
+
+        key = self._cache_key(z, x, y, ReferenceDataCache().get_version())
+        tile = cache.get(key)
+        if tile is None:
+            tile = self._encode_features(self._get_features(z, x, y))
+            cache.set(key, tile, timeout=getattr(settings, 'VECTOR_TILE_CACHE_TIMEOUT', 86400))
+        return tile
+
+    def invalidate_coordinates(self, *coordinates):
+        """
+        Elimina de la caché los tiles que contienen (incluyendo el margen) las
+        coordenadas dadas. Solo los niveles de zoom que se guardan en caché: por
+        debajo de VECTOR_TILE_CLUSTER_ZOOM los tiles se arman desde los clusters.
+        Recibe tuplas (latitude, longitude).
+        """
+        max_zoom = getattr(settings, 'VECTOR_TILE_MAX_ZOOM', 20)
+        buffer = TILE_BUFFER / TILE_EXTENT
+        version = ReferenceDataCache().get_version()
+        keys = set()
+        for latitude, longitude in coordinates:
+            if latitude is None or longitude is None:
+                continue
+            for z in range(self._cluster_zoom(), max_zoom + 1):
+                tile_x, tile_y = self._project(latitude, longitude, z)
+                n = 2 ** z
+                for x in {int(tile_x - buffer), int(tile_x), int(tile_x + buffer)}:
+                    for y in {int(tile_y - buffer), int(tile_y), int(tile_y + buffer)}:
+                        if 0 <= x < n and 0 <= y < n:
+                            keys.add(self._cache_key(z, x, y, version))
+        if keys:
+            cache.delete_many(list(keys))
+
+    def _get_features(self, z: int, x: int, y: int):
+        """
+        Features de los incidentes del tile, con una proyección mínima.
+        Si el tile tendría más de VECTOR_TILE_MAX_FEATURES incidentes se usan clusters.
+        """
+        # Importación local para evitar el ciclo IncidentService -> VectorTileService
+        from app_maps.services.incident import IncidentService
+
+        max_features = getattr(settings, 'VECTOR_TILE_MAX_FEATURES', 2000)
+        min_lat, min_lng, max_lat, max_lng = self._tile_bounds(z, x, y, TILE_BUFFER / TILE_EXTENT)
+
+        incidents = Incident.objects.filter(show_on_map=True)
+        incidents = IncidentService().filter_by_viewport(incidents, min_lat, min_lng, max_lat, max_lng)
+        rows = list(incidents.values_list(
+            'id_incident', 'latitude', 'longitude', 'category_id', 'state_id', 'state__color'
+        ).order_by('id_incident')[:max_features + 1])
+        if len(rows) > max_features:
+            return self._get_cluster_features(z, x, y)
+
+        features = []
+        for id_incident, latitude, longitude, category_id, id_state, color in rows:
+            features.append((
+                id_incident,
+                *self._tile_position(latitude, longitude, z, x, y),
+                {
+                    'id': id_incident,
+                    'category': category_id,
+                    'id_state': id_state,
+                    'color': color,
+                },
+            ))
+        return features
+
+    def _get_cluster_features(self, z: int, x: int, y: int):
+        """
+        Features de los clusters del tile (como mucho MAX_CLUSTER_CELLS).
+        Un cluster cuyo centro cae fuera del tile (y su margen) se omite: lo dibuja el tile vecino.
+        """
+        min_lat, min_lng, max_lat, max_lng = self._tile_bounds(z, x, y, TILE_BUFFER / TILE_EXTENT)
+        clusters = ClusterService().get_clusters(min_lat, min_lng, max_lat, max_lng, zoom=z, show_on_map=True)
+
+        features = []
+        for index, cluster in enumerate(clusters, start=1):
+            position_x, position_y = self._tile_position(cluster['latitude'], cluster['longitude'], z, x, y)
+            if not (-TILE_BUFFER <= position_x <= TILE_EXTENT + TILE_BUFFER
+                    and -TILE_BUFFER <= position_y <= TILE_EXTENT + TILE_BUFFER):
+                continue
+            main_state = max(cluster['states'], key=lambda state: state['count'])
+            properties = {
+                'cluster': cluster['count'] > 1,
+                'count': cluster['count'],
+                'id_state': main_state['id_state'],
+                'color': main_state['color_state'],
+            }
+            if 'incident' in cluster:
+                properties['id'] = cluster['incident']['id_incident']
+                properties['category'] = cluster['incident']['category']
+            features.append((index, position_x, position_y, properties))
+        return features
+
+    def _encode_features(self, features) -> bytes:
+        if not features:
+            return b''
+        return _encode_tile(LAYER_NAME, features)
+
+    def _tile_position(self, latitude, longitude, z: int, x: int, y: int):
+        """Posición de una coordenada en la resolución interna del tile (x, y)"""
+        tile_x, tile_y = self._project(latitude, longitude, z)
+        return round((tile_x - x) * TILE_EXTENT), round((tile_y - y) * TILE_EXTENT)
+
+    def _cluster_zoom(self):
+        return getattr(settings, 'VECTOR_TILE_CLUSTER_ZOOM', 10)
+
+    def _project(self, latitude, longitude, z: int):
+        """Proyecta una coordenada a posición fraccionaria de tile (Web Mercator)"""
+        latitude = max(min(float(latitude), 85.05112878), -85.05112878)
+        n = 2 ** z
+        tile_x = (float(longitude) + 180.0) / 360.0 * n
+        lat_rad = math.radians(latitude)
+        tile_y = (1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * n
+        return tile_x, tile_y
+
+    def _tile_bounds(self, z: int, x: int, y: int, buffer: float):
+        """Retorna (min_lat, min_lng, max_lat, max_lng) del tile ampliado con el margen"""
+        n = 2 ** z
+
+        def to_lat(tile_y):
+            return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * tile_y / n))))
+
+        min_lng = max((x - buffer) / n * 360.0 - 180.0, -180.0)
+        max_lng = min((x + 1 + buffer) / n * 360.0 - 180.0, 180.0)
+        # En Web Mercator el eje y crece hacia el sur
+        min_lat = max(to_lat(y + 1 + buffer), -90.0)
+        max_lat = min(to_lat(y - buffer), 90.0)
+        return min_lat, min_lng, max_lat, max_lng
+
+    def _cache_key(self, z, x, y, version):
+        return f'{CACHE_PREFIX}:{z}:{x}:{y}:{version}'
+
+
+# Codificación protobuf mínima para tiles de puntos (especificación MVT 2.1)
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _zigzag(value: int) -> int:
+    return (value << 1) ^ (value >> 63)
+
+
+def _field_varint(field: int, value: int) -> bytes:
+    return _varint(field << 3) + _varint(value)
+
+
+def _field_bytes(field: int, value: bytes) -> bytes:
+    return _varint((field << 3) | 2) + _varint(len(value)) + value
+
+
+def _field_packed(field: int, values) -> bytes:
+    return _field_bytes(field, b''.join(_varint(value) for value in values))
+
+
+def _encode_value(value) -> bytes:
+    if isinstance(value, str):
+        return _field_bytes(1, value.encode('utf-8'))
+    if isinstance(value, bool):
+        return _field_varint(7, int(value))
+    if value >= 0:
+        return _field_varint(5, value)
+    return _field_varint(6, _zigzag(value))
+
+
+def _encode_tile(layer_name: str, features) -> bytes:
+    """
+    Codifica una capa de puntos.
+
+    Args:
+        layer_name: Nombre de la capa
+        features: Lista de tuplas (id, x, y, properties) en coordenadas del tile
+    """
+    keys = {}
+    values = {}
+    encoded_features = []
+
+    for feature_id, x, y, properties in features:
+        tags = []
+        for key, value in properties.items():
+            tags.append(keys.setdefault(key, len(keys)))
+            tags.append(values.setdefault((type(value), value), len(values)))
+
+        # MoveTo (id 1) con un solo punto: comando 9 seguido de x, y en zigzag
+        geometry = [9, _zigzag(x), _zigzag(y)]
+        encoded_features.append(_field_bytes(2, b''.join([
+            _field_varint(1, feature_id),
+            _field_packed(2, tags),
+            _field_varint(3, 1),  # GeomType POINT
+            _field_packed(4, geometry),
+        ])))
+
+    layer = b''.join([
+        _field_varint(15, 2),
+        _field_bytes(1, layer_name.encode('utf-8')),
+        b''.join(encoded_features),
+        b''.join(_field_bytes(3, key.encode('utf-8')) for key in keys),
+        b''.join(_field_bytes(4, _encode_value(value)) for _, value in values),
+        _field_varint(5, TILE_EXTENT),
+    ])
+    return _field_bytes(3, layer)
@@ -0,0 +1,17 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from app_maps.models import IncidentCategory, IncidentClosureType, IncidentPriority, IncidentState
+from app_maps.services.reference_data import ReferenceDataCache
+
+
+REFERENCE_MODELS = (IncidentCategory, IncidentClosureType, IncidentPriority, IncidentState)
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_reference_data(sender, **kwargs):
+    """Renueva la versión de la caché de referencia cuando cambia una de sus tablas"""
+    if sender in REFERENCE_MODELS:
+        transaction.on_commit(ReferenceDataCache().bump_version)
@@ -1,3 +1,881 @@
-from django.test import TestCase
+import csv
+import io
+import re
+import threading
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock, skipIf, skipUnless
 
-# Create your tests here.
+import brotli
+import pyarrow.parquet
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory
+from django.db import connection, connections, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import Count, Max
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+
+from app_maps.middleware import CompressionMiddleware
+from app_maps.models import (
+    Incident,
+    IncidentChange,
+    IncidentCategory,
+    IncidentClosureType,
+    IncidentCounter,
+    IncidentCloseTimeStatistic,
+    IncidentDailyStatistic,
+    IncidentPriority,
+    IncidentState,
+    Photography,
+    PhotoJob,
+)
+from app_maps.renderers import FastJSONRenderer
+from app_maps.serializers import IncidentSerializer, serialize_incident, serialize_incident_list
+from app_maps.services.categories import CategoryService
+from app_maps.services.clousere_type import ClosureTypeService
+from app_maps.services.counters import CounterService
+from app_maps.services.incident import IncidentService
+from app_maps.services.incident_changes import IncidentChangeService
+from app_maps.services.incident_statistics import IncidentStatisticsService
+from app_maps.services.photo_jobs import PhotoJobService
+from app_maps.services.priority import PriorityService
+from app_maps.services.reference_data import ReferenceDataCache
+from app_maps.services.states import StateService
+from app_maps.services.synthetic import DEFAULT_CENTER, SyntheticDataService
+from app_maps.services.vector_tiles import VectorTileService
+
+
+# Caché en memoria propia de las pruebas (la de settings es compartida entre procesos)
+TEST_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'app-maps-tests'},
+    'clusters': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'app-maps-tests-clusters'},
+}
+
+
+def clear_caches():
+    for alias in TEST_CACHES:
+        caches[alias].clear()
+
+
+@override_settings(CACHES=TEST_CACHES, VECTOR_TILE_CLUSTER_ZOOM=10, VECTOR_TILE_MAX_FEATURES=2000)
+class VectorTileServiceTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        SyntheticDataService(seed=3).create_incidents(300)
+
+    def setUp(self):
+        clear_caches()
+        self.service = VectorTileService()
+
+    def test_low_zoom_tile_contains_clusters(self):
+        # Tile z=3 que contiene Piura (centro de los datos sintéticos)
+        features = self.service._get_cluster_features(3, 2, 4)
+
+        self.assertTrue(features)
+        self.assertLess(len(features), Incident.objects.filter(show_on_map=True).count())
+        self.assertEqual(
+            sum(properties['count'] for _, _, _, properties in features),
+            Incident.objects.filter(show_on_map=True).count()
+        )
+
+    def test_low_zoom_tile_is_not_cached(self):
+        self.assertTrue(self.service.get_tile(3, 2, 4))
+        self.assertIsNone(cache.get(self.service._cache_key(3, 2, 4, ReferenceDataCache().get_version())))
+
+    def test_high_zoom_tile_contains_incidents(self):
+        self.service.get_tile(12, 1130, 2107)
+        features = self.service._get_features(12, 1130, 2107)
+
+        self.assertTrue(features)
+        self.assertTrue(all('id' in properties and 'count' not in properties for _, _, _, properties in features))
+        self.assertIsNotNone(cache.get(self.service._cache_key(12, 1130, 2107, ReferenceDataCache().get_version())))
+
+    def test_state_color_change_regenerates_cached_tiles(self):
+        self.service.get_tile(12, 1130, 2107)
+        state = IncidentState.objects.get(pk=Incident.objects.filter(show_on_map=True).values('state_id')[:1])
+        state.color = '#123456'
+        with self.captureOnCommitCallbacks(execute=True):
+            state.save()
+
+        self.assertIn(b'#123456', self.service.get_tile(12, 1130, 2107))
+
+    def test_tile_over_feature_limit_contains_clusters(self):
+        with override_settings(VECTOR_TILE_MAX_FEATURES=5):
+            features = self.service._get_features(12, 1130, 2107)
+
+        self.assertTrue(all('count' in properties for _, _, _, properties in features))
+
+    def test_invalidate_only_cached_zooms(self):
+        with mock.patch('app_maps.services.vector_tiles.cache') as mocked_cache:
+            self.service.invalidate_coordinates((-5.19449, -80.63282))
+
+        keys = mocked_cache.delete_many.call_args.args[0]
+        zooms = {int(key.split(':')[1]) for key in keys}
+        self.assertEqual(zooms, set(range(10, 21)))
+
+
+@override_settings(CACHES=TEST_CACHES, SECURE_SSL_REDIRECT=False)
+class IncidentListConditionalTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        SyntheticDataService(seed=4).create_incidents(30)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_valid_page_has_etag(self):
+        response = self.client.get(reverse('incidents'), {'page_size': 5})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.has_header('ETag'))
+        not_modified = self.client.get(
+            reverse('incidents'), {'page_size': 5}, headers={'If-None-Match': response['ETag']}
+        )
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_detail_validates_only_with_etag(self):
+        url = reverse('incident-detail', kwargs={'id_incident': Incident.objects.values_list('pk', flat=True)[0]})
+
+        response = self.client.get(url, headers={'If-Modified-Since': 'Fri, 01 Jan 2100 00:00:00 GMT'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('Last-Modified'))
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': response['ETag']}).status_code, 304)
+
+    def test_invalid_pagination_has_no_etag_and_no_queries(self):
+        for params in ({'cursor': 'garbage'}, {'page_size': 0}, {'page_size': 'x'}):
+            with self.subTest(params=params), self.assertNumQueries(0):
+                response = self.client.get(reverse('incidents'), params)
+
+            self.assertEqual(response.status_code, 400)
+            self.assertFalse(response.has_header('ETag'))
+
+    def test_invalid_filter_value_is_bad_request_without_etag(self):
+        for params in ({'show_on_map': 'yes'}, {'show_on_map': 'yes', 'stream': 'true'}):
+            with self.subTest(params=params):
+                response = self.client.get(reverse('incidents'), params)
+
+                self.assertEqual(response.status_code, 400)
+                self.assertFalse(response.has_header('ETag'))
+
+
+class IncidentTextSearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        category = IncidentCategory.objects.create(description='Vías')
+        cls.pothole = cls.create_incident(category, 'Bache en la calzada', 'Frente al mercado central')
+        cls.light = cls.create_incident(category, 'Semáforo malogrado', 'Esquina de Av. Grau')
+        cls.tree = cls.create_incident(category, 'Árbol caído sobre la pista', 'Cerca del colegio')
+
+    @staticmethod
+    def create_incident(category, summary, reference):
+        return Incident.objects.create(
+            category=category,
+            latitude=Decimal('-5.19449'),
+            longitude=Decimal('-80.63282'),
+            summary=summary,
+            reference=reference,
+        )
+
+    def search(self, text):
+        incidents = IncidentService().filter_by_text(Incident.objects.all(), text)
+        return {incident.id_incident for incident in incidents}
+
+    def test_matches_summary_and_reference(self):
+        self.assertEqual(self.search('bache'), {self.pothole.id_incident})
+        self.assertEqual(self.search('mercado'), {self.pothole.id_incident})
+        self.assertEqual(self.search('colegio'), {self.tree.id_incident})
+        self.assertEqual(self.search('inexistente'), set())
+
+    @skipIf(connection.vendor == 'postgresql', "icontains fallback only")
+    def test_fallback_is_partial_and_case_insensitive(self):
+        self.assertEqual(self.search('MALOG'), {self.light.id_incident})
+        self.assertEqual(self.search('en la calz'), {self.pothole.id_incident})
+
+    @skipUnless(connection.vendor == 'postgresql', "PostgreSQL full-text search")
+    def test_full_text_search_ignores_accents_and_matches_prefixes(self):
+        self.assertEqual(self.search('semaforo'), {self.light.id_incident})
+        self.assertEqual(self.search('arbol caid'), {self.tree.id_incident})
+
+    @skipUnless(connection.vendor == 'postgresql', "PostgreSQL search trigger")
+    def test_search_vector_only_recomputed_when_text_changes(self):
+        with connection.cursor() as cursor:
+            cursor.execute("UPDATE incident SET search_vector = NULL WHERE id_incident = %s", [self.light.id_incident])
+        IncidentService().touch_incident(self.light.id_incident)
+        self.assertEqual(self.search('semaforo'), set())
+
+        Incident.objects.filter(id_incident=self.light.id_incident).update(summary='Semáforo apagado')
+        self.assertEqual(self.search('semaforo'), {self.light.id_incident})
+
+
+class IncidentStatisticsMigrationTests(TransactionTestCase):
+    """0011_incident_statistics llena los rollups con los incidentes existentes"""
+
+    serialized_rollback = True
+
+    def migrate(self, target):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate([('app_maps', target)])
+        return executor.loader.project_state([('app_maps', target)]).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes('app_maps')[0][1])
+
+    def test_migration_fills_rollups(self):
+        apps = self.migrate('0010_incidentcounter')
+        category = apps.get_model('app_maps', 'IncidentCategory').objects.create(description='Vías')
+        HistoricalIncident = apps.get_model('app_maps', 'Incident')
+        for is_closed in (False, True, True):
+            incident = HistoricalIncident.objects.create(
+                category=category, latitude=Decimal('-5.19'), longitude=Decimal('-80.63'),
+                summary='Bache', is_closed=is_closed, state_id=3 if is_closed else 1,
+            )
+            if is_closed:
+                HistoricalIncident.objects.filter(pk=incident.pk).update(
+                    closure_date=incident.registration_date + timedelta(hours=3)
+                )
+
+        self.migrate('0011_incident_statistics')
+
+        self.assertEqual(sum(IncidentDailyStatistic.objects.values_list('registered', flat=True)), 3)
+        self.assertEqual(sum(IncidentCloseTimeStatistic.objects.values_list('closed', flat=True)), 2)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ReferenceDataLookupTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = IncidentCategory.objects.create(description='Vías')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_lookup_by_id(self):
+        self.assertEqual(CategoryService().get_category_by_id(self.category.id_category)['description'], 'Vías')
+        self.assertEqual(CategoryService().get_category_by_id(str(self.category.id_category))['description'], 'Vías')
+        self.assertEqual(StateService().get_state_by_id(IncidentState.RESOLVED)['id_state'], IncidentState.RESOLVED)
+
+    def test_invalid_or_missing_id_raises_does_not_exist(self):
+        lookups = [
+            (CategoryService().get_category_by_id, IncidentCategory.DoesNotExist),
+            (StateService().get_state_by_id, IncidentState.DoesNotExist),
+            (PriorityService().get_priority_by_id, IncidentPriority.DoesNotExist),
+            (ClosureTypeService().get_closure_type_by_id, IncidentClosureType.DoesNotExist),
+        ]
+        for lookup, exception in lookups:
+            for id in ('abc', None, 999_999):
+                with self.subTest(lookup=lookup.__name__, id=id), self.assertRaises(exception):
+                    lookup(id)
+
+
+@skipUnless(connection.vendor == 'postgresql', "seq assigned at commit by a PostgreSQL trigger")
+class IncidentChangeOrderTests(TransactionTestCase):
+
+    serialized_rollback = True
+
+    def test_seq_follows_commit_order_without_blocking_writers(self):
+        inserted = threading.Event()
+        committed = threading.Event()
+
+        def slow_transaction():
+            try:
+                with transaction.atomic():
+                    IncidentChangeService().record(1)
+                    inserted.set()
+                    # Sigue abierta hasta que la otra transacción confirma
+                    committed.wait(timeout=10)
+            finally:
+                connections.close_all()
+
+        thread = threading.Thread(target=slow_transaction)
+        thread.start()
+        inserted.wait(timeout=10)
+        with transaction.atomic():
+            IncidentChangeService().record(2)
+        committed.set()
+        thread.join()
+
+        self.assertEqual(list(IncidentChange.objects.order_by('seq').values_list('id_incident', flat=True)), [2, 1])
+
+    @override_settings(SECURE_SSL_REDIRECT=False)
+    def test_delta_returns_changes_committed_out_of_order(self):
+        inserted = threading.Event()
+        read = threading.Event()
+
+        def slow_transaction():
+            try:
+                with transaction.atomic():
+                    for id_incident in (11, 12, 13):
+                        IncidentChangeService().record(id_incident)
+                    inserted.set()
+                    read.wait(timeout=10)
+            finally:
+                connections.close_all()
+
+        def get_changes(since):
+            return self.client.get(reverse('incident-changes'), {'since': since}).json()['content']
+
+        thread = threading.Thread(target=slow_transaction)
+        thread.start()
+        inserted.wait(timeout=10)
+        IncidentChangeService().record(20)
+        # El cliente lee mientras la transacción lenta sigue abierta
+        first = get_changes(0)
+        read.set()
+        thread.join()
+        second = get_changes(first['cursor'])
+
+        self.assertEqual(first['deleted'], [20])
+        self.assertEqual(second['deleted'], [11, 12, 13])
+        # Dentro de la transacción se conserva el orden de inserción
+        self.assertEqual(
+            list(IncidentChange.objects.filter(seq__gt=first['cursor']).values_list('id_incident', flat=True)),
+            [11, 12, 13],
+        )
+
+
+@skipUnless(connection.vendor == 'postgresql', "SQLite serializes writers, the race cannot happen")
+@override_settings(CACHES=TEST_CACHES, INCIDENT_COUNTERS_ENABLED=True)
+class IncidentSnapshotRaceTests(TransactionTestCase):
+    """Escrituras simultáneas del mismo incidente no desajustan los rollups"""
+
+    serialized_rollback = True
+
+    def setUp(self):
+        SyntheticDataService(seed=8, closed_ratio=0, in_progress_ratio=0).create_incidents(3, photo_ratio=0)
+        CounterService().rebuild()
+        IncidentStatisticsService().rebuild()
+        self.id_incident = Incident.objects.values_list('id_incident', flat=True).first()
+
+    def get_statistics(self):
+        return (
+            set(IncidentDailyStatistic.objects.exclude(registered=0).values_list(
+                'day', 'category_id', 'state_id', 'registered')),
+            set(IncidentCloseTimeStatistic.objects.exclude(closed=0).values_list(
+                'day', 'category_id', 'bucket', 'closed')),
+        )
+
+    def patch_concurrently(self, update_data):
+        take_snapshot = IncidentService.take_snapshot
+
+        def slow_snapshot(service, incident):
+            # Deja tiempo para que la otra petición lea la fila antes de guardar
+            snapshot = take_snapshot(service, incident)
+            time.sleep(0.2)
+            return snapshot
+
+        def patch():
+            try:
+                IncidentService().update_incident_partial(self.id_incident, update_data)
+            finally:
+                connections.close_all()
+
+        with mock.patch.object(IncidentService, 'take_snapshot', slow_snapshot):
+            threads = [threading.Thread(target=patch) for _ in range(2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+    def test_rollups_match_rebuild_after_concurrent_flips(self):
+        for is_closed in (True, False, True):
+            self.patch_concurrently({'is_closed': is_closed})
+
+            with self.subTest(is_closed=is_closed):
+                self.assertEqual(
+                    {(row.dimension, row.key): row.count for row in IncidentCounter.objects.exclude(count=0)},
+                    {key: count for key, count in CounterService().compute_counters().items() if count},
+                )
+                statistics = self.get_statistics()
+                IncidentStatisticsService().rebuild()
+                self.assertEqual(statistics, self.get_statistics())
+
+
+class SerializerParityTests(TestCase):
+    """serialize_incident(_list) y FastJSONRenderer producen lo mismo que DRF"""
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(username='inspector')
+        category = IncidentCategory.objects.create(description='Señalización')
+        priority = IncidentPriority.objects.create(description='Alta')
+        closure_type = IncidentClosureType.objects.create(description='Atendido')
+
+        # Ciudadano sin relaciones opcionales (claves foráneas nulas)
+        citizen = Incident.objects.create(
+            category=category, latitude=Decimal('-5.1'), longitude=Decimal('-80.63282'),
+            summary='Texto con separadores \u2028 y \u2029 "comillas"', reference='',
+            user_type='2', citizen_name='Rosa',
+        )
+        # Inspector con prioridad, cerrado y con fotografías
+        closed = Incident.objects.create(
+            category=category, latitude=Decimal('-5.19449000'), longitude=Decimal('-80.6'),
+            summary='Bache en la calzada', reference='Frente al mercado',
+            user_type='1', inspector=user, priority=priority,
+            closure_type=closure_type, closure_description='Reparado', closure_user=user,
+            closure_date=timezone.now(), is_closed=True,
+        )
+        for name in ('foto 1.jpg', 'foto ñ.png'):
+            Photography.objects.create(
+                incident=closed, name=name, content_type='image/jpeg', file_size=1234, r2_key=f'incidents/{name}'
+            )
+        cls.ids = [citizen.id_incident, closed.id_incident]
+
+    def get_incidents(self):
+        return list(IncidentService().get_incidents_queryset().filter(id_incident__in=self.ids))
+
+    def test_serialize_incident_list_matches_incident_serializer(self):
+        incidents = self.get_incidents()
+
+        self.assertEqual(serialize_incident_list(incidents), IncidentSerializer(incidents, many=True).data)
+        for incident in incidents:
+            with self.subTest(id_incident=incident.id_incident):
+                self.assertEqual(serialize_incident(incident, timezone.get_current_timezone()),
+                                 IncidentSerializer(incident).data)
+
+    def test_rendered_bytes_match_drf(self):
+        incidents = self.get_incidents()
+
+        self.assertEqual(
+            FastJSONRenderer().render(serialize_incident_list(incidents)),
+            JSONRenderer().render(IncidentSerializer(incidents, many=True).data),
+        )
+
+    def test_fast_renderer_matches_json_renderer(self):
+        samples = [
+            {'decimal': Decimal('-5.19449000'), 'integer_decimal': Decimal('10')},
+            {'aware': datetime(2026, 1, 2, 3, 4, 5, 678901, tzinfo=dt_timezone.utc), 'naive': datetime(2026, 1, 2, 3, 4)},
+            {'date': date(2026, 1, 2), 'uuid': uuid.UUID(int=1)},
+            {'null': None, 'nested': [{'inspector': None, 'photographs': []}], 1: 'non string key'},
+            {'text': 'tildes áéí ñ, separadores \u2028 \u2029 y emoji 🚧'},
+            {'big': 2 ** 70},
+            [],
+        ]
+        for data in samples:
+            with self.subTest(data=data):
+                self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+
+@override_settings(CACHES=TEST_CACHES, SECURE_SSL_REDIRECT=False, PHOTO_JOB_MAX_ATTEMPTS=2)
+class PhotoJobTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        SyntheticDataService(seed=25).create_incidents(1, photo_ratio=0)
+        cls.incident = Incident.objects.get()
+
+    def setUp(self):
+        cache.clear()
+        self.service = PhotoJobService()
+        PhotoJob.objects.create(incident=self.incident, spool_path='/nonexistent/photo.jpg', name='photo.jpg')
+
+    def touches(self):
+        return IncidentChange.objects.filter(id_incident=self.incident.id_incident).count()
+
+    def test_only_final_failure_touches_incident(self):
+        [job] = self.service.lease('worker', 1)
+        self.service.fail(job, 'worker', 'timeout')
+        self.assertEqual(self.touches(), 0)
+
+        PhotoJob.objects.update(available_at=timezone.now())
+        [job] = self.service.lease('worker', 1)
+        self.service.fail(job, 'worker', 'timeout')
+
+        self.assertEqual(PhotoJob.objects.get().status, PhotoJob.STATUS_FAILED)
+        self.assertEqual(self.touches(), 1)
+
+    def test_complete_touches_incident_once(self):
+        [job] = self.service.lease('worker', 1)
+        self.assertTrue(self.service.complete(job, 'worker', 'incidents/1/photo.jpg'))
+
+        self.assertEqual(self.touches(), 1)
+
+    def test_cancel_keeps_completed_jobs(self):
+        [done] = self.service.lease('worker', 1)
+        self.service.complete(done, 'worker', 'incidents/1/photo.jpg')
+        pending = PhotoJob.objects.create(incident=self.incident, spool_path='/nonexistent/b.jpg', name='b.jpg')
+
+        self.service.cancel(self.incident.id_incident)
+
+        self.assertTrue(PhotoJob.objects.filter(pk=done.pk).exists())
+        self.assertFalse(PhotoJob.objects.filter(pk=pending.pk).exists())
+
+    def test_worker_uploads_miniature_only_after_complete(self):
+        PhotoJob.objects.update(make_miniature=True)
+        result = {'r2_key': 'incidents/1/photo.jpg', 'miniature_key': None, 'miniature_file': mock.sentinel.miniature}
+
+        for completed in (False, True):
+            PhotoJob.objects.update(status=PhotoJob.STATUS_PENDING, leased_until=None, available_at=timezone.now())
+            with self.subTest(completed=completed), \
+                    mock.patch.object(PhotoJobService, 'open_file'), \
+                    mock.patch.object(PhotoJobService, 'complete', return_value=completed), \
+                    mock.patch.object(IncidentService, 'upload_photography', return_value=result), \
+                    mock.patch.object(IncidentService, 'upload_photography_miniature') as upload_miniature, \
+                    mock.patch('app_maps.management.commands.process_photo_jobs.CloudflareService') as cloudflare, \
+                    mock.patch('app_maps.management.commands.process_photo_jobs.close_old_connections'):
+                # close_old_connections cerraría la conexión de la transacción de la prueba
+                call_command('process_photo_jobs', '--once', stdout=io.StringIO())
+
+                if completed:
+                    upload_miniature.assert_called_once_with(self.incident.id_incident, mock.sentinel.miniature)
+                    cloudflare.return_value.delete_file.assert_not_called()
+                else:
+                    upload_miniature.assert_not_called()
+                    cloudflare.return_value.delete_file.assert_called_once_with('incidents/1/photo.jpg')
+
+    def test_detail_includes_photo_jobs_on_request(self):
+        url = reverse('incident-detail', kwargs={'id_incident': self.incident.id_incident})
+
+        plain = self.client.get(url)
+        with_jobs = self.client.get(url, {'photo_jobs': 'true'})
+
+        self.assertNotIn('photo_jobs', plain.json()['content'])
+        self.assertEqual(len(with_jobs.json()['content']['photo_jobs']), 1)
+        self.assertNotEqual(plain['ETag'], with_jobs['ETag'])
+
+
+@override_settings(CACHES=TEST_CACHES, SECURE_SSL_REDIRECT=False, INCIDENTS_STREAM_CHUNK_SIZE=7)
+class IncidentReportExportTests(TestCase):
+
+    client_class = APIClient
+
+    @classmethod
+    def setUpTestData(cls):
+        SyntheticDataService(seed=16).create_incidents(20)
+        cls.user = User.objects.create_user(username='reporter')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def get_content(self, name, params=None):
+        response = self.client.get(reverse(name), params or {})
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content)
+
+    def test_parquet_export(self):
+        table = pyarrow.parquet.read_table(io.BytesIO(self.get_content('incident-export-parquet')))
+
+        self.assertEqual(table.num_rows, Incident.objects.count())
+        self.assertEqual(sorted(table.column('id_incident').to_pylist()),
+                         sorted(Incident.objects.values_list('id_incident', flat=True)))
+
+    def test_csv_export_escapes_formulas(self):
+        incident = Incident.objects.order_by('id_incident').first()
+        Incident.objects.filter(pk=incident.pk).update(summary='=HYPERLINK("http://x")', reference='-2+3')
+
+        content = self.get_content('incident-export-csv').decode('utf-8-sig')
+        row = next(row for row in csv.DictReader(io.StringIO(content)) if row['id_incident'] == str(incident.pk))
+
+        self.assertEqual(row['summary'], '\'=HYPERLINK("http://x")')
+        self.assertEqual(row['reference'], "'-2+3")
+
+    def test_invalid_filter_value_is_bad_request(self):
+        response = self.client.get(reverse('incident-export-csv'), {'show_on_map': 'yes'})
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_csv_export_with_filters(self):
+        content = self.get_content('incident-export-csv', {'show_on_map': 'True'}).decode('utf-8-sig')
+        rows = list(csv.DictReader(io.StringIO(content)))
+
+        self.assertEqual(len(rows), Incident.objects.filter(show_on_map=True).count())
+
+
+class CompressionMiddlewareTests(TestCase):
+
+    def compress(self, response, encoding='br'):
+        middleware = CompressionMiddleware(lambda request: response)
+        return middleware(RequestFactory().get('/', headers={'Accept-Encoding': encoding}))
+
+    def test_brotli_stream_sends_each_part_when_generated(self):
+        parts = [b'{"content":[', b'{"id_incident":1}' * 50, b']}']
+
+        response = self.compress(StreamingHttpResponse(iter(parts), content_type='application/json'))
+        self.assertEqual(response['Content-Encoding'], 'br')
+
+        decompressor = brotli.Decompressor()
+        streamed = iter(response.streaming_content)
+        # Bloque de metadatos aleatorio, sin contenido
+        self.assertEqual(decompressor.process(next(streamed)), b'')
+        for part in parts:
+            # Cada parte se puede descomprimir apenas se recibe, sin esperar al resto
+            self.assertEqual(decompressor.process(next(streamed)), part)
+
+    def test_brotli_output_is_padded_with_random_bytes(self):
+        content = b'{"id_incident":1}' * 100
+        sizes = set()
+        for _ in range(10):
+            response = self.compress(HttpResponse(content, content_type='application/json'))
+            self.assertEqual(brotli.decompress(response.content), content)
+            sizes.add(len(response.content))
+
+        self.assertGreater(len(sizes), 1)
+
+    def test_skips_html_and_responses_setting_cookies(self):
+        body = b'<input name="csrfmiddlewaretoken" value="secret">' * 50
+        html = self.compress(HttpResponse(body, content_type='text/html'))
+        with_cookie = HttpResponse(b'{"id_incident":1}' * 100, content_type='application/json')
+        with_cookie.set_cookie('sessionid', 'secret')
+
+        for response in (html, self.compress(with_cookie, 'gzip')):
+            self.assertFalse(response.has_header('Content-Encoding'))
+
+
+# Recorridos completos de las tablas grandes según el motor (las tablas de
+# referencia son pequeñas y recorrerlas completas es lo esperado)
+SEQUENTIAL_SCAN_PATTERNS = {
+    'postgresql': re.compile(r'Seq Scan on (incident|incident_change)\b'),
+    # En SQLite "SCAN incident USING INDEX" recorre un índice, no la tabla
+    'sqlite': re.compile(r'\bSCAN (incident|incident_change)\b(?! USING)'),
+}
+
+
+class SyntheticDataServiceTests(TestCase):
+
+    def test_bulk_create_keeps_generated_timestamps(self):
+        SyntheticDataService(seed=19, days=365).create_incidents(50, photo_ratio=1, record_changes=True)
+        last_month = timezone.now() - timedelta(days=30)
+
+        self.assertGreater(Incident.objects.filter(registration_date__lt=last_month).count(), 30)
+        self.assertGreater(Photography.objects.filter(upload_date__lt=last_month).count(), 30)
+        self.assertGreater(IncidentChange.objects.filter(changed_at__lt=last_month).count(), 30)
+
+        # auto_now / auto_now_add siguen activos para el resto del proceso
+        incident = Incident.objects.order_by('registration_date').first()
+        incident.save()
+        self.assertGreater(incident.updated_at, last_month)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class QueryPlanTests(TestCase):
+    """
+    EXPLAIN de las consultas de incidentes de los servicios: ninguna debe
+    recorrer la tabla completa (ver los índices de Incident.Meta).
+    """
+
+    ROWS = 20_000
+    CATEGORIES = 10
+    # Resumen poco frecuente: la búsqueda de texto debe ser selectiva
+    RARE_SUMMARY = 'Hundimiento de la pista'
+
+    @classmethod
+    def setUpTestData(cls):
+        for index in range(cls.CATEGORIES):
+            IncidentCategory.objects.create(description=f'Categoría {index + 1}')
+
+        synthetic = SyntheticDataService(seed=18, days=365)
+        synthetic.create_incidents(cls.ROWS, record_changes=True)
+        Incident.objects.filter(
+            id_incident__in=Incident.objects.order_by('id_incident').values('id_incident')[:20]
+        ).update(summary=cls.RARE_SUMMARY)
+        CounterService().rebuild()
+
+        # Estadísticas actualizadas para que el planificador conozca el volumen real
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def setUp(self):
+        self.pattern = SEQUENTIAL_SCAN_PATTERNS.get(connection.vendor)
+        if self.pattern is None:
+            self.skipTest(f"No plan check for '{connection.vendor}'")
+        self.incident_service = IncidentService()
+        self.page_size = self.incident_service.parse_page_size(None)
+
+    def assertIndexedPlan(self, name, queryset):
+        plan = queryset.explain()
+        with self.subTest(query=name):
+            self.assertIsNone(self.pattern.search(plan), f"{name} uses a sequential scan:\n{plan}")
+
+    def page(self, cursor=None, **filters):
+        incidents = self.incident_service.apply_filters(self.incident_service.get_incidents_queryset(), **filters)
+        return self.incident_service.get_page_queryset(incidents, cursor, self.page_size)
+
+    def test_list_queries_use_indexes(self):
+        category_id = IncidentCategory.objects.order_by('id_category').values_list('id_category', flat=True).first()
+        last = Incident.objects.order_by('-registration_date', '-id_incident')[self.page_size:self.page_size + 1].get()
+        cursor = self.incident_service.encode_cursor(last.registration_date, last.id_incident)
+        now = timezone.now()
+        last_week = {'from_date': now - timedelta(days=7), 'to_date': now}
+
+        queries = [
+            ('detail', self.incident_service.get_incidents_queryset().filter(id_incident=last.id_incident)),
+            ('page', self.page()),
+            ('page with cursor', self.page(cursor)),
+            ('page by category', self.page(id_category=category_id)),
+            ('page by state', self.page(id_state=IncidentState.IN_PROGRESS)),
+            ('page on map', self.page(show_on_map=True)),
+            ('page on map with cursor', self.page(cursor, show_on_map=True)),
+            ('registration period', self.incident_service.apply_filters(
+                Incident.objects.all(), registration_period=last_week
+            )),
+            ('page by registration period', self.page(registration_period=last_week)),
+            # Misma consulta que get_incidents_validator (aggregate no admite explain)
+            ('validator by category', self.incident_service.apply_filters(
+                Incident.objects.all(), id_category=category_id
+            ).order_by().values('category_id').annotate(last_modified=Max('updated_at'), count=Count('id_incident'))),
+        ]
+        for name, queryset in queries:
+            self.assertIndexedPlan(name, queryset)
+
+    def test_viewport_queries_use_indexes(self):
+        latitude, longitude = DEFAULT_CENTER
+        viewport = {
+            'min_lat': latitude - 0.01, 'max_lat': latitude + 0.01,
+            'min_lng': longitude - 0.01, 'max_lng': longitude + 0.01,
+        }
+        self.assertIndexedPlan('viewport', self.incident_service.apply_filters(Incident.objects.all(), **viewport))
+
+        on_map = self.incident_service.apply_filters(Incident.objects.all(), show_on_map=True, **viewport)
+        self.assertIndexedPlan('viewport on map', on_map)
+        # Los prefijos de geohash (LIKE 'abc%') deben usar el índice parcial; el LIKE
+        # de SQLite no distingue mayúsculas y no puede usar índices
+        if connection.vendor == 'postgresql':
+            self.assertRegex(on_map.explain(), r'Index Scan (using|on) incident_map_geohash_idx')
+
+    @skipUnless(connection.vendor == 'postgresql', "SQLite searches with icontains, which always scans")
+    def test_text_search_uses_search_index(self):
+        # Con pocas filas el planificador prefiere recorrer la tabla para la
+        # selectividad por defecto de un prefijo (2%); sin esa opción, un recorrido
+        # completo significa que la consulta no puede usar el índice GIN
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        self.assertIndexedPlan('text search', self.incident_service.apply_filters(
+            Incident.objects.all(), text_search='hundimiento'
+        ))
+        self.assertIndexedPlan('page by text search', self.page(text_search='hundimiento'))
+
+    def test_changes_since_uses_index(self):
+        since = max(IncidentChange.objects.count() - 100, 0)
+        self.assertIndexedPlan('changes since', IncidentChange.objects.filter(seq__gt=since)[:self.page_size])
+
+    def test_total_incidents_reads_only_counters(self):
+        with override_settings(INCIDENT_COUNTERS_ENABLED=True):
+            with CaptureQueriesContext(connection) as context:
+                totals = self.incident_service.total_incidents()
+
+        self.assertEqual(totals['total'], self.ROWS)
+        self.assertEqual(len(context), 1)
+        self.assertNotRegex(context.captured_queries[0]['sql'], r'FROM "incident"(?!_)')
+
+    def test_total_incidents_without_counters_is_one_aggregate(self):
+        # Sin contadores recorrer la tabla es inevitable: al menos una sola vez
+        with override_settings(INCIDENT_COUNTERS_ENABLED=False), self.assertNumQueries(1):
+            totals = self.incident_service.total_incidents()
+        self.assertEqual(totals['total'], self.ROWS)
+
+
+# (nombre de la ruta, kwargs de la ruta, query string, requiere autenticación, máximo de consultas)
+# Los kwargs con valor None se completan con un incidente existente. Las respuestas
+# en streaming leen por bloques: su máximo es (consultas fijas, consultas por bloque
+# de INCIDENTS_STREAM_CHUNK_SIZE incidentes).
+ENDPOINT_BUDGETS = [
+    ('categories', {}, '', False, 1),
+    ('states', {}, '', False, 1),
+    ('priorities', {}, '', False, 1),
+    ('closure-types', {}, '', False, 1),
+    # Validador del ETag + incidentes con sus relaciones + fotografías
+    ('incidents', {}, '', False, 3),
+    ('incidents', {}, 'page_size=50', False, 3),
+    ('incidents', {}, 'stream=true', False, (2, 1)),
+    # Validador + incidente + fotografías (+ estado de las fotografías encoladas)
+    ('incident-detail', {'id_incident': None}, '', False, 3),
+    ('incident-detail', {'id_incident': None}, 'photo_jobs=true', False, 4),
+    ('incident-markers', {}, '', False, 1),
+    ('incident-clusters', {}, 'min_lat=-5.3&max_lat=-5.1&min_lng=-80.7&max_lng=-80.5&zoom=12', False, 2),
+    # Features del tile; si pasan de VECTOR_TILE_MAX_FEATURES, además estados + clusters
+    ('incident-tiles', {'z': 12, 'x': 1130, 'y': 2107}, '', False, 3),
+    # Zoom bajo: estados + clusters de las celdas del tile
+    ('incident-tiles', {'z': 3, 'x': 2, 'y': 4}, '', False, 2),
+    ('incident-changes', {}, 'page_size=100', False, 3),
+    ('incident-export-geojson', {}, 'photos=true', False, (2, 1)),
+    ('incident-export-csv', {}, '', True, 2),
+    ('total-incidents', {}, '', False, 1),
+    ('incident-statistics', {}, '', True, 2),
+]
+
+
+@override_settings(CACHES=TEST_CACHES, INCIDENTS_STREAM_CHUNK_SIZE=1000)
+class QueryBudgetTests(TestCase):
+    """
+    Cada endpoint de ENDPOINT_BUDGETS dentro de su presupuesto, con la misma
+    cantidad de consultas para pocos y para muchos incidentes con fotografías.
+    Los datos caben en un bloque de streaming.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='budget')
+
+    def add_incidents(self, count):
+        created_before = set(Incident.objects.values_list('id_incident', flat=True))
+        SyntheticDataService(seed=count).create_incidents(count, photo_ratio=1, record_changes=True)
+        # Una segunda fotografía por incidente: las fotografías no deben consultarse por incidente
+        Photography.objects.bulk_create([
+            Photography(incident_id=id_incident, name='second.jpg', content_type='image/jpeg',
+                        file_size=1000, r2_key=f'incidents/{id_incident}/second.jpg')
+            for id_incident in Incident.objects.exclude(id_incident__in=created_before).values_list(
+                'id_incident', flat=True)
+        ])
+
+    def request_endpoint(self, name, kwargs, query_string, authenticated, id_incident):
+        """
+        Llama directamente a la vista (sin middleware) y consume la respuesta
+        completa (render o streaming), para medir solo las consultas del endpoint.
+        """
+        kwargs = {key: id_incident if value is None else value for key, value in kwargs.items()}
+        path = reverse(name, kwargs=kwargs)
+        request = APIRequestFactory().get(f'{path}?{query_string}' if query_string else path)
+        if authenticated:
+            force_authenticate(request, user=self.user)
+        match = resolve(path)
+        response = match.func(request, *match.args, **match.kwargs)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        elif hasattr(response, 'render'):
+            response.render()
+        self.assertLess(response.status_code, 400, path)
+
+    def measure(self):
+        id_incident = Incident.objects.order_by('id_incident').values_list('id_incident', flat=True).first()
+        counts = []
+        for name, kwargs, query_string, authenticated, budget in ENDPOINT_BUDGETS:
+            budget = sum(budget) if isinstance(budget, tuple) else budget
+            clear_caches()
+            with self.subTest(endpoint=name, query=query_string, rows=Incident.objects.count()):
+                with CaptureQueriesContext(connection) as context:
+                    self.request_endpoint(name, kwargs, query_string, authenticated, id_incident)
+                queries = '\n'.join(query['sql'] for query in context.captured_queries)
+                self.assertLessEqual(len(context), budget, f"{name} executed:\n{queries}")
+            counts.append(len(context))
+        return counts
+
+    def test_queries_do_not_grow_with_incidents(self):
+        self.add_incidents(3)
+        few = self.measure()
+        self.add_incidents(30)
+        many = self.measure()
+
+        for entry, few_queries, many_queries in zip(ENDPOINT_BUDGETS, few, many):
+            with self.subTest(endpoint=entry[0], query=entry[2]):
+                self.assertEqual(many_queries, few_queries)
+
+    @override_settings(VECTOR_TILE_MAX_FEATURES=5)
+    def test_tiles_over_feature_limit_within_budget(self):
+        self.add_incidents(30)
+        self.measure()
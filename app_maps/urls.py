@@ -8,6 +8,13 @@ urlpatterns = [
     path("categories/<int:category_id>/", views.CategoryDetailView.as_view(), name="category-detail"),
     path("states/", views.StateView.as_view(), name="states"),
     path("incidents/", views.IncidentView.as_view(), name="incidents"),
+    path("incidents/markers/", views.IncidentMarkerView.as_view(), name="incident-markers"),
+    path("incidents/changes/", views.IncidentChangesView.as_view(), name="incident-changes"),
+    path("incidents/export.geojson", views.IncidentGeoJSONExportView.as_view(), name="incident-export-geojson"),
+    path("incidents/export.csv", views.IncidentReportExportView.as_view(export_format='csv'), name="incident-export-csv"),
+    path("incidents/export.parquet", views.IncidentReportExportView.as_view(export_format='parquet'), name="incident-export-parquet"),
+    path("incidents/clusters/", views.IncidentClusterView.as_view(), name="incident-clusters"),
+    path("incidents/tiles/<int:z>/<int:x>/<int:y>.mvt", views.IncidentTileView.as_view(), name="incident-tiles"),
     path("incidents/photography/<int:id_photography>/", views.PhotographyView.as_view(), name="photographies"),
     path("incidents/<int:id_incident>/", views.IncidentDetailView.as_view(), name="incident-detail"),
     path("incidents/miniature/<int:id_incident>", views.PhotographyMiniatureView.as_view(), name="photography-miniature"),
@@ -15,6 +22,7 @@ urlpatterns = [
     path("closure-types/", views.ClosureTypeView.as_view(), name="closure-types"),
     path("incidents/photography/blob/<int:id_photography>/", views.PhotographyBlobView.as_view(), name="photography-blob"),
     path("incidents/total/", views.TotalIncidentsView.as_view(), name="total-incidents"),
+    path("incidents/statistics/", views.IncidentStatisticsView.as_view(), name="incident-statistics"),
     path("tradoc/", views.TradocView.as_view(), name="tradoc"),
     path("tradoc/path/", views.PathView.as_view(), name="path"),
 ]
\ No newline at end of file
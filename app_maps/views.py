@@ -1,4 +1,13 @@
-from django.http import HttpResponse
+import hmac
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.http import HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
@@ -6,6 +15,7 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.viewsets import ReadOnlyModelViewSet
 from rest_framework.decorators import action
 
+from app_maps import metrics as app_metrics
 from app_maps.utils import get_boolean_query_param
 from app_maps.models import IncidentCategory
 from app_maps.serializers import IncidentCategorySerializer
@@ -13,9 +23,15 @@ from app_maps.serializers import IncidentCategorySerializer
 from app_maps.services.states import StateService
 from app_maps.services.categories import CategoryService
 from app_maps.services.incident import IncidentService
+from app_maps.services.incident_changes import IncidentChangeService
+from app_maps.services.export import IncidentExportService
+from app_maps.services.clusters import ClusterService
+from app_maps.services.incident_statistics import IncidentStatisticsService
+from app_maps.services.vector_tiles import VectorTileService
 from app_maps.services.photography import PhotographyService
 from app_maps.services.priority import PriorityService
 from app_maps.services.clousere_type import ClosureTypeService
+from app_maps.services.reference_data import ReferenceDataCache
 from app_maps.services.tradoc import TradocService
 
 
@@ -23,7 +39,64 @@ def index(request):
     return HttpResponse("Conexión exitosa")
 
 
+def metrics(request):
+    """
+    Métricas Prometheus en formato de texto. Si METRICS_TOKEN está definido,
+    exige el encabezado "Authorization: Bearer <token>".
+    """
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if token:
+        authorization = request.META.get('HTTP_AUTHORIZATION', '')
+        if not hmac.compare_digest(authorization.encode(), f'Bearer {token}'.encode()):
+            return HttpResponse(status=401)
+    return HttpResponse(app_metrics.render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def reference_data_etag(request, *args, **kwargs):
+    """
+    ETag de las vistas de datos de referencia: cambia cuando se modifica
+    cualquiera de esas tablas o cuando cambian la ruta o los parámetros.
+    """
+    return ReferenceDataCache().get_etag(request.path, request.GET.urlencode())
+
+
+def get_incidents_validator(request):
+    """
+    Calcula una sola vez por petición el validador del listado de incidentes
+    (None si los filtros no son válidos; la vista responde el error).
+    """
+    if not hasattr(request, '_incidents_validator'):
+        request._incidents_validator = IncidentService().get_incidents_validator(**dict(request.GET.items()))
+    return request._incidents_validator
+
+
+def incidents_etag(request, *args, **kwargs):
+    validator = get_incidents_validator(request)
+    if validator is None:
+        return None
+    # Incluye la versión de los datos de referencia (descripción y color del estado)
+    return ReferenceDataCache().get_etag(
+        request.path, request.GET.urlencode(), validator['last_modified'], validator['count']
+    )
 
+
+def get_incident_last_modified(request, id_incident):
+    """Consulta una sola vez por petición la última modificación del incidente"""
+    if not hasattr(request, '_incident_last_modified'):
+        request._incident_last_modified = IncidentService().get_incident_last_modified(id_incident)
+    return request._incident_last_modified
+
+
+def incident_detail_etag(request, id_incident, *args, **kwargs):
+    last_modified = get_incident_last_modified(request, id_incident)
+    if last_modified is None:
+        return None
+    # Ruta completa: con photo_jobs=true el cuerpo es distinto
+    return ReferenceDataCache().get_etag(request.get_full_path(), last_modified)
+
+
+
+@method_decorator(condition(etag_func=reference_data_etag), name='get')
 class CategoryView(APIView):    
     permission_classes = [AllowAny]
     
@@ -60,6 +133,7 @@ class CategoryView(APIView):
 
 
 
+@method_decorator(condition(etag_func=reference_data_etag), name='get')
 class CategoryDetailView(APIView):
     """
     View for specific category
@@ -84,6 +158,7 @@ class CategoryDetailView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         
 
+@method_decorator(condition(etag_func=reference_data_etag), name='get')
 class StateView(APIView):
     permission_classes = [AllowAny]
     
@@ -103,6 +178,7 @@ class StateView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         
 
+@method_decorator(condition(etag_func=incidents_etag), name='get')
 class IncidentView(APIView):
     """
     Vista para manejar incidentes con autenticación diferencial:
@@ -144,16 +220,51 @@ class IncidentView(APIView):
         """
         Obtiene incidentes con filtros opcionales via query parameters.
         No requiere autenticación - acceso público para ciudadanos.
+        Con los parámetros cursor y/o page_size la respuesta se pagina por
+        cursor e incluye next_cursor para pedir la página siguiente.
+        Con stream=true el listado completo se transmite por bloques (ignora
+        la paginación) para no cargarlo entero en memoria.
+        Responde 304 si el conjunto filtrado no cambió (ETag). No se envía
+        Last-Modified porque una eliminación no cambia la fecha máxima.
         """
         try:
             incident_service = IncidentService()
             # Usar query_params para GET requests (buena práctica REST)
             filters = dict(request.query_params.items())            
+
+            # Respuesta transmitida por bloques para resultados grandes
+            if get_boolean_query_param(request, 'stream', default=False):
+                return StreamingHttpResponse(
+                    incident_service.stream_incidents_json(**filters),
+                    content_type='application/json'
+                )
+
+            # Paginación por cursor cuando se envía cursor o page_size
+            if 'cursor' in filters or 'page_size' in filters:
+                page = incident_service.get_incidents_page(**filters)
+                return Response({
+                    'message': "Incidents retrieved successfully",
+                    'content': page['results'],
+                    'next_cursor': page['next_cursor']
+                }, status=status.HTTP_200_OK)
+
             incidents = incident_service.get_incidents_by_filters(**filters)
             return Response({
                 'message': "Incidents retrieved successfully",
                 'content': incidents
             }, status=status.HTTP_200_OK)
+        except ValueError as ve:
+            # Filtros inválidos (por ejemplo, un viewport incompleto)
+            return Response({
+                'error': str(ve),
+                'message': 'Validation error'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        except ValidationError as ve:
+            # Valores que el ORM rechaza al construir el filtro (por ejemplo show_on_map=yes)
+            return Response({
+                'error': ' '.join(ve.messages),
+                'message': 'Validation error'
+            }, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response({
                 "error": f"Internal server error: {str(e)}",
@@ -191,6 +302,100 @@ class IncidentView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         
         
+class IncidentMarkerView(APIView):
+    """
+    Versión liviana del listado de incidentes para dibujar marcadores en el mapa.
+    Acepta los mismos filtros que IncidentView.get.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        try:
+            incident_service = IncidentService()
+            filters = dict(request.query_params.items())
+            markers = incident_service.get_incident_markers(**filters)
+            return Response({
+                'message': "Incident markers retrieved successfully",
+                'content': markers
+            }, status=status.HTTP_200_OK)
+        except ValueError as ve:
+            return Response({
+                'error': str(ve),
+                'message': 'Validation error'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response({
+                "error": f"Internal server error: {str(e)}",
+                "message": "Failed to retrieve incident markers"
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class IncidentClusterView(APIView):
+    """
+    Agrupa los incidentes de un viewport en clusters según el nivel de zoom.
+    Parámetros: min_lat, max_lat, min_lng, max_lng, zoom y show_on_map (opcional).
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        try:
+            incident_service = IncidentService()
+            viewport = incident_service.parse_viewport(**request.query_params.dict())
+            if viewport is None:
+                raise ValueError("Viewport is required: min_lat, min_lng, max_lat, max_lng")
+
+            try:
+                zoom = int(request.query_params.get('zoom', ''))
+            except ValueError:
+                raise ValueError("zoom must be an integer")
+
+            show_on_map = get_boolean_query_param(request, 'show_on_map', default=False)
+
+            cluster_service = ClusterService()
+            clusters = cluster_service.get_clusters(*viewport, zoom=zoom, show_on_map=show_on_map)
+            return Response({
+                'message': "Incident clusters retrieved successfully",
+                'content': clusters
+            }, status=status.HTTP_200_OK)
+        except ValueError as ve:
+            return Response({
+                'error': str(ve),
+                'message': 'Validation error'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response({
+                "error": f"Internal server error: {str(e)}",
+                "message": "Failed to retrieve incident clusters"
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class IncidentTileView(APIView):
+    """
+    Tiles vectoriales (Mapbox Vector Tile) con los incidentes visibles en el mapa.
+    Respuesta binaria cacheable por CDNs y navegadores.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request, z, x, y):
+        try:
+            vector_tile_service = VectorTileService()
+            tile = vector_tile_service.get_tile(z, x, y)
+
+            response = HttpResponse(tile, content_type='application/vnd.mapbox-vector-tile')
+            response['Cache-Control'] = f'public, max-age={settings.VECTOR_TILE_MAX_AGE}'
+            return response
+        except ValueError as ve:
+            return Response({
+                'error': str(ve),
+                'message': 'Validation error'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response({
+                "error": f"Internal server error: {str(e)}",
+                "message": "Failed to retrieve incident tile"
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 class PhotographyView(APIView):
     permission_classes = [AllowAny]
 
@@ -214,6 +419,8 @@ class PhotographyView(APIView):
 
 class PhotographyBlobView(APIView):
     permission_classes = [IsAuthenticated]
+    # Las imágenes ya están comprimidas
+    compress_response = False
     
     def get(self, request, id_photography):
         try:
@@ -264,6 +471,9 @@ class PhotographyMiniatureView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+# Solo ETag: Last-Modified tiene resolución de segundos y dos cambios en el mismo
+# segundo responderían 304 con el contenido anterior
+@method_decorator(condition(etag_func=incident_detail_etag), name='get')
 class IncidentDetailView(APIView):
     
     def get_permissions(self):
@@ -277,9 +487,14 @@ class IncidentDetailView(APIView):
             return [IsAuthenticated()]
 
     def get(self, request, id_incident):
+        """
+        Con photo_jobs=true incluye el estado de las fotografías en procesamiento.
+        """
         try:
             incident_service = IncidentService()
-            incident = incident_service.get_incident_by_id(id_incident)
+            incident = incident_service.get_incident_by_id(
+                id_incident, photo_jobs=get_boolean_query_param(request, 'photo_jobs', default=False)
+            )
             return Response({
                 'message': "Incident retrieved successfully",
                 'content': incident
@@ -345,6 +560,7 @@ class IncidentDetailView(APIView):
                 "message": "Failed to delete incident"
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@method_decorator(condition(etag_func=reference_data_etag), name='get')
 class PriorityView(APIView):
     permission_classes = [AllowAny]
 
@@ -364,6 +580,7 @@ class PriorityView(APIView):
 
 
 
+@method_decorator(condition(etag_func=reference_data_etag), name='get')
 class ClosureTypeView(APIView):
     permission_classes = [AllowAny]
 
@@ -400,6 +617,166 @@ class TotalIncidentsView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@method_decorator(condition(etag_func=incidents_etag), name='get')
+class IncidentGeoJSONExportView(APIView):
+    """
+    Exporta los incidentes como FeatureCollection GeoJSON (por ejemplo, para QGIS).
+    Acepta los mismos filtros que el listado; con photos=true cada feature
+    incluye las URLs de sus fotografías.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        try:
+            export_service = IncidentExportService()
+            filters = dict(request.query_params.items())
+
+            photo_url = None
+            if get_boolean_query_param(request, 'photos', default=False):
+                def photo_url(id_photography):
+                    return request.build_absolute_uri(reverse('photographies', args=[id_photography]))
+
+            response = StreamingHttpResponse(
+                export_service.stream_geojson(photo_url=photo_url, **filters),
+                content_type='application/geo+json'
+            )
+            response['Content-Disposition'] = 'attachment; filename="incidents.geojson"'
+            return response
+        except ValueError as ve:
+            return Response({
+                'error': str(ve),
+                'message': 'Validation error'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        except ValidationError as ve:
+            return Response({
+                'error': ' '.join(ve.messages),
+                'message': 'Validation error'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response({
+                "error": f"Internal server error: {str(e)}",
+                "message": "Failed to export incidents"
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@method_decorator(condition(etag_func=incidents_etag), name='get')
+class IncidentReportExportView(APIView):
+    """
+    Reporte tabular de incidentes (CSV o Parquet) con categoría, prioridad,
+    tipo de cierre e inspector. Acepta los mismos filtros que el listado.
+    """
+    permission_classes = [IsAuthenticated]
+    export_format = 'csv'
+
+    CONTENT_TYPES = {
+        'csv': 'text/csv; charset=utf-8',
+        'parquet': 'application/vnd.apache.parquet',
+    }
+
+    def get(self, request):
+        try:
+            export_service = IncidentExportService()
+            filters = dict(request.query_params.items())
+
+            if self.export_format == 'parquet':
+                content = export_service.stream_parquet(**filters)
+            else:
+                content = export_service.stream_csv(**filters)
+
+            response = StreamingHttpResponse(content, content_type=self.CONTENT_TYPES[self.export_format])
+            response['Content-Disposition'] = f'attachment; filename="incidents.{self.export_format}"'
+            return response
+        except ValueError as ve:
+            return Response({
+                'error': str(ve),
+                'message': 'Validation error'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        except ValidationError as ve:
+            return Response({
+                'error': ' '.join(ve.messages),
+                'message': 'Validation error'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response({
+                "error": f"Internal server error: {str(e)}",
+                "message": "Failed to export incidents"
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class IncidentChangesView(APIView):
+    """
+    Sincronización incremental: incidentes creados o modificados y eliminados
+    después del cursor `since`. El cliente guarda el `cursor` de la respuesta y
+    repite la consulta mientras `has_more` sea verdadero.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        try:
+            incident_change_service = IncidentChangeService()
+            changes = incident_change_service.get_changes(
+                since=request.query_params.get('since'),
+                page_size=request.query_params.get('page_size')
+            )
+            return Response({
+                'message': "Incident changes retrieved successfully",
+                'content': changes
+            }, status=status.HTTP_200_OK)
+        except ValueError as ve:
+            return Response({
+                'error': str(ve),
+                'message': 'Validation error'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response({
+                "error": f"Internal server error: {str(e)}",
+                "message": "Failed to retrieve incident changes"
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class IncidentStatisticsView(APIView):
+    """
+    Estadísticas de incidentes por periodo (day, week, month), categoría y estado.
+    Parámetros: period, from_date, to_date (YYYY-MM-DD, por defecto el último año) e id_category.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            period = request.query_params.get('period', 'day')
+            id_category = request.query_params.get('id_category')
+
+            try:
+                to_date = request.query_params.get('to_date')
+                to_date = date.fromisoformat(to_date) if to_date else timezone.localdate()
+                from_date = request.query_params.get('from_date')
+                from_date = date.fromisoformat(from_date) if from_date else to_date - timedelta(days=365)
+            except ValueError:
+                raise ValueError("from_date and to_date must use the YYYY-MM-DD format")
+
+            statistics_service = IncidentStatisticsService()
+            statistics = statistics_service.get_statistics(
+                period=period,
+                from_date=from_date,
+                to_date=to_date,
+                id_category=id_category
+            )
+            return Response({
+                'message': "Incident statistics retrieved successfully",
+                'content': statistics
+            }, status=status.HTTP_200_OK)
+        except ValueError as ve:
+            return Response({
+                'error': str(ve),
+                'message': 'Validation error'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response({
+                "error": f"Internal server error: {str(e)}",
+                "message": "Failed to retrieve incident statistics"
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 class TradocView(APIView):
     permission_classes = [AllowAny]
 
@@ -13,9 +13,12 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 from dotenv import load_dotenv
 import os
+import tempfile
 from os import environ
 from datetime import timedelta
 
+from django.core.exceptions import ImproperlyConfigured
+
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -73,8 +76,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'app_maps.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'app_maps.middleware.QueryInstrumentationMiddleware',
+    'app_maps.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -127,6 +133,48 @@ DATABASES = {
   }
 }
 
+# Base SQLite local, para desarrollo y benchmarks sin conexión:
+# USE_SQLITE=True python manage.py migrate
+if environ.get('USE_SQLITE', 'False') == 'True':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': environ.get('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+        }
+    }
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# 'default' es la caché en memoria de Django salvo que se configure CACHE_BACKEND;
+# con varios workers conviene un backend compartido (Redis, Memcached) para que
+# las versiones de los datos de referencia, los ETags y los tiles se invaliden en todos.
+# 'clusters' guarda una entrada por celda de geohash: por defecto en archivos para
+# que la invalidación de celdas sea visible en todos los workers del mismo servidor.
+CACHES = {
+    'default': {
+        'BACKEND': environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': environ.get('CACHE_LOCATION', ''),
+    },
+    'clusters': {
+        'BACKEND': environ.get('CLUSTER_CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': environ.get('CLUSTER_CACHE_LOCATION', os.path.join(tempfile.gettempdir(), 'maps_clusters')),
+    },
+}
+
+# Tiempo de vida (segundos) de los clusters de incidentes en caché
+CLUSTER_CACHE_TIMEOUT = int(environ.get('CLUSTER_CACHE_TIMEOUT', 3600))
+
+# Tiles vectoriales de incidentes: zoom máximo, vida en caché del servidor
+# y max-age enviado a CDNs/navegadores (segundos)
+VECTOR_TILE_MAX_ZOOM = int(environ.get('VECTOR_TILE_MAX_ZOOM', 20))
+VECTOR_TILE_CACHE_TIMEOUT = int(environ.get('VECTOR_TILE_CACHE_TIMEOUT', 86400))
+VECTOR_TILE_MAX_AGE = int(environ.get('VECTOR_TILE_MAX_AGE', 60))
+# Por debajo de este zoom los tiles contienen clusters en lugar de incidentes,
+# y un tile con más de VECTOR_TILE_MAX_FEATURES incidentes también usa clusters
+VECTOR_TILE_CLUSTER_ZOOM = int(environ.get('VECTOR_TILE_CLUSTER_ZOOM', 10))
+VECTOR_TILE_MAX_FEATURES = int(environ.get('VECTOR_TILE_MAX_FEATURES', 2000))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -154,10 +202,56 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework_simplejwt.authentication.JWTAuthentication',        
     ],
+    # JSON con orjson si está instalado (misma salida que JSONRenderer)
+    'DEFAULT_RENDERER_CLASSES': [
+        'app_maps.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10
 }
 
+# Tamaño máximo de página para la paginación por cursor de incidentes
+INCIDENTS_MAX_PAGE_SIZE = int(environ.get('INCIDENTS_MAX_PAGE_SIZE', 500))
+
+# Filas por bloque al transmitir el listado de incidentes con ?stream=true
+INCIDENTS_STREAM_CHUNK_SIZE = int(environ.get('INCIDENTS_STREAM_CHUNK_SIZE', 2000))
+
+# Compresión de respuestas de la API (app_maps.middleware.CompressionMiddleware)
+COMPRESSION_MIN_SIZE = int(environ.get('COMPRESSION_MIN_SIZE', 1024))
+COMPRESSION_BROTLI_QUALITY = int(environ.get('COMPRESSION_BROTLI_QUALITY', 5))
+
+# Métricas de consultas SQL por petición (Server-Timing y log app_maps.requests)
+QUERY_INSTRUMENTATION_ENABLED = environ.get('QUERY_INSTRUMENTATION_ENABLED', 'True') == 'True'
+# Peticiones cuya consulta más lenta supera este tiempo se registran como WARNING
+SLOW_QUERY_MS = int(environ.get('SLOW_QUERY_MS', 500))
+
+# Métricas Prometheus en /metrics. Con varios workers, definir la variable de
+# entorno PROMETHEUS_MULTIPROC_DIR (directorio compartido, vacío al arrancar).
+# Si METRICS_TOKEN tiene valor, /metrics exige "Authorization: Bearer <token>".
+METRICS_TOKEN = environ.get('METRICS_TOKEN')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'app_maps': {
+            'handlers': ['console'],
+            'level': environ.get('APP_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
+# Contadores de incidentes mantenidos en cada escritura (tabla incident_counter).
+# Al activarlos, reconstruirlos con: python manage.py rebuild_incident_counters
+INCIDENT_COUNTERS_ENABLED = os.getenv('INCIDENT_COUNTERS_ENABLED', 'False') == 'True'
+
 # Configuración de JWT
 SIMPLE_JWT = {
     'USER_ID_FIELD': 'username',
@@ -279,3 +373,33 @@ R2_ACCESS_KEY_ID = environ.get('R2_ACCESS_KEY_ID')
 R2_SECRET_ACCESS_KEY = environ.get('R2_SECRET_ACCESS_KEY')
 R2_ENDPOINT_URL = environ.get('R2_ENDPOINT_URL')
 R2_BUCKET_NAME = environ.get('R2_BUCKET_NAME')
+# Cliente de R2 compartido por proceso: conexiones del pool (una por hilo que
+# sube o descarga en paralelo), timeouts en segundos e intentos totales por
+# operación (incluido el primero) con reintentos adaptativos
+R2_MAX_POOL_CONNECTIONS = int(environ.get('R2_MAX_POOL_CONNECTIONS', 20))
+R2_CONNECT_TIMEOUT = float(environ.get('R2_CONNECT_TIMEOUT', 5))
+R2_READ_TIMEOUT = float(environ.get('R2_READ_TIMEOUT', 30))
+R2_MAX_ATTEMPTS = int(environ.get('R2_MAX_ATTEMPTS', 5))
+# Hilos para optimizar y subir en paralelo las fotografías de un incidente
+# (no debería superar R2_MAX_POOL_CONNECTIONS)
+PHOTO_UPLOAD_WORKERS = int(environ.get('PHOTO_UPLOAD_WORKERS', 4))
+
+# Procesamiento de fotografías: 'sync' las optimiza y sube durante la petición;
+# 'async' las guarda en PHOTO_SPOOL_DIR y responde de inmediato, y el comando
+# `manage.py process_photo_jobs` las procesa (el spool debe ser compartido
+# entre la aplicación y el worker)
+PHOTO_PROCESSING_MODE = environ.get('PHOTO_PROCESSING_MODE', 'sync')
+PHOTO_SPOOL_DIR = environ.get('PHOTO_SPOOL_DIR', os.path.join(tempfile.gettempdir(), 'maps_photo_spool'))
+# El directorio temporal local no es visible desde el contenedor del worker
+if PHOTO_PROCESSING_MODE == 'async' and not environ.get('PHOTO_SPOOL_DIR'):
+    raise ImproperlyConfigured(
+        "PHOTO_SPOOL_DIR must be set to a directory shared with the photo workers "
+        "when PHOTO_PROCESSING_MODE is 'async'"
+    )
+# Fotografías procesadas en paralelo por cada worker
+PHOTO_WORKER_CONCURRENCY = int(environ.get('PHOTO_WORKER_CONCURRENCY', 4))
+# Intentos por fotografía y espera base (segundos) entre reintentos, que se duplica en cada intento
+PHOTO_JOB_MAX_ATTEMPTS = int(environ.get('PHOTO_JOB_MAX_ATTEMPTS', 5))
+PHOTO_JOB_RETRY_BACKOFF = int(environ.get('PHOTO_JOB_RETRY_BACKOFF', 30))
+# Tiempo tras el cual un trabajo tomado por un worker que murió vuelve a estar disponible
+PHOTO_JOB_LEASE_SECONDS = int(environ.get('PHOTO_JOB_LEASE_SECONDS', 300))
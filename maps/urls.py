@@ -18,10 +18,13 @@ from django.contrib import admin
 from django.urls import include, path
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
+from app_maps.views import metrics
+
 urlpatterns = [
     path('admin/', admin.site.urls),    
     path("", include("app_maps.urls")),  # Página principal
     path("app-maps/", include("app_maps.urls")),  # También disponible aquí
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('metrics', metrics, name='metrics'),
 ]